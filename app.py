@@ -1,28 +1,723 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-from typing import Dict, List, Any, Tuple
+from typing import AbstractSet, Dict, FrozenSet, Iterator, List, Any, Optional, Sequence, Tuple
+import hashlib
+import hmac
+import os
+import re
+import threading
 import config
-from src.documents import get_all_documents, get_document_by_id
-from src.utils import compute_mock_relevance, matches_query, extract_snippet
+from src.cache import QueryCache
+from src.compression import SUPPORTED_ENCODINGS, compress, negotiate_encoding
+from src.documents import DOCUMENT_FIELDS, get_document_by_id, get_store, set_store
+from src.fts import SEARCH_BACKEND_FTS, FtsSearcher, open_fts_searcher
+from src.index import InvertedIndex
+from src.journal import IngestJournal
+from src.live import LiveIndex, SegmentCache, Segments, rank_segments
+from src.matrix import MATRIX_AVAILABLE, SEARCH_BACKEND_MATRIX, MatrixScorer
+from src.memory import process_memory
+from src.passages import SEARCH_BACKEND_PASSAGES, PassageIndex, rank_passages
+from src.query import ParsedQuery, parse_query
+from src.scoring import SCORING_LEGACY, SCORING_MODES, TermScores
+from src.search import iter_results, rank_documents
+from src.shards import ShardedSearcher, ShardResult
+from src.spelling import TrigramIndex, correct_query, corrected_text, max_edits
+from src.suggest import SuggestIndex, suggest_segments
+from src.serialization import FastJSONProvider, FragmentEncoder, dumps
+from src.snapshot import load_or_build_index
+from src.store import open_store
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+DOCUMENT_ID_PATTERN = re.compile(r'[\w.-]+')
+SEARCH_BACKENDS = ('python', SEARCH_BACKEND_MATRIX, SEARCH_BACKEND_FTS)
+
+
+def search_backend_error(backend: str, scoring_mode: str, ingesting: bool) -> Optional[str]:
+    # A backend that can't serve the configured searches would otherwise
+    # fall back to the python backend without a word.
+    if backend not in SEARCH_BACKENDS:
+        return f"SEARCH_BACKEND must be one of: {', '.join(SEARCH_BACKENDS)}"
+    
+    if backend == SEARCH_BACKEND_MATRIX and not MATRIX_AVAILABLE:
+        return f"SEARCH_BACKEND={SEARCH_BACKEND_MATRIX} needs numpy (pip install numpy)"
+    
+    if backend == SEARCH_BACKEND_FTS and scoring_mode == SCORING_LEGACY:
+        return f"SEARCH_BACKEND={SEARCH_BACKEND_FTS} only serves BM25; set SEARCH_SCORING_MODE=bm25"
+    
+    if backend == SEARCH_BACKEND_FTS and ingesting:
+        # The full-text table is never written to, so it goes stale with the
+        # first ingested (or replayed) change.
+        return f"SEARCH_BACKEND={SEARCH_BACKEND_FTS} can't serve ingested documents; unset INGEST_TOKEN and INGEST_JOURNAL"
+    
+    return None
+
+
+# Fail at startup rather than answering every search with a 400.
+if config.Config.SEARCH_SCORING_MODE not in SCORING_MODES:
+    raise ValueError(f"SEARCH_SCORING_MODE must be one of: {', '.join(SCORING_MODES)}")
+
+backend_error = search_backend_error(
+    config.Config.SEARCH_BACKEND,
+    config.Config.SEARCH_SCORING_MODE,
+    bool(config.Config.INGEST_TOKEN or config.Config.INGEST_JOURNAL)
+)
+
+if backend_error:
+    raise ValueError(backend_error)
+
+if config.Config.DOCUMENT_STORE:
+    set_store(open_store(config.Config.DOCUMENT_STORE, config.Config.DOCUMENT_CACHE_SIZE))
+
+live_index = LiveIndex(
+    load_or_build_index(get_store(), config.Config.INDEX_SNAPSHOT),
+    config.Config.INGEST_MERGE_THRESHOLD,
+    merge_ratio=config.Config.INGEST_MERGE_RATIO
+)
+search_cache = QueryCache(config.Config.SEARCH_CACHE_SIZE, config.Config.SEARCH_CACHE_TTL)
+corpus_fingerprint = get_store().fingerprint()
+# Opened before the ingest journal is replayed: the full-text table only
+# reflects the store as loaded from disk.
+fts_searcher: Optional[FtsSearcher] = (
+    open_fts_searcher(get_store(), live_index.version)
+    if config.Config.SEARCH_BACKEND == SEARCH_BACKEND_FTS else None
+)
+ingest_journal = (
+    IngestJournal(config.Config.INGEST_JOURNAL, config.Config.INGEST_JOURNAL_COMPACT_SIZE)
+    if config.Config.INGEST_JOURNAL else None
+)
+ingest_lock = threading.Lock()
+sharded_searcher: Optional[ShardedSearcher] = None
+matrix_scorer: Optional[MatrixScorer] = None
+spelling_index: Optional[TrigramIndex] = None
+suggest_index: Optional[SuggestIndex] = None
+passage_index: Optional[PassageIndex] = None
+# The delta segments' own passage, suggestion and spelling indexes.
+delta_passages: SegmentCache[PassageIndex] = SegmentCache(PassageIndex)
+delta_suggestions: SegmentCache[SuggestIndex] = SegmentCache(
+    lambda segment: SuggestIndex(segment, get_store(), config.Config.SUGGEST_MAX_LIMIT)
+)
+delta_trigrams: SegmentCache[TrigramIndex] = SegmentCache(TrigramIndex)
+document_bodies = QueryCache(config.Config.COMPRESSED_BODY_CACHE_SIZE)
+result_encoder = FragmentEncoder()
+result_encoder.preload(get_store().metadata(document_id) for document_id in get_store().ids())
 
 cors_origins = config.Config.get_cors_origins()
 CORS(app, 
      origins=cors_origins,
      allow_headers=['Content-Type', 'Authorization'],
-     methods=['GET', 'POST', 'OPTIONS'],
+     methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
      supports_credentials=False,
      max_age=3600)
 
 
-@app.route('/api/generate', methods=['POST', 'OPTIONS'])
+def parse_pagination(data: Dict[str, Any]) -> Tuple[int, int, Optional[str]]:
+    limit = data.get('limit', config.Config.SEARCH_DEFAULT_LIMIT)
+    offset = data.get('offset', 0)
+    
+    if not isinstance(limit, int) or isinstance(limit, bool) or not 1 <= limit <= config.Config.SEARCH_MAX_LIMIT:
+        return 0, 0, f"limit must be an integer between 1 and {config.Config.SEARCH_MAX_LIMIT}"
+    
+    if not isinstance(offset, int) or isinstance(offset, bool) or offset < 0:
+        return 0, 0, "offset must be a non-negative integer"
+    
+    return limit, offset, None
+
+
+def parse_search_request(data: Dict[str, Any]) -> Tuple[Optional[Tuple[str, int, int, str]], Optional[str]]:
+    query = data.get('query', '')
+    
+    if not query or not isinstance(query, str):
+        return None, "Query parameter is required and must be a non-empty string"
+    
+    query = query.strip()
+    
+    if not query:
+        return None, "Query parameter cannot be empty"
+    
+    limit, offset, pagination_error = parse_pagination(data)
+    
+    if pagination_error:
+        return None, pagination_error
+    
+    scoring = data.get('scoring', config.Config.SEARCH_SCORING_MODE)
+    
+    if scoring not in SCORING_MODES:
+        return None, f"scoring must be one of: {', '.join(SCORING_MODES)}"
+    
+    return (query, limit, offset, scoring), None
+
+
+def search_request_args() -> Dict[str, Any]:
+    # The query-string form of a search request, so a URL identifies the
+    # results and a shared cache can store and revalidate them.
+    data: Dict[str, Any] = {
+        name: request.args[name] for name in ('query', 'limit', 'offset', 'scoring', 'stream') if name in request.args
+    }
+    
+    for name in ('limit', 'offset'):
+        if name in data and data[name].isdigit():
+            data[name] = int(data[name])
+    
+    if data.get('stream') in ('true', 'false'):
+        data['stream'] = data['stream'] == 'true'
+    
+    return data
+
+
+def build_accelerators(base: InvertedIndex, merged: Optional[Segments] = None) -> None:
+    # The term-document matrix and the spelling, suggestion and passage
+    # indexes are built from a frozen base index. Between merges they keep
+    # serving the base segment while the delta segments are searched
+    # alongside, so only a merge (`merged` holds the segments it folded)
+    # replaces them. The shards' processes can't be forked again once a
+    # worker runs threads, so a merge sends the new shards to them.
+    global sharded_searcher, matrix_scorer, spelling_index, suggest_index, passage_index
+    
+    if config.Config.SEARCH_SHARDS > 1:
+        if sharded_searcher is None or merged is None or sharded_searcher.index is not merged.base:
+            if sharded_searcher is not None:
+                sharded_searcher.close()
+            sharded_searcher = ShardedSearcher(base, config.Config.SEARCH_SHARDS)
+        else:
+            sharded_searcher = sharded_searcher.rebuild(base, changed_documents(merged))
+    
+    if config.Config.SEARCH_BACKEND == SEARCH_BACKEND_MATRIX and MATRIX_AVAILABLE:
+        matrix_scorer = MatrixScorer(base)
+    
+    if config.Config.SPELLING_CORRECTION:
+        spelling_index = TrigramIndex(base)
+    
+    suggest_index = SuggestIndex(base, get_store(), config.Config.SUGGEST_MAX_LIMIT)
+    
+    if config.Config.SEARCH_PASSAGES:
+        previous = passage_index
+        if merged is not None and previous is not None and previous.index is merged.base:
+            # Reuses the passages already split out of every merged segment
+            # instead of normalizing the whole corpus again.
+            passage_index = PassageIndex.merged(base, passage_parts(previous, merged))
+        else:
+            passage_index = PassageIndex(base)
+
+
+def changed_documents(segments: Segments) -> Dict[str, Dict[str, Any]]:
+    store = get_store()
+    documents = (store.get(doc_id) for delta, _ in segments.deltas for doc_id in delta.doc_ids)
+    return {document['id']: document for document in documents if document is not None}
+
+
+def start_shard_pool() -> None:
+    # Called from gunicorn's post_fork hook and before the development and
+    # ASGI servers start, while the process has no other threads yet.
+    if sharded_searcher is not None:
+        sharded_searcher.start()
+
+
+def suggest_parts(segments: Segments) -> List[Tuple[SuggestIndex, AbstractSet[str]]]:
+    # Read in this order, so a suggestion index that isn't built on the
+    # current base is built on the one just merged into it.
+    merged = live_index.merged
+    suggestions = suggest_index
+    parts = [(suggestions, segments.deleted_ids)]
+    
+    if suggestions.index is not segments.base and merged is not None and suggestions.index is merged.base:
+        # Until the merge has rebuilt the suggestion index, the segments it
+        # folded stand in for the new base, minus what changed since.
+        changed = segments.deleted_ids
+        parts = [(suggestions, merged.deleted_ids | changed), *delta_suggestion_parts(merged, changed)]
+    
+    return parts + delta_suggestion_parts(segments)
+
+
+def delta_suggestion_parts(
+    segments: Segments,
+    changed: AbstractSet[str] = frozenset()
+) -> List[Tuple[SuggestIndex, AbstractSet[str]]]:
+    return [
+        (delta_suggestions.get(delta), {delta.doc_ids[ordinal] for ordinal in dead} | changed)
+        for delta, dead in segments.deltas
+    ]
+
+
+def passage_parts(passages: PassageIndex, segments: Segments) -> List[Tuple[PassageIndex, FrozenSet[int]]]:
+    return [(passages, segments.tombstones), *((delta_passages.get(delta), dead) for delta, dead in segments.deltas)]
+
+
+def base_segment_results(
+    segments: Segments,
+    parsed_query: ParsedQuery,
+    depth: int,
+    scoring: str
+) -> Optional[List[ShardResult]]:
+    # The base segment's entries from an accelerator built on it, scored
+    # against the statistics of all segments.
+    searcher = sharded_searcher
+    
+    if searcher is not None and searcher.index is segments.base:
+        results = searcher.segment_results(parsed_query, depth, scoring, segments.statistics, segments.deleted_ids)
+        if results is not None:
+            return results
+    
+    scorer = matrix_scorer
+    
+    if scorer is not None and scorer.index is segments.base:
+        result = scorer.segment_results(parsed_query, depth, scoring, segments.statistics, segments.tombstones)
+        if result is not None:
+            return [result]
+    
+    return None
+
+
+def rank(
+    segments: Segments,
+    parsed_query: ParsedQuery,
+    limit: int,
+    offset: int,
+    scoring: str,
+    shared: Optional[TermScores] = None
+) -> Tuple[List[Tuple[float, str]], int]:
+    if segments.pending:
+        base_results = base_segment_results(segments, parsed_query, offset + limit, scoring)
+        return rank_segments(segments, parsed_query, limit, offset, scoring, base_results)
+    
+    searcher = sharded_searcher
+    
+    if searcher is not None and searcher.index is segments.base:
+        return searcher.rank_documents(parsed_query, limit, offset, scoring)
+    
+    scorer = matrix_scorer
+    
+    if scorer is not None and scorer.index is segments.base:
+        ranked = scorer.rank_documents(parsed_query, limit, offset, scoring)
+        if ranked is not None:
+            return ranked
+    
+    return rank_documents(segments.base, parsed_query, limit, offset, scoring, shared)
+
+
+def correct_spelling(
+    query: str,
+    parsed_query: ParsedQuery,
+    scoring: str,
+    segments: Segments
+) -> Tuple[ParsedQuery, Optional[str]]:
+    # Tokens that match nothing are swapped for the closest term that
+    # does, so a typo finds what was meant instead of nothing. BM25 only
+    # matches whole tokens; legacy scoring also matches a token inside a
+    # longer term, so it leaves word forms like "patent" for "patents" alone.
+    corrector = spelling_index
+    
+    if corrector is None or not parsed_query:
+        return parsed_query, None
+    
+    statistics = segments.statistics
+    
+    def is_known(token: str) -> bool:
+        if statistics.doc_freq(token) > 0:
+            return True
+        if scoring != SCORING_LEGACY:
+            return False
+        # Terms only found in deleted documents count until the next merge.
+        return corrector.contains(token) or any(delta_trigrams.get(delta).contains(token) for delta, _ in segments.deltas)
+    
+    def suggest(token: str) -> Optional[str]:
+        edits = max_edits(token)
+        extra = [
+            candidate
+            for delta, _ in segments.deltas
+            for candidate in delta_trigrams.get(delta).candidates(token, edits)
+        ] if edits else []
+        return corrector.suggest(token, statistics.doc_freq, extra)
+    
+    corrected, corrections = correct_query(parsed_query, is_known, suggest)
+    
+    if not corrections:
+        return parsed_query, None
+    
+    return corrected, corrected_text(query, corrections)
+
+
+def search_results(
+    segments: Segments,
+    parsed_query: ParsedQuery,
+    limit: int,
+    offset: int,
+    scoring: str,
+    shared: Optional[TermScores] = None
+) -> Tuple[Iterator[Dict[str, Any]], int]:
+    searcher = fts_searcher
+    
+    # SQLite ranks and builds snippets itself; legacy scoring, queries it
+    # can't express and an index changed by ingestion use the live index.
+    if searcher is not None and scoring != SCORING_LEGACY and segments.version == searcher.version:
+        found = searcher.search(parsed_query, limit, offset)
+        if found is not None:
+            return iter(found[0]), found[1]
+    
+    passages = passage_index
+    
+    # Passage ranking replaces the other scoring backends; delta segments
+    # are split into passages of their own until the next merge.
+    if passages is not None and scoring != SCORING_LEGACY and passages.index is segments.base:
+        page, total, best_passages = rank_passages(passage_parts(passages, segments), parsed_query, limit, offset)
+        return iter_results(parsed_query, page, scoring, best_passages), total
+    
+    page, total = rank(segments, parsed_query, limit, offset, scoring, shared)
+    return iter_results(parsed_query, page, scoring), total
+
+
+def search_backend() -> str:
+    if fts_searcher is not None:
+        return SEARCH_BACKEND_FTS
+    if passage_index is not None:
+        return SEARCH_BACKEND_PASSAGES
+    if matrix_scorer is not None:
+        return SEARCH_BACKEND_MATRIX
+    return 'python'
+
+
+def cached_search(
+    parsed_query: ParsedQuery,
+    limit: int,
+    offset: int,
+    scoring: str,
+    shared: Optional[TermScores] = None,
+    segments: Optional[Segments] = None
+) -> Tuple[List[Dict[str, Any]], int]:
+    if segments is None:
+        segments = live_index.segments()
+    
+    cache_key = (str(parsed_query), limit, offset, scoring)
+    version = segments.version
+    cached = search_cache.get(cache_key, version)
+    
+    if cached is None:
+        results, total = search_results(segments, parsed_query, limit, offset, scoring, shared)
+        cached = (list(results), total)
+        search_cache.put(cache_key, cached, version)
+    
+    return cached
+
+
+def is_not_modified(etag: str, last_modified: Optional[float]) -> bool:
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    
+    if last_modified is not None and request.if_modified_since:
+        return int(last_modified) <= request.if_modified_since.timestamp()
+    
+    return False
+
+
+def with_validators(response: Response, etag: str, last_modified: Optional[float], cache_control: str) -> Response:
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    
+    if last_modified is not None:
+        response.last_modified = int(last_modified)
+    
+    return response
+
+
+def not_modified(etag: str, last_modified: Optional[float], cache_control: str) -> Response:
+    return with_validators(Response(status=304), etag, last_modified, cache_control)
+
+
+def with_encoding(response: Response, etag: str, encoding: Optional[str]) -> Response:
+    if config.Config.COMPRESSION_ENABLED:
+        response.vary.add('Accept-Encoding')
+    
+    # Encoded bytes differ from the identity body, so the validator can
+    # only be a weak one.
+    if encoding is not None:
+        response.set_etag(etag, weak=True)
+    
+    return response
+
+
+def document_cache_control() -> str:
+    return f"public, max-age={config.Config.DOCUMENT_CACHE_MAX_AGE}"
+
+
+def corpus_version() -> str:
+    # Every worker applies the same journal, so the position it has read up
+    # to names the same documents whichever worker answers. Without one
+    # there is a single worker, whose index version restarts from the same
+    # number after a restart, so the change time is mixed in.
+    if ingest_journal is not None:
+        return f"{ingest_journal.inode}:{ingest_journal.offset}"
+    return f"{live_index.version}:{get_store().changed_at}"
+
+
+def search_etag(query: str, cache_key: Tuple[Any, ...]) -> str:
+    # Search results only change with the corpus, so the validator is
+    # derived from the corpus version rather than the response body.
+    key = f"{corpus_fingerprint}:{corpus_version()}:{query}:{cache_key!r}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def json_response(body: bytes) -> Response:
+    return Response(body, mimetype='application/json')
+
+
+def document_body(document_id: str, etag: str, encoding: Optional[str]) -> Optional[bytes]:
+    # Encoded bodies are keyed on the content hash, so each document is
+    # serialized (and compressed) once per encoding while it stays cached.
+    body = document_bodies.get((etag, encoding))
+    
+    if body is None:
+        document = get_document_by_id(document_id)
+        
+        if document is None:
+            return None
+        
+        body = compress(dumps(document) + b"\n", encoding, stored=True)
+        document_bodies.put((etag, encoding), body)
+    
+    return body
+
+
+def preload_document_bodies() -> None:
+    store = get_store()
+    encodings = (None,) + SUPPORTED_ENCODINGS
+    per_encoding = config.Config.COMPRESSED_BODY_CACHE_SIZE // len(encodings)
+    
+    for document_id in store.ids()[:per_encoding]:
+        for encoding in encodings:
+            document_body(document_id, store.etag(document_id), encoding)
+
+
+def wants_stream(data: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
+    stream = data.get('stream')
+    
+    if stream is None:
+        return request.accept_mimetypes.best == NDJSON_MIMETYPE, None
+    
+    if not isinstance(stream, bool):
+        return False, "stream must be a boolean"
+    
+    return stream, None
+
+
+def stream_search_results(
+    query: str,
+    corrected_query: Optional[str],
+    parsed_query: ParsedQuery,
+    limit: int,
+    offset: int,
+    scoring: str,
+    cache_key: Tuple[Any, ...],
+    segments: Segments
+) -> Iterator[bytes]:
+    version = segments.version
+    cached = search_cache.get(cache_key, version)
+    
+    try:
+        if cached is None:
+            result_iterator, total = search_results(segments, parsed_query, limit, offset, scoring)
+            results = []
+            
+            for result in result_iterator:
+                results.append(result)
+                yield result_encoder.encode_result(result) + b"\n"
+            
+            search_cache.put(cache_key, (results, total), version)
+        else:
+            results, total = cached
+            
+            for result in results:
+                yield result_encoder.encode_result(result) + b"\n"
+        
+        yield dumps({
+            "done": True,
+            "query": query,
+            "corrected_query": corrected_query,
+            "count": total,
+            "limit": limit,
+            "offset": offset,
+            "scoring": scoring
+        }) + b"\n"
+    
+    except Exception as e:
+        # Headers are already sent, so report the failure in-band.
+        yield dumps({"error": "Internal server error"}) + b"\n"
+
+
+def parse_document(data: Any, document_id: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    if not isinstance(data, dict):
+        return None, "Invalid document format"
+    
+    unknown = [field for field in data if field not in DOCUMENT_FIELDS]
+    
+    if unknown:
+        return None, f"Unknown document fields: {', '.join(unknown)}"
+    
+    data_id = data.get('id', document_id)
+    
+    if document_id is not None and data_id != document_id:
+        return None, "Document id does not match the URL"
+    
+    if not isinstance(data_id, str) or not DOCUMENT_ID_PATTERN.fullmatch(data_id):
+        return None, "id must be a non-empty string of letters, digits, '.', '_' or '-'"
+    
+    for field in ('title', 'summary', 'content'):
+        value = data.get(field)
+        
+        if not isinstance(value, str) or not value.strip():
+            return None, f"{field} is required and must be a non-empty string"
+    
+    relevance_score = data.get('relevance_score')
+    
+    if relevance_score is not None and (
+        not isinstance(relevance_score, (int, float)) or isinstance(relevance_score, bool) or not 0 <= relevance_score <= 1
+    ):
+        return None, "relevance_score must be a number between 0 and 1"
+    
+    return {**{field: data[field] for field in DOCUMENT_FIELDS if field in data}, "id": data_id}, None
+
+
+def check_ingest_token() -> Optional[Tuple[Response, int]]:
+    token = config.Config.INGEST_TOKEN
+    
+    if not token:
+        return jsonify({"error": "Document ingestion is disabled"}), 403
+    
+    scheme, _, credentials = request.headers.get('Authorization', '').partition(' ')
+    
+    if scheme.lower() != 'bearer' or not hmac.compare_digest(credentials.strip().encode('utf-8'), token.encode('utf-8')):
+        response = jsonify({"error": "A valid bearer token is required"})
+        response.headers['WWW-Authenticate'] = 'Bearer'
+        return response, 401
+    
+    return None
+
+
+def apply_changes(entries: Sequence[Dict[str, Any]]) -> List[bool]:
+    # Store first, so a document is readable by the time the index can
+    # return it; the index takes the whole batch as one new version.
+    store = get_store()
+    results = []
+    changes = []
+    
+    for entry in entries:
+        if entry['op'] == 'delete':
+            results.append(store.delete(entry['id']))
+            changes.append((entry['id'], None))
+        else:
+            document = entry['document']
+            results.append(store.put(document))
+            changes.append((document['id'], store.normalized(document['id']).tokens))
+    
+    live_index.apply(changes)
+    return results
+
+
+def ingest(entries: Sequence[Dict[str, Any]]) -> List[bool]:
+    if ingest_journal is not None:
+        results = ingest_journal.append(entries, apply_changes)
+    else:
+        with ingest_lock:
+            results = apply_changes(entries)
+    
+    live_index.schedule_merge()
+    return results
+
+
+if ingest_journal is not None:
+    ingest_journal.replay(apply_changes)
+    # Keeps the next startup's replay proportional to the documents
+    # changed, not to every change ever made.
+    ingest_journal.compact(apply_changes)
+    live_index.merge()
+
+build_accelerators(live_index.base)
+live_index.on_merge = build_accelerators
+
+if config.Config.COMPRESSION_ENABLED and config.Config.COMPRESSION_PRELOAD:
+    preload_document_bodies()
+
+
+@app.before_request
+def sync_ingested_changes() -> None:
+    # Picks up documents ingested through other workers.
+    if ingest_journal is not None and ingest_journal.replay(apply_changes):
+        live_index.schedule_merge()
+
+
+@app.route('/api/generate', methods=['GET', 'POST', 'OPTIONS'])
 def generate_search_results() -> Tuple[Dict[str, Any], int]:
     if request.method == 'OPTIONS':
         return '', 204
     
     try:
-        data = request.get_json()
+        if request.method == 'GET':
+            data = search_request_args()
+        else:
+            data = request.get_json(silent=True)
+            
+            if not data:
+                return jsonify({"error": "Request body is required"}), 400
+            
+            if not isinstance(data, dict):
+                return jsonify({"error": "Invalid request format"}), 400
+        
+        search_request, request_error = parse_search_request(data)
+        
+        if request_error:
+            return jsonify({"error": request_error}), 400
+        
+        query, limit, offset, scoring = search_request
+        stream, stream_error = wants_stream(data)
+        
+        if stream_error:
+            return jsonify({"error": stream_error}), 400
+        
+        segments = live_index.segments()
+        parsed_query, corrected_query = correct_spelling(query, parse_query(query), scoring, segments)
+        
+        if stream:
+            cache_key = (str(parsed_query), limit, offset, scoring)
+            return Response(
+                stream_search_results(query, corrected_query, parsed_query, limit, offset, scoring, cache_key, segments),
+                mimetype=NDJSON_MIMETYPE
+            )
+        
+        etag = search_etag(query, (str(parsed_query), limit, offset, scoring))
+        last_modified = get_store().last_modified
+        
+        # Only GET can be answered with 304; a POST whose precondition
+        # fails gets 412 (RFC 9110, section 13.1.2).
+        if is_not_modified(etag, None):
+            if request.method == 'GET':
+                return not_modified(etag, last_modified, 'no-cache')
+            return jsonify({"error": "Precondition failed"}), 412
+        
+        results, total = cached_search(parsed_query, limit, offset, scoring, segments=segments)
+        response = json_response(result_encoder.encode_response({
+            "query": query,
+            "corrected_query": corrected_query,
+            "results": results,
+            "count": total,
+            "limit": limit,
+            "offset": offset,
+            "scoring": scoring
+        }))
+        
+        return with_validators(response, etag, last_modified, 'no-cache'), 200
+    
+    except Exception as e:
+        return jsonify({"error": "Internal server error"}), 500
+
+
+@app.route('/api/generate/batch', methods=['POST', 'OPTIONS'])
+def generate_batch_results() -> Tuple[Dict[str, Any], int]:
+    if request.method == 'OPTIONS':
+        return '', 204
+    
+    try:
+        data = request.get_json(silent=True)
         
         if not data:
             return jsonify({"error": "Request body is required"}), 400
@@ -30,41 +725,140 @@ def generate_search_results() -> Tuple[Dict[str, Any], int]:
         if not isinstance(data, dict):
             return jsonify({"error": "Invalid request format"}), 400
         
-        query = data.get('query', '')
+        queries = data.get('queries')
         
-        if not query or not isinstance(query, str):
-            return jsonify({"error": "Query parameter is required and must be a non-empty string"}), 400
+        if not isinstance(queries, list) or not queries:
+            return jsonify({"error": "queries must be a non-empty list"}), 400
         
-        query = query.strip()
+        if len(queries) > config.Config.SEARCH_BATCH_MAX_SIZE:
+            return jsonify({"error": f"A batch can contain at most {config.Config.SEARCH_BATCH_MAX_SIZE} queries"}), 400
         
-        if not query:
-            return jsonify({"error": "Query parameter cannot be empty"}), 400
+        search_requests = []
         
-        all_documents = get_all_documents()
-        scored_documents: List[Dict[str, Any]] = []
+        for position, item in enumerate(queries):
+            if isinstance(item, str):
+                item = {"query": item}
+            
+            if not isinstance(item, dict):
+                return jsonify({"error": f"queries[{position}]: Invalid request format"}), 400
+            
+            search_request, request_error = parse_search_request(item)
+            
+            if request_error:
+                return jsonify({"error": f"queries[{position}]: {request_error}"}), 400
+            
+            search_requests.append(search_request)
         
-        for doc in all_documents:
-            if matches_query(query, doc['content']):
-                relevance_score = compute_mock_relevance(query, doc['content'])
-                snippet = extract_snippet(doc['content'], query)
-                
-                result_doc = {
-                    "id": doc['id'],
-                    "title": doc['title'],
-                    "summary": doc['summary'],
-                    "relevance_score": relevance_score,
-                    "snippet": snippet
-                }
-                
-                scored_documents.append(result_doc)
+        # Repeated queries are parsed and scored once, and BM25 term scores
+        # are shared by every query in the batch.
+        parsed_queries: Dict[Tuple[str, str], Tuple[ParsedQuery, Optional[str]]] = {}
+        shared: TermScores = {}
+        segments = live_index.segments()
+        responses = []
         
-        scored_documents.sort(key=lambda x: x['relevance_score'], reverse=True)
+        for query, limit, offset, scoring in search_requests:
+            if (query, scoring) not in parsed_queries:
+                parsed_queries[query, scoring] = correct_spelling(query, parse_query(query), scoring, segments)
+            
+            parsed_query, corrected_query = parsed_queries[query, scoring]
+            results, total = cached_search(parsed_query, limit, offset, scoring, shared, segments)
+            responses.append({
+                "query": query,
+                "corrected_query": corrected_query,
+                "results": results,
+                "count": total,
+                "limit": limit,
+                "offset": offset,
+                "scoring": scoring
+            })
         
-        return jsonify({
-            "query": query,
-            "results": scored_documents,
-            "count": len(scored_documents)
-        }), 200
+        body = b'{"results":[' + b','.join(result_encoder.encode_response(entry) for entry in responses)
+        body += b'],"count":' + dumps(len(responses)) + b'}'
+        
+        return json_response(body), 200
+    
+    except Exception as e:
+        return jsonify({"error": "Internal server error"}), 500
+
+
+def parse_csv_param(value: Optional[str]) -> List[str]:
+    items = [item.strip() for item in (value or '').split(',')]
+    return list(dict.fromkeys(item for item in items if item))
+
+
+@app.route('/api/suggest', methods=['GET', 'OPTIONS'])
+def suggest() -> Tuple[Dict[str, Any], int]:
+    if request.method == 'OPTIONS':
+        return '', 204
+    
+    try:
+        text = request.args.get('q', '')
+        
+        if not text.strip():
+            return jsonify({"error": "q parameter is required"}), 400
+        
+        limit = request.args.get('limit', str(config.Config.SUGGEST_DEFAULT_LIMIT))
+        
+        if not limit.isdigit() or not 1 <= int(limit) <= config.Config.SUGGEST_MAX_LIMIT:
+            return jsonify({"error": f"limit must be an integer between 1 and {config.Config.SUGGEST_MAX_LIMIT}"}), 400
+        
+        # Served from prefix tables built with the index: no scoring and
+        # no document reads, so it can keep up with keystrokes.
+        segments = live_index.segments()
+        parts = suggest_parts(segments)
+        return jsonify({"query": text, **suggest_segments(parts, text, int(limit), segments.statistics.doc_freq)}), 200
+    
+    except Exception as e:
+        return jsonify({"error": "Internal server error"}), 500
+
+
+@app.route('/api/documents', methods=['GET', 'OPTIONS'])
+def get_documents() -> Tuple[Dict[str, Any], int]:
+    if request.method == 'OPTIONS':
+        return '', 204
+    
+    try:
+        document_ids = parse_csv_param(request.args.get('ids'))
+        
+        if not document_ids:
+            return jsonify({"error": "ids parameter is required"}), 400
+        
+        if len(document_ids) > config.Config.DOCUMENT_BATCH_MAX_SIZE:
+            return jsonify({"error": f"At most {config.Config.DOCUMENT_BATCH_MAX_SIZE} documents can be fetched at once"}), 400
+        
+        fields = parse_csv_param(request.args.get('fields')) if 'fields' in request.args else None
+        
+        if fields is not None:
+            unknown = [field for field in fields if field not in DOCUMENT_FIELDS]
+            
+            if unknown or not fields:
+                return jsonify({"error": f"fields must be a comma-separated subset of: {', '.join(DOCUMENT_FIELDS)}"}), 400
+        
+        store = get_store()
+        digest = hashlib.sha1(repr(fields).encode('utf-8'))
+        
+        for document_id in document_ids:
+            digest.update(f"{document_id}:{store.etag(document_id)}\n".encode('utf-8'))
+        
+        etag = digest.hexdigest()
+        
+        if is_not_modified(etag, store.last_modified):
+            return not_modified(etag, store.last_modified, document_cache_control())
+        
+        documents = []
+        missing = []
+        
+        for document_id in document_ids:
+            document = get_document_by_id(document_id, fields)
+            
+            if document is None:
+                missing.append(document_id)
+            else:
+                documents.append(document)
+        
+        response = jsonify({"documents": documents, "missing": missing})
+        
+        return with_validators(response, etag, store.last_modified, document_cache_control()), 200
     
     except Exception as e:
         return jsonify({"error": "Internal server error"}), 500
@@ -76,12 +870,124 @@ def get_document(document_id: str) -> Tuple[Dict[str, Any], int]:
         return '', 204
     
     try:
-        document = get_document_by_id(document_id)
+        store = get_store()
+        etag = store.etag(document_id)
+        # Negotiated before revalidating, so a 304 carries the same
+        # validator strength and Vary as the 200 it refreshes.
+        encoding = negotiate_encoding(request.accept_encodings) if config.Config.COMPRESSION_ENABLED else None
         
-        if document is None:
+        if etag is not None and is_not_modified(etag, store.last_modified):
+            return with_encoding(not_modified(etag, store.last_modified, document_cache_control()), etag, encoding)
+        
+        body = document_body(document_id, etag, encoding) if etag is not None else None
+        
+        if body is None:
             return jsonify({"error": f"Document with ID {document_id} not found"}), 404
         
-        return jsonify(document), 200
+        response = with_validators(json_response(body), etag, store.last_modified, document_cache_control())
+        
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+        
+        return with_encoding(response, etag, encoding), 200
+    
+    except Exception as e:
+        return jsonify({"error": "Internal server error"}), 500
+
+
+@app.route('/api/documents', methods=['POST'])
+def ingest_documents() -> Tuple[Dict[str, Any], int]:
+    auth_error = check_ingest_token()
+    
+    if auth_error:
+        return auth_error
+    
+    try:
+        data = request.get_json(silent=True)
+        
+        if not data:
+            return jsonify({"error": "Request body is required"}), 400
+        
+        if not isinstance(data, dict):
+            return jsonify({"error": "Invalid request format"}), 400
+        
+        documents = data.get('documents')
+        
+        if not isinstance(documents, list) or not documents:
+            return jsonify({"error": "documents must be a non-empty list"}), 400
+        
+        if len(documents) > config.Config.DOCUMENT_BATCH_MAX_SIZE:
+            return jsonify({"error": f"At most {config.Config.DOCUMENT_BATCH_MAX_SIZE} documents can be ingested at once"}), 400
+        
+        entries = []
+        
+        for position, item in enumerate(documents):
+            document, document_error = parse_document(item)
+            
+            if document_error:
+                return jsonify({"error": f"documents[{position}]: {document_error}"}), 400
+            
+            entries.append({"op": "put", "document": document})
+        
+        created = ingest(entries)
+        
+        return jsonify({
+            "results": [
+                {"id": entry['document']['id'], "status": "created" if is_new else "updated"}
+                for entry, is_new in zip(entries, created)
+            ],
+            "count": len(entries),
+            "version": live_index.version
+        }), 200
+    
+    except Exception as e:
+        return jsonify({"error": "Internal server error"}), 500
+
+
+@app.route('/api/documents/<document_id>', methods=['PUT'])
+def put_document(document_id: str) -> Tuple[Dict[str, Any], int]:
+    auth_error = check_ingest_token()
+    
+    if auth_error:
+        return auth_error
+    
+    try:
+        data = request.get_json(silent=True)
+        
+        if not data:
+            return jsonify({"error": "Request body is required"}), 400
+        
+        document, document_error = parse_document(data, document_id)
+        
+        if document_error:
+            return jsonify({"error": document_error}), 400
+        
+        created = ingest([{"op": "put", "document": document}])[0]
+        
+        return jsonify({
+            "id": document_id,
+            "status": "created" if created else "updated",
+            "version": live_index.version
+        }), 201 if created else 200
+    
+    except Exception as e:
+        return jsonify({"error": "Internal server error"}), 500
+
+
+@app.route('/api/documents/<document_id>', methods=['DELETE'])
+def delete_document(document_id: str) -> Tuple[Dict[str, Any], int]:
+    auth_error = check_ingest_token()
+    
+    if auth_error:
+        return auth_error
+    
+    try:
+        if document_id not in get_store():
+            return jsonify({"error": f"Document with ID {document_id} not found"}), 404
+        
+        ingest([{"op": "delete", "id": document_id}])
+        
+        return jsonify({"id": document_id, "status": "deleted", "version": live_index.version}), 200
     
     except Exception as e:
         return jsonify({"error": "Internal server error"}), 500
@@ -95,6 +1001,53 @@ def health_check() -> Tuple[Dict[str, str], int]:
     return jsonify({"status": "ok"}), 200
 
 
+@app.route('/api/stats', methods=['GET', 'OPTIONS'])
+def worker_stats() -> Tuple[Dict[str, Any], int]:
+    if request.method == 'OPTIONS':
+        return '', 204
+    
+    return jsonify({
+        "pid": os.getpid(),
+        "documents": len(live_index),
+        "index": live_index.stats(),
+        "backend": search_backend(),
+        "cache": search_cache.stats(),
+        "memory": process_memory()
+    }), 200
+
+
+@app.after_request
+def compress_response(response: Response) -> Response:
+    revalidated = response.status_code == 304
+    if (
+        not config.Config.COMPRESSION_ENABLED
+        or not (revalidated or response.status_code == 200 and response.mimetype == 'application/json')
+        or response.is_streamed
+        or response.direct_passthrough
+        or 'Content-Encoding' in response.headers
+    ):
+        return response
+    
+    encoding = negotiate_encoding(request.accept_encodings)
+    etag, _ = response.get_etag()
+    
+    # The ETag is weak whenever an encoding is negotiated, whether or not
+    # the body turns out large enough to compress, so that a 304 (which
+    # has no body to measure) can carry the same validator as its 200.
+    if etag:
+        with_encoding(response, etag, encoding)
+    else:
+        response.vary.add('Accept-Encoding')
+    
+    if revalidated or encoding is None or (response.content_length or 0) < config.Config.COMPRESSION_MIN_SIZE:
+        return response
+    
+    response.set_data(compress(response.get_data(), encoding))
+    response.headers['Content-Encoding'] = encoding
+    
+    return response
+
+
 @app.errorhandler(404)
 def not_found(error) -> Tuple[Dict[str, str], int]:
     return jsonify({"error": "Endpoint not found"}), 404
@@ -111,6 +1064,7 @@ def internal_error(error) -> Tuple[Dict[str, str], int]:
 
 
 if __name__ == '__main__':
+    start_shard_pool()
     app.run(
         host=config.Config.HOST,
         port=config.Config.PORT,
@@ -0,0 +1,195 @@
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
+import config
+from app import app, start_shard_pool
+
+
+Scope = Dict[str, Any]
+Message = Dict[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+
+WSGIApp = Callable[[Dict[str, Any], Callable[..., Any]], Iterable[bytes]]
+
+# Repeated headers are joined with a comma, except cookies (RFC 6265, 5.4).
+COOKIE_SEPARATOR = '; '
+
+
+class Disconnected:
+    pass
+
+
+# Returned by `_read_body` when the client goes away before the whole body
+# has arrived; there is nobody left to answer.
+DISCONNECTED = Disconnected()
+
+
+def build_environ(scope: Scope, body: bytes) -> Dict[str, Any]:
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+
+    environ: Dict[str, Any] = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+            continue
+        if name == 'CONTENT_LENGTH':
+            continue
+
+        key = f"HTTP_{name}"
+        separator = COOKIE_SEPARATOR if name == 'COOKIE' else ','
+        environ[key] = f"{environ[key]}{separator}{value}" if key in environ else value
+
+    return environ
+
+
+class ASGIBridge:
+    # Serves a WSGI app over ASGI. The event loop owns the sockets, so slow
+    # clients only cost a coroutine; the Flask handlers (and the search work
+    # inside them) run on a bounded thread pool.
+
+    def __init__(
+        self,
+        wsgi_app: WSGIApp,
+        max_workers: int = 8,
+        max_body_size: int = 1024 * 1024,
+        on_startup: Optional[Callable[[], None]] = None
+    ) -> None:
+        self.wsgi_app = wsgi_app
+        self.max_body_size = max_body_size
+        self.on_startup = on_startup
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='asgi')
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+        body = await self._read_body(receive)
+
+        if isinstance(body, Disconnected):
+            return
+        if body is None:
+            await self._send_error(send, 413, b'{"error":"Request body too large"}\n')
+            return
+
+        await self._run(build_environ(scope, body), send)
+
+    async def _read_body(self, receive: Receive) -> Union[bytes, Disconnected, None]:
+        chunks: List[bytes] = []
+        size = 0
+
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return DISCONNECTED
+
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > self.max_body_size:
+                return None
+
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                return b''.join(chunks)
+
+    async def _run(self, environ: Dict[str, Any], send: Send) -> None:
+        loop = asyncio.get_running_loop()
+        started: Dict[str, Any] = {}
+        written: List[bytes] = []
+
+        def start_response(status: str, headers: List[Tuple[str, str]], exc_info: Any = None) -> Callable[[bytes], None]:
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+            return written.append
+
+        def call_app() -> Tuple[Iterable[bytes], Optional[bytes]]:
+            iterable = self.wsgi_app(environ, start_response)
+            # Bodies with a known length are complete already; drain them in
+            # the same hop instead of one executor round trip per chunk.
+            if any(name == b'content-length' for name, _ in started['headers']):
+                try:
+                    return iterable, b''.join(written) + b''.join(iterable)
+                finally:
+                    _close(iterable)
+            return iterable, None
+
+        iterable, body = await loop.run_in_executor(self.executor, call_app)
+        await send({'type': 'http.response.start', 'status': started['status'], 'headers': started['headers']})
+
+        if body is not None:
+            await send({'type': 'http.response.body', 'body': body, 'more_body': False})
+            return
+
+        # Streamed responses: pull one chunk at a time off the pool and send
+        # it as soon as it's ready.
+        iterator = iter(iterable)
+        try:
+            if written:
+                await send({'type': 'http.response.body', 'body': b''.join(written), 'more_body': True})
+            while True:
+                chunk = await loop.run_in_executor(self.executor, next, iterator, None)
+                if chunk is None:
+                    break
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            await loop.run_in_executor(self.executor, _close, iterable)
+
+    async def _send_error(self, send: Send, status: int, body: bytes) -> None:
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode('latin-1'))]
+        })
+        await send({'type': 'http.response.body', 'body': body, 'more_body': False})
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # Runs before the handler pool has started any thread.
+                if self.on_startup is not None:
+                    self.on_startup()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def _close(iterable: Iterable[bytes]) -> None:
+    close = getattr(iterable, 'close', None)
+    if close is not None:
+        close()
+
+
+application = ASGIBridge(app, config.Config.ASGI_THREADS, config.Config.ASGI_MAX_BODY_SIZE, start_shard_pool)
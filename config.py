@@ -11,6 +11,34 @@ class Config:
     FRONTEND_URL: str = os.getenv('FRONTEND_URL', '*')
     DEBUG: bool = os.getenv('DEBUG', 'False').lower() == 'true'
     FLASK_ENV: str = os.getenv('FLASK_ENV', 'production')
+    SEARCH_DEFAULT_LIMIT: int = int(os.getenv('SEARCH_DEFAULT_LIMIT', '10'))
+    SEARCH_MAX_LIMIT: int = int(os.getenv('SEARCH_MAX_LIMIT', '100'))
+    SEARCH_SCORING_MODE: str = os.getenv('SEARCH_SCORING_MODE', 'legacy')
+    SEARCH_CACHE_SIZE: int = int(os.getenv('SEARCH_CACHE_SIZE', '1024'))
+    SEARCH_CACHE_TTL: float = float(os.getenv('SEARCH_CACHE_TTL', '0'))
+    SEARCH_BACKEND: str = os.getenv('SEARCH_BACKEND', 'python')
+    SEARCH_PASSAGES: bool = os.getenv('SEARCH_PASSAGES', 'False').lower() == 'true'
+    SEARCH_SHARDS: int = int(os.getenv('SEARCH_SHARDS', '0'))
+    SEARCH_BATCH_MAX_SIZE: int = int(os.getenv('SEARCH_BATCH_MAX_SIZE', '100'))
+    SUGGEST_DEFAULT_LIMIT: int = int(os.getenv('SUGGEST_DEFAULT_LIMIT', '5'))
+    SUGGEST_MAX_LIMIT: int = int(os.getenv('SUGGEST_MAX_LIMIT', '10'))
+    SPELLING_CORRECTION: bool = os.getenv('SPELLING_CORRECTION', 'True').lower() == 'true'
+    DOCUMENT_STORE: str = os.getenv('DOCUMENT_STORE', '')
+    DOCUMENT_CACHE_SIZE: int = int(os.getenv('DOCUMENT_CACHE_SIZE', '256'))
+    DOCUMENT_CACHE_MAX_AGE: int = int(os.getenv('DOCUMENT_CACHE_MAX_AGE', '3600'))
+    DOCUMENT_BATCH_MAX_SIZE: int = int(os.getenv('DOCUMENT_BATCH_MAX_SIZE', '100'))
+    ASGI_THREADS: int = int(os.getenv('ASGI_THREADS', '8'))
+    ASGI_MAX_BODY_SIZE: int = int(os.getenv('ASGI_MAX_BODY_SIZE', str(1024 * 1024)))
+    COMPRESSION_ENABLED: bool = os.getenv('COMPRESSION_ENABLED', 'True').lower() == 'true'
+    COMPRESSION_MIN_SIZE: int = int(os.getenv('COMPRESSION_MIN_SIZE', '512'))
+    COMPRESSION_PRELOAD: bool = os.getenv('COMPRESSION_PRELOAD', 'True').lower() == 'true'
+    COMPRESSED_BODY_CACHE_SIZE: int = int(os.getenv('COMPRESSED_BODY_CACHE_SIZE', '1024'))
+    INDEX_SNAPSHOT: str = os.getenv('INDEX_SNAPSHOT', '')
+    INGEST_TOKEN: str = os.getenv('INGEST_TOKEN', '')
+    INGEST_JOURNAL: str = os.getenv('INGEST_JOURNAL', '')
+    INGEST_JOURNAL_COMPACT_SIZE: int = int(os.getenv('INGEST_JOURNAL_COMPACT_SIZE', '16777216'))
+    INGEST_MERGE_THRESHOLD: int = int(os.getenv('INGEST_MERGE_THRESHOLD', '100'))
+    INGEST_MERGE_RATIO: float = float(os.getenv('INGEST_MERGE_RATIO', '0.1'))
     
     @classmethod
     def get_cors_origins(cls) -> str | List[str]:
@@ -0,0 +1,44 @@
+import gc
+import os
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '3001')}"
+workers = int(os.getenv('WEB_CONCURRENCY', '4'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+
+# `uvicorn.workers.UvicornWorker` serves asgi:application; each worker then
+# holds many connections on its event loop instead of one per process.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+
+# Import app.py (corpus, normalized documents, index) once in the master so
+# forked workers share those pages copy-on-write instead of building their own.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True').lower() == 'true'
+
+
+def when_ready(server):
+    if preload_app:
+        # An index snapshot leaves the corpus unnormalized in the master, and
+        # legacy scoring would then normalize it again in every worker.
+        from src.documents import get_store
+        get_store().preload_normalized()
+        # Move everything loaded so far out of the collector's reach; otherwise
+        # the first collection in each worker writes to every object header and
+        # un-shares the pages.
+        gc.collect()
+        gc.freeze()
+
+
+def on_starting(server):
+    # Without a journal, a change only reaches the worker that received it,
+    # so the others would keep serving the old documents.
+    import config
+    if server.cfg.workers > 1 and config.Config.INGEST_TOKEN and not config.Config.INGEST_JOURNAL:
+        raise RuntimeError("INGEST_TOKEN requires INGEST_JOURNAL when running more than one worker")
+
+
+def post_fork(server, worker):
+    # The worker is still single-threaded here, so it is the one safe place
+    # to fork the shard scoring pool. Without preload this is also where
+    # the app is first imported.
+    from app import start_shard_pool
+    start_shard_pool()
@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class QueryCache:
+    def __init__(self, capacity: int = 1024, ttl: float = 0.0) -> None:
+        self.capacity = capacity
+        self.ttl = ttl
+        self.version: Any = None
+        self._entries: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, version: Any = None) -> Optional[Any]:
+        with self._lock:
+            self._sync_version(version)
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+
+            stored_at, value = entry
+            if self.ttl and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self._counters["expirations"] += 1
+                self._counters["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, version: Any = None) -> None:
+        if self.capacity <= 0:
+            return
+
+        with self._lock:
+            self._sync_version(version)
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._counters["invalidations"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "size": len(self._entries),
+                "capacity": self.capacity,
+                "ttl": self.ttl,
+                "hit_rate": round(self._counters["hits"] / lookups, 3) if lookups else 0.0
+            }
+
+    def _sync_version(self, version: Any) -> None:
+        # Entries computed against an older corpus are dropped as soon as a
+        # caller presents a newer corpus version.
+        if version != self.version:
+            if self._entries:
+                self._entries.clear()
+                self._counters["invalidations"] += 1
+            self.version = version
@@ -0,0 +1,38 @@
+import gzip
+from typing import Optional, Sequence, Tuple
+from werkzeug.datastructures import Accept
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+ENCODING_BROTLI = 'br'
+ENCODING_GZIP = 'gzip'
+SUPPORTED_ENCODINGS: Tuple[str, ...] = (ENCODING_BROTLI, ENCODING_GZIP) if brotli is not None else (ENCODING_GZIP,)
+
+# Bodies compressed once and cached can afford the slowest settings;
+# per-response compression trades ratio for latency.
+STORED_LEVELS = {ENCODING_BROTLI: 11, ENCODING_GZIP: 9}
+DYNAMIC_LEVELS = {ENCODING_BROTLI: 5, ENCODING_GZIP: 6}
+
+
+def negotiate_encoding(accept_encodings: Accept, supported: Sequence[str] = SUPPORTED_ENCODINGS) -> Optional[str]:
+    # Ties in client quality go to the first (best compressing) encoding.
+    return accept_encodings.best_match(supported)
+
+
+def compress(body: bytes, encoding: Optional[str], stored: bool = False) -> bytes:
+    if encoding is None:
+        return body
+
+    level = (STORED_LEVELS if stored else DYNAMIC_LEVELS)[encoding]
+
+    if encoding == ENCODING_BROTLI:
+        return brotli.compress(body, quality=level)
+    if encoding == ENCODING_GZIP:
+        # A fixed mtime keeps the output, and so cached copies, deterministic.
+        return gzip.compress(body, compresslevel=level, mtime=0)
+
+    raise ValueError(f"Unsupported content encoding: {encoding}")
@@ -1,4 +1,17 @@
-from typing import Dict, List, Optional
+import re
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from src.store import DocumentStore
+
+
+TOKEN_PATTERN = re.compile(r"\w+")
+# Paragraphs are separated by blank lines.
+PASSAGE_BREAK_PATTERN = re.compile(r"\n\s*\n")
+
+DOCUMENT_FIELDS = ('id', 'title', 'summary', 'content', 'relevance_score')
 
 
 LEGAL_DOCUMENTS: Dict[str, Dict[str, any]] = {
@@ -193,9 +206,106 @@ Operating agreements for LLCs and partnership agreements should address capital
 }
 
 
+_store: Optional['DocumentStore'] = None
+
+
+def get_store() -> 'DocumentStore':
+    global _store
+    if _store is None:
+        from src.store import MemoryStore
+        _store = MemoryStore(LEGAL_DOCUMENTS)
+    return _store
+
+
+def set_store(store: 'DocumentStore') -> None:
+    global _store
+    _store = store
+
+
 def get_all_documents() -> List[Dict[str, any]]:
-    return list(LEGAL_DOCUMENTS.values())
+    return list(get_store())
+
+
+def get_document_by_id(document_id: str, fields: Optional[Sequence[str]] = None) -> Optional[Dict[str, any]]:
+    store = get_store()
+
+    if fields is None:
+        return store.get(document_id)
+
+    # Metadata is held in memory; only touch the content when it's asked for.
+    document = store.get(document_id) if 'content' in fields else store.metadata(document_id)
+    if document is None:
+        return None
+
+    return {"id": document_id, **{field: document[field] for field in fields if field in document}}
+
+
+@dataclass(frozen=True)
+class NormalizedDocument:
+    id: str
+    title: str
+    summary: str
+    content: str
+    text: str
+    tokens: List[str]
+    offsets: List[Tuple[int, int]]
+    # [start, end) token ranges of the document's paragraphs.
+    passages: List[Tuple[int, int]]
+
+    @property
+    def length(self) -> int:
+        return len(self.tokens)
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def normalize_document(document: Dict[str, Any]) -> NormalizedDocument:
+    text = document['content'].lower()
+    tokens: List[str] = []
+    offsets: List[Tuple[int, int]] = []
+
+    for match in TOKEN_PATTERN.finditer(text):
+        tokens.append(match.group())
+        offsets.append(match.span())
+
+    return NormalizedDocument(
+        id=document['id'],
+        title=document['title'],
+        summary=document['summary'],
+        content=document['content'],
+        text=text,
+        tokens=tokens,
+        offsets=offsets,
+        passages=split_passages(text, offsets)
+    )
+
+
+def split_passages(text: str, offsets: Sequence[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    starts = [start for start, _ in offsets]
+    passages: List[Tuple[int, int]] = []
+    first = 0
+
+    for match in PASSAGE_BREAK_PATTERN.finditer(text):
+        last = bisect_left(starts, match.end(), first)
+        if last > first:
+            passages.append((first, last))
+            first = last
+
+    if first < len(offsets):
+        passages.append((first, len(offsets)))
+
+    return passages
+
+
+def get_normalized_documents() -> List[NormalizedDocument]:
+    return list(get_store().iter_normalized())
+
+
+def iter_normalized_documents() -> Iterator[NormalizedDocument]:
+    return get_store().iter_normalized()
 
 
-def get_document_by_id(document_id: str) -> Optional[Dict[str, any]]:
-    return LEGAL_DOCUMENTS.get(document_id)
+def get_normalized_document(document_id: str) -> Optional[NormalizedDocument]:
+    return get_store().normalized(document_id)
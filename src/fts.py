@@ -0,0 +1,192 @@
+import argparse
+import sqlite3
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+from src.documents import tokenize
+from src.query import Clause, Near, Node, ParsedQuery, Phrase, Term
+from src.snippets import ELLIPSIS
+from src.store import DocumentStore, ReadOnlyConnections, SqliteStore
+
+
+SEARCH_BACKEND_FTS = 'fts5'
+FTS_TABLE = 'documents_fts'
+# Matches TOKEN_PATTERN (\w+): letters, digits and underscores, case-folded,
+# accents kept.
+FTS_TOKENIZER = "unicode61 remove_diacritics 0 tokenchars '_'"
+SNIPPET_TOKENS = 32
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+
+COUNT_SQL = f"SELECT count(*), min(rank) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ?"
+PAGE_SQL = (
+    f"SELECT d.id, d.title, d.summary, rank, "
+    f"snippet({FTS_TABLE}, 0, char(2), char(3), ?, {SNIPPET_TOKENS}) "
+    f"FROM {FTS_TABLE} JOIN documents AS d ON d.rowid = {FTS_TABLE}.rowid "
+    f"WHERE {FTS_TABLE} MATCH ? ORDER BY rank, {FTS_TABLE}.rowid LIMIT ? OFFSET ?"
+)
+
+
+class FtsError(Exception):
+    pass
+
+
+def fts5_available(connection: sqlite3.Connection) -> bool:
+    options = {row[0] for row in connection.execute("PRAGMA compile_options")}
+    return 'ENABLE_FTS5' in options
+
+
+def create_fts_index(connection: sqlite3.Connection) -> None:
+    # An external-content table: the text lives once, in `documents`, and
+    # FTS5 keeps only the inverted index next to it.
+    connection.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    connection.execute(
+        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+        f"content, content='documents', content_rowid='rowid', tokenize=\"{FTS_TOKENIZER}\")"
+    )
+    connection.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def match_expression(node: Node) -> Optional[str]:
+    # Translates a parsed query into FTS5 syntax, or None when FTS5 can't
+    # express it with the same matching rules.
+    if isinstance(node, Term):
+        tokens = tokenize(node.text)
+        if len(tokens) > 1:
+            return '(' + ' OR '.join(_quoted(token) for token in tokens) + ')'
+        return _quoted(tokens[0]) if tokens else None
+
+    if isinstance(node, Phrase):
+        return _quoted(' '.join(node.tokens)) if node.tokens else None
+
+    if isinstance(node, Near):
+        left, right = _near_operand(node.left), _near_operand(node.right)
+        if left is None or right is None:
+            return None
+        return f"NEAR({left} {right}, {node.distance})"
+
+    positive = [match_expression(child) for child in node.must or node.should]
+    if not positive or None in positive:
+        return None
+
+    expression = '(' + (' AND ' if node.must else ' OR ').join(positive) + ')'
+    for child in node.must_not:
+        negative = match_expression(child)
+        if negative is None:
+            return None
+        expression = f"({expression} NOT {negative})"
+
+    return expression
+
+
+def _near_operand(clause: Clause) -> Optional[str]:
+    # Multi-token terms match as phrases inside NEAR, as in clause_spans.
+    if isinstance(clause, Term):
+        tokens = tokenize(clause.text)
+        return _quoted(' '.join(tokens)) if tokens else None
+    if isinstance(clause, Phrase):
+        return match_expression(clause)
+    return None
+
+
+def _quoted(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+
+def split_highlights(marked: str) -> Tuple[str, List[List[int]]]:
+    snippet: List[str] = []
+    highlights: List[List[int]] = []
+    length = 0
+
+    for part in marked.split(HIGHLIGHT_START):
+        highlighted, _, rest = part.rpartition(HIGHLIGHT_END)
+        if highlighted:
+            if highlights and highlights[-1][1] == length:
+                highlights[-1][1] = length + len(highlighted)
+            else:
+                highlights.append([length, length + len(highlighted)])
+            snippet.append(highlighted)
+            length += len(highlighted)
+        snippet.append(rest)
+        length += len(rest)
+
+    return ''.join(snippet), highlights
+
+
+class FtsSearcher:
+    def __init__(self, path: str, version: int = 0) -> None:
+        self.path = path
+        # The live index version the FTS table reflects; once documents are
+        # ingested the table is stale and queries go to the live index.
+        self.version = version
+        self.connections = ReadOnlyConnections(path)
+
+        try:
+            self.connections.get().execute(f"SELECT rowid FROM {FTS_TABLE} LIMIT 0")
+        except sqlite3.OperationalError as error:
+            raise FtsError(f"{path} has no full-text index; build it with: python -m src.fts build {path}") from error
+
+    def search(
+        self,
+        query: ParsedQuery,
+        limit: int,
+        offset: int = 0
+    ) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+        expression = match_expression(query.root) if query.root is not None else None
+        if expression is None:
+            return None
+
+        connection = self.connections.get()
+        total, best_rank = connection.execute(COUNT_SQL, (expression,)).fetchone()
+        if not total:
+            return [], 0
+
+        results = []
+        # FTS5 ranks are negated BM25 scores; dividing by the best keeps
+        # relevance_score in its documented 0.0-1.0 range.
+        for document_id, title, summary, rank, marked in connection.execute(
+            PAGE_SQL, (ELLIPSIS, expression, limit, offset)
+        ):
+            snippet, highlights = split_highlights(marked)
+            results.append({
+                "id": document_id,
+                "title": title,
+                "summary": summary,
+                "relevance_score": round(rank / best_rank, 3),
+                "snippet": snippet,
+                "highlights": highlights
+            })
+
+        return results, total
+
+
+def open_fts_searcher(store: DocumentStore, version: int = 0) -> FtsSearcher:
+    if not isinstance(store, SqliteStore):
+        raise FtsError(f"The {SEARCH_BACKEND_FTS} search backend needs a sqlite: DOCUMENT_STORE")
+    return FtsSearcher(store.path, version)
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog='python -m src.fts', description="Build the FTS5 index of a SQLite store.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help="(Re)build the full-text index from the documents table.")
+    build.add_argument('path', help="SQLite database written by `python -m src.store export sqlite:PATH`.")
+
+    args = parser.parse_args(argv)
+    connection = sqlite3.connect(args.path)
+
+    if not fts5_available(connection):
+        print("This SQLite build has no FTS5 support", file=sys.stderr)
+        return 1
+
+    with connection:
+        create_fts_index(connection)
+        count = connection.execute(f"SELECT count(*) FROM {FTS_TABLE}").fetchone()[0]
+    connection.close()
+
+    print(f"Indexed {count} documents into {FTS_TABLE} in {args.path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
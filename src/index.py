@@ -0,0 +1,90 @@
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Set
+from src.documents import NormalizedDocument, tokenize
+
+
+MAX_CACHED_EXPANSIONS = 4096
+
+
+class InvertedIndex:
+    def __init__(
+        self,
+        postings: Optional[Mapping[str, Mapping[int, int]]] = None,
+        doc_ids: Optional[List[str]] = None,
+        doc_lengths: Optional[Sequence[int]] = None,
+        positions: Optional[Mapping[str, Mapping[int, Sequence[int]]]] = None
+    ) -> None:
+        self.postings: Mapping[str, Mapping[int, int]] = postings if postings is not None else {}
+        self.positions: Mapping[str, Mapping[int, Sequence[int]]] = positions if positions is not None else {}
+        self.doc_ids: List[str] = doc_ids if doc_ids is not None else []
+        self.doc_lengths: Sequence[int] = doc_lengths if doc_lengths is not None else []
+        self.total_length = sum(self.doc_lengths)
+        self.version = len(self.doc_ids)
+        self._expansions: Dict[str, List[str]] = {}
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[NormalizedDocument]) -> 'InvertedIndex':
+        index = cls()
+        for document in documents:
+            index.add_document(document.id, document.tokens)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    @property
+    def average_length(self) -> float:
+        return self.total_length / len(self.doc_ids) if self.doc_ids else 0.0
+
+    def doc_freq(self, term: str) -> int:
+        return len(self.postings.get(term, ()))
+
+    def add_document(self, doc_id: str, tokens: List[str]) -> None:
+        ordinal = len(self.doc_ids)
+        self.doc_ids.append(doc_id)
+        self.doc_lengths.append(len(tokens))
+        self.total_length += len(tokens)
+        self.version += 1
+
+        for position, term in enumerate(tokens):
+            term_postings = self.postings.setdefault(term, {})
+            term_postings[ordinal] = term_postings.get(ordinal, 0) + 1
+            self.positions.setdefault(term, {}).setdefault(ordinal, []).append(position)
+
+        self._expansions.clear()
+
+    def expand_term(self, term: str) -> List[str]:
+        # Search matches query terms as substrings ("contract" hits "contractual"),
+        # so a term maps to every vocabulary entry containing it.
+        expansion = self._expansions.get(term)
+        if expansion is None:
+            expansion = [vocabulary_term for vocabulary_term in self.postings if term in vocabulary_term]
+            if len(self._expansions) >= MAX_CACHED_EXPANSIONS:
+                self._expansions.clear()
+            self._expansions[term] = expansion
+        return expansion
+
+    def candidates(self, query_terms: Sequence[str]) -> List[str]:
+        ordinals: Set[int] = set()
+
+        for term in query_terms:
+            ordinals.update(self.term_ordinals(term))
+
+        return [self.doc_ids[ordinal] for ordinal in sorted(ordinals)]
+
+    def term_ordinals(self, term: str) -> Set[int]:
+        parts = tokenize(term)
+
+        if not parts:
+            return set(range(len(self.doc_ids)))
+
+        matched: Set[int] = set()
+        for position, part in enumerate(parts):
+            part_ordinals: Set[int] = set()
+            for vocabulary_term in self.expand_term(part):
+                part_ordinals.update(self.postings[vocabulary_term])
+
+            matched = part_ordinals if position == 0 else matched & part_ordinals
+            if not matched:
+                break
+
+        return matched
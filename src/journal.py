@@ -0,0 +1,142 @@
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+from src.serialization import dumps
+
+
+Entry = Dict[str, Any]
+Apply = Callable[[Sequence[Entry]], List[Any]]
+
+
+def entry_id(entry: Entry) -> str:
+    return entry['id'] if entry['op'] == 'delete' else entry['document']['id']
+
+
+class IngestJournal:
+    # Append-only JSONL log of ingested changes, shared by every worker on
+    # the host. A worker applies its own writes directly and picks up other
+    # workers' writes by replaying whatever was appended since its last read;
+    # on startup the whole log is replayed over the backing store. Once the
+    # log outgrows `compact_size` and twice its size after the last
+    # compaction, it is rewritten with only the last entry per document.
+
+    def __init__(self, path: str, compact_size: int = 0) -> None:
+        self.path = path
+        self.compact_size = compact_size
+        self.offset = 0
+        # The log file being read: compaction replaces it with a new one.
+        self.inode: Optional[int] = None
+        self._compacted_size = 0
+        self._lock = threading.Lock()
+
+    def append(self, entries: Sequence[Entry], apply: Apply) -> List[Any]:
+        with self._lock, self._locked('ab+', fcntl.LOCK_EX) as handle:
+            # Catch up first, so changes are applied in log order.
+            self._replay(handle, apply)
+            handle.write(b''.join(dumps(entry) + b"\n" for entry in entries))
+            handle.flush()
+            os.fsync(handle.fileno())
+            self.offset = handle.tell()
+            results = apply(entries)
+            if self._should_compact():
+                self._compact(handle)
+            return results
+
+    def replay(self, apply: Apply) -> int:
+        # A stat per request is the whole cost when nothing changed.
+        try:
+            status = os.stat(self.path)
+        except FileNotFoundError:
+            return 0
+        if status.st_ino == self.inode and status.st_size == self.offset:
+            return 0
+
+        with self._lock, self._locked('rb', fcntl.LOCK_SH) as handle:
+            return self._replay(handle, apply)
+
+    def compact(self, apply: Apply) -> bool:
+        if not os.path.exists(self.path):
+            return False
+
+        with self._lock, self._locked('ab+', fcntl.LOCK_EX) as handle:
+            self._replay(handle, apply)
+            if not self._should_compact():
+                return False
+            self._compact(handle)
+            return True
+
+    @contextmanager
+    def _locked(self, mode: str, operation: int) -> Iterator[Any]:
+        while True:
+            handle = open(self.path, mode)
+            fcntl.flock(handle, operation)
+            inode = os.fstat(handle.fileno()).st_ino
+            try:
+                current = os.stat(self.path).st_ino
+            except FileNotFoundError:
+                current = None
+            if inode == current:
+                break
+            # Compacted while this process waited for the lock: the file
+            # it holds is no longer the log.
+            fcntl.flock(handle, fcntl.LOCK_UN)
+            handle.close()
+
+        try:
+            if inode != self.inode:
+                # Another worker compacted the log. Every change read so far
+                # is in the new file too, and applying a document's last
+                # entry again leaves the same state, so read it from the top.
+                if self.inode is not None:
+                    self._compacted_size = os.fstat(handle.fileno()).st_size
+                self.inode = inode
+                self.offset = 0
+            yield handle
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+            handle.close()
+
+    def _should_compact(self) -> bool:
+        return bool(self.compact_size) and self.offset > max(self.compact_size, 2 * self._compacted_size)
+
+    def _compact(self, handle: Any) -> None:
+        # Called with the exclusive lock held and every entry applied.
+        handle.seek(0)
+        latest: Dict[str, bytes] = {}
+        for line in handle:
+            if not line.endswith(b"\n") or not line.strip():
+                continue
+            key = entry_id(json.loads(line))
+            latest.pop(key, None)
+            latest[key] = line
+
+        temporary = f"{self.path}.compact"
+        with open(temporary, 'wb') as compacted:
+            compacted.write(b''.join(latest.values()))
+            compacted.flush()
+            os.fsync(compacted.fileno())
+            status = os.fstat(compacted.fileno())
+        os.replace(temporary, self.path)
+
+        self.inode = status.st_ino
+        self.offset = self._compacted_size = status.st_size
+
+    def _replay(self, handle: Any, apply: Apply) -> int:
+        handle.seek(self.offset)
+        entries: List[Entry] = []
+        offset = self.offset
+
+        for line in handle:
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            if line.strip():
+                entries.append(json.loads(line))
+
+        if entries:
+            apply(entries)
+        self.offset = offset
+        return len(entries)
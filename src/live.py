@@ -0,0 +1,395 @@
+import logging
+import threading
+import weakref
+from dataclasses import dataclass, field
+from typing import Callable, Dict, FrozenSet, Generic, List, Optional, Sequence, Set, Tuple, TypeVar
+from src.index import InvertedIndex
+from src.query import ParsedQuery
+from src.scoring import SCORING_BM25, SCORING_LEGACY
+from src.search import bm25_entries, score_legacy
+from src.shards import ShardResult, merge_shard_results
+
+
+logger = logging.getLogger(__name__)
+
+# (document id, tokens) for an upsert, (document id, None) for a delete.
+Change = Tuple[str, Optional[List[str]]]
+# A segment and the ordinals of its documents that were deleted or replaced.
+Part = Tuple[InvertedIndex, FrozenSet[int]]
+
+Value = TypeVar('Value')
+
+
+class SegmentStatistics:
+    # Corpus-wide BM25 statistics over several segments, minus their deleted
+    # documents; the same numbers a rebuilt index would report.
+
+    def __init__(self, parts: Sequence[Part]) -> None:
+        self.parts = parts
+        self.document_count = sum(len(index) - len(deleted) for index, deleted in parts)
+        self.total_length = sum(
+            index.total_length - sum(index.doc_lengths[ordinal] for ordinal in deleted)
+            for index, deleted in parts
+        )
+        self._doc_freqs: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return self.document_count
+
+    @property
+    def average_length(self) -> float:
+        return self.total_length / len(self) if len(self) else 0.0
+
+    def doc_freq(self, term: str) -> int:
+        doc_freq = self._doc_freqs.get(term)
+        if doc_freq is None:
+            doc_freq = 0
+            for index, deleted in self.parts:
+                postings = index.postings.get(term, {})
+                if deleted and postings:
+                    # Probe from the smaller side.
+                    if len(deleted) < len(postings):
+                        doc_freq -= sum(1 for ordinal in deleted if ordinal in postings)
+                    else:
+                        doc_freq -= sum(1 for ordinal in postings if ordinal in deleted)
+                doc_freq += len(postings)
+            self._doc_freqs[term] = doc_freq
+        return doc_freq
+
+
+@dataclass(frozen=True)
+class Segments:
+    base: InvertedIndex
+    tombstones: FrozenSet[int]
+    deltas: Tuple[Part, ...]
+    version: int
+    deleted_ids: FrozenSet[str] = field(init=False)
+    statistics: SegmentStatistics = field(init=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, 'deleted_ids', frozenset(self.base.doc_ids[ordinal] for ordinal in self.tombstones))
+        object.__setattr__(self, 'statistics', SegmentStatistics(self.parts))
+
+    @property
+    def parts(self) -> Tuple[Part, ...]:
+        return ((self.base, self.tombstones), *self.deltas)
+
+    @property
+    def pending(self) -> bool:
+        return bool(self.tombstones) or bool(self.deltas)
+
+    @property
+    def delta_documents(self) -> int:
+        return sum(len(delta) - len(deleted) for delta, deleted in self.deltas)
+
+    def __len__(self) -> int:
+        return len(self.statistics)
+
+
+class LiveIndex:
+    # An immutable base index plus delta segments of documents added or
+    # replaced since the last merge, and tombstones for documents that were
+    # deleted or replaced. Writers publish a new Segments object with a
+    # single assignment, so readers never wait. Each write adds a segment
+    # holding just its own documents; a segment is folded into the one
+    # before it once that one is no larger, so a document is copied a
+    # logarithmic number of times before the next full merge. Full merges
+    # fold every delta into a new base on a background thread once the
+    # pending changes reach `merge_threshold`, or `merge_ratio` of the base.
+
+    def __init__(
+        self,
+        base: InvertedIndex,
+        merge_threshold: int = 1,
+        on_merge: Optional[Callable[[InvertedIndex, Segments], None]] = None,
+        merge_ratio: float = 0.0
+    ) -> None:
+        self.merge_threshold = max(1, merge_threshold)
+        self.merge_ratio = merge_ratio
+        self.on_merge = on_merge
+        self.merges = 0
+        # The segments folded into the current base, until `on_merge` has
+        # rebuilt what was built on their base.
+        self.merged: Optional[Segments] = None
+
+        self._base_ordinals = {doc_id: ordinal for ordinal, doc_id in enumerate(base.doc_ids)}
+        self._tombstones: FrozenSet[int] = frozenset()
+        self._deltas: Tuple[Part, ...] = ()
+        # Where each live delta document sits: (delta number, ordinal).
+        self._delta_locations: Dict[str, Tuple[int, int]] = {}
+        self._segments = Segments(base, self._tombstones, self._deltas, base.version)
+
+        self._write_lock = threading.Lock()
+        self._merge_lock = threading.Lock()
+        self._merge_thread: Optional[threading.Thread] = None
+        # Changes applied while a merge is running, replayed onto its result.
+        self._replay: Optional[List[Change]] = None
+
+    def __len__(self) -> int:
+        return len(self._segments)
+
+    @property
+    def version(self) -> int:
+        return self._segments.version
+
+    @property
+    def base(self) -> InvertedIndex:
+        return self._segments.base
+
+    def segments(self) -> Segments:
+        return self._segments
+
+    def put(self, doc_id: str, tokens: List[str]) -> None:
+        self.apply([(doc_id, tokens)])
+
+    def delete(self, doc_id: str) -> None:
+        self.apply([(doc_id, None)])
+
+    def apply(self, changes: Sequence[Change]) -> None:
+        if not changes:
+            return
+
+        with self._write_lock:
+            self._apply_locked(changes)
+            if self._replay is not None:
+                self._replay.extend(changes)
+            self._publish(self._segments.base, self._segments.version + 1)
+
+    def pending_changes(self) -> int:
+        segments = self._segments
+        return segments.delta_documents + len(segments.tombstones)
+
+    def effective_merge_threshold(self) -> int:
+        return max(self.merge_threshold, int(self.merge_ratio * len(self._segments.base)))
+
+    def schedule_merge(self) -> None:
+        if self.pending_changes() < self.effective_merge_threshold():
+            return
+
+        with self._write_lock:
+            if self._merge_thread is not None and self._merge_thread.is_alive():
+                return
+            self._merge_thread = threading.Thread(target=self._merge_until_settled, name='index-merge', daemon=True)
+            self._merge_thread.start()
+
+    def wait_for_merge(self, timeout: Optional[float] = None) -> None:
+        thread = self._merge_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def merge(self) -> bool:
+        with self._merge_lock:
+            with self._write_lock:
+                segments = self._segments
+                if not segments.pending:
+                    return False
+                self._replay = []
+
+            try:
+                merged = merge_segments(segments)
+            except Exception:
+                with self._write_lock:
+                    self._replay = None
+                raise
+
+            with self._write_lock:
+                replay, self._replay = self._replay, None
+                self._base_ordinals = {doc_id: ordinal for ordinal, doc_id in enumerate(merged.doc_ids)}
+                self._tombstones = frozenset()
+                self._deltas = ()
+                self._delta_locations = {}
+                self._apply_locked(replay)
+                self.merged = segments
+                # Same documents, same scores: the version (and every cache
+                # keyed on it) carries over to the merged index.
+                self._publish(merged, self._segments.version)
+                self.merges += 1
+
+        try:
+            if self.on_merge is not None:
+                self.on_merge(merged, segments)
+        finally:
+            self.merged = None
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        segments = self._segments
+        return {
+            "version": segments.version,
+            "base_documents": len(segments.base),
+            "delta_documents": segments.delta_documents,
+            "delta_segments": len(segments.deltas),
+            "tombstones": len(segments.tombstones),
+            "merge_threshold": self.effective_merge_threshold(),
+            "merges": self.merges
+        }
+
+    def _merge_until_settled(self) -> None:
+        try:
+            while self.pending_changes() >= self.effective_merge_threshold() and self.merge():
+                pass
+        except Exception:
+            logger.exception("Index merge failed; changes stay in the delta segments")
+
+    def _apply_locked(self, changes: Sequence[Change]) -> None:
+        if not changes:
+            return
+
+        tombstones = set(self._tombstones)
+        deleted: Dict[int, Set[int]] = {}
+        latest: Dict[str, Optional[List[str]]] = {}
+
+        for doc_id, tokens in changes:
+            ordinal = self._base_ordinals.get(doc_id)
+            if ordinal is not None:
+                tombstones.add(ordinal)
+
+            location = self._delta_locations.pop(doc_id, None)
+            if location is not None:
+                deleted.setdefault(location[0], set()).add(location[1])
+
+            latest.pop(doc_id, None)
+            latest[doc_id] = tokens
+
+        self._tombstones = frozenset(tombstones)
+        deltas = [
+            (delta, dead | frozenset(deleted[number])) if number in deleted else (delta, dead)
+            for number, (delta, dead) in enumerate(self._deltas)
+        ]
+
+        # Documents deleted in the same batch never reach a segment.
+        added = InvertedIndex()
+        for doc_id, tokens in latest.items():
+            if tokens is not None:
+                added.add_document(doc_id, tokens)
+
+        if len(added):
+            deltas.append((added, frozenset()))
+            while len(deltas) > 1 and live_documents(deltas[-2]) <= live_documents(deltas[-1]):
+                newer = deltas.pop()
+                older = deltas.pop()
+                deltas.append((merge_indexes([older, newer]), frozenset()))
+
+            # Only the last segment is new or renumbered.
+            number, (delta, _) = len(deltas) - 1, deltas[-1]
+            for ordinal, doc_id in enumerate(delta.doc_ids):
+                self._delta_locations[doc_id] = (number, ordinal)
+
+        self._deltas = tuple(deltas)
+
+    def _publish(self, base: InvertedIndex, version: int) -> None:
+        self._segments = Segments(base, self._tombstones, self._deltas, version)
+
+
+class SegmentCache(Generic[Value]):
+    # Structures derived from a delta segment (passages, suggestions,
+    # trigrams), built on first use and dropped along with the segment.
+
+    def __init__(self, build: Callable[[InvertedIndex], Value]) -> None:
+        self.build = build
+        self._values: 'weakref.WeakKeyDictionary[InvertedIndex, Value]' = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self, segment: InvertedIndex) -> Value:
+        with self._lock:
+            value = self._values.get(segment)
+            if value is None:
+                value = self._values[segment] = self.build(segment)
+            return value
+
+
+def live_documents(part: Part) -> int:
+    index, deleted = part
+    return len(index) - len(deleted)
+
+
+def merge_indexes(parts: Sequence[Part]) -> InvertedIndex:
+    # Concatenates the live documents of every part, in order, into a new
+    # index with contiguous ordinals.
+    doc_ids: List[str] = []
+    doc_lengths: List[int] = []
+    remaps: List[Dict[int, int]] = []
+
+    for index, deleted in parts:
+        remap: Dict[int, int] = {}
+        for ordinal, doc_id in enumerate(index.doc_ids):
+            if ordinal in deleted:
+                continue
+            remap[ordinal] = len(doc_ids)
+            doc_ids.append(doc_id)
+            doc_lengths.append(index.doc_lengths[ordinal])
+        remaps.append(remap)
+
+    postings: Dict[str, Dict[int, int]] = {}
+    positions: Dict[str, Dict[int, List[int]]] = {}
+
+    for (index, _), remap in zip(parts, remaps):
+        for term, term_postings in index.postings.items():
+            term_positions = index.positions.get(term, {})
+            kept = [ordinal for ordinal in term_postings if ordinal in remap]
+            if not kept:
+                continue
+            merged_postings = postings.setdefault(term, {})
+            merged_positions = positions.setdefault(term, {})
+            for ordinal in kept:
+                merged_postings[remap[ordinal]] = term_postings[ordinal]
+                merged_positions[remap[ordinal]] = list(term_positions.get(ordinal, ()))
+
+    return InvertedIndex(postings=postings, doc_ids=doc_ids, doc_lengths=doc_lengths, positions=positions)
+
+
+def merge_segments(segments: Segments) -> InvertedIndex:
+    return merge_indexes(segments.parts)
+
+
+def part_results(
+    part: Part,
+    number: int,
+    query: ParsedQuery,
+    scoring: str,
+    statistics: SegmentStatistics
+) -> ShardResult:
+    # One segment scored like a shard: against the combined statistics,
+    # with its deleted or replaced documents dropped before the merge.
+    index, deleted = part
+    deleted_ids = {index.doc_ids[ordinal] for ordinal in deleted}
+
+    if scoring == SCORING_LEGACY:
+        entries = [
+            (score, (number, order), doc_id)
+            for score, order, doc_id in score_legacy(index, query) if doc_id not in deleted_ids
+        ]
+    else:
+        entries = [
+            (score, 0.0, doc_id)
+            for score, doc_id in bm25_entries(index, query, corpus=statistics) if doc_id not in deleted_ids
+        ]
+
+    return entries, len(entries)
+
+
+def rank_segments(
+    segments: Segments,
+    query: ParsedQuery,
+    limit: int,
+    offset: int = 0,
+    scoring: str = SCORING_BM25,
+    base_results: Optional[Sequence[ShardResult]] = None
+) -> Tuple[List[Tuple[float, str]], int]:
+    # Every segment is scored like a shard and merged in one step.
+    # `base_results` are the base segment's results from an accelerator
+    # (shards, the matrix backend), already scored against the combined
+    # statistics without the tombstoned documents; legacy entries carry
+    # their own tie-break keys, which rank before any delta segment's.
+    if base_results is None:
+        results = [part_results(segments.parts[0], 0, query, scoring, segments.statistics)]
+    else:
+        results = [
+            ([(score, (0, key), doc_id) for score, key, doc_id in entries], count)
+            for entries, count in base_results
+        ]
+
+    for number, part in enumerate(segments.deltas, 1):
+        results.append(part_results(part, number, query, scoring, segments.statistics))
+
+    return merge_shard_results(results, scoring, limit, offset)
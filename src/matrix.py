@@ -0,0 +1,245 @@
+import re
+from collections import Counter
+from typing import AbstractSet, Dict, List, Optional, Sequence, Tuple
+from src.index import InvertedIndex
+from src.query import ParsedQuery
+from src.scoring import BM25_B, BM25_K1, SCORING_LEGACY, bm25_idf, query_tokens
+from src.search import matching_ordinals
+from src.shards import ShardResult
+from src.utils import relevance_from_matches
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+MATRIX_AVAILABLE = np is not None
+SEARCH_BACKEND_MATRIX = 'matrix'
+
+WORD_TERM = re.compile(r"\w+")
+
+
+class TermDocumentMatrix:
+    # Term-major sparse matrix (CSR layout): row `r` holds the documents of
+    # one vocabulary term in indices[indptr[r]:indptr[r + 1]], with raw term
+    # frequencies and precomputed BM25 weights alongside.
+
+    def __init__(self, index: InvertedIndex, k1: float = BM25_K1, b: float = BM25_B) -> None:
+        if np is None:
+            raise RuntimeError("The matrix scoring backend requires numpy")
+
+        self.document_count = len(index)
+        self.rows: Dict[str, int] = {term: row for row, term in enumerate(index.postings)}
+
+        doc_freqs = np.fromiter((len(term_postings) for term_postings in index.postings.values()), dtype=np.int64, count=len(self.rows))
+        self.indptr = np.zeros(len(self.rows) + 1, dtype=np.int64)
+        np.cumsum(doc_freqs, out=self.indptr[1:])
+
+        size = int(self.indptr[-1])
+        self.indices = np.empty(size, dtype=np.int64)
+        self.frequencies = np.empty(size, dtype=np.float64)
+        offset = 0
+        for term_postings in index.postings.values():
+            count = len(term_postings)
+            self.indices[offset:offset + count] = np.fromiter(term_postings.keys(), dtype=np.int64, count=count)
+            self.frequencies[offset:offset + count] = np.fromiter(term_postings.values(), dtype=np.float64, count=count)
+            offset += count
+
+        # Same operations, in the same order, as bm25_term_scores so both
+        # backends produce identical floats.
+        self.lengths = np.asarray(index.doc_lengths, dtype=np.float64)
+        average_length = index.average_length or 1.0
+        length_norms = k1 * (1 - b + b * self.lengths / average_length)
+        idf = np.log(1 + (self.document_count - doc_freqs + 0.5) / (doc_freqs + 0.5))
+        row_idf = np.repeat(idf, doc_freqs)
+        self.bm25_weights = row_idf * self.frequencies * (k1 + 1) / (self.frequencies + length_norms[self.indices])
+
+    def accumulate(self, weighted_rows: Sequence[Tuple[int, float]], values: 'np.ndarray') -> Tuple['np.ndarray', 'np.ndarray']:
+        return self._sum([(row, values[self.indptr[row]:self.indptr[row + 1]] * weight) for row, weight in weighted_rows])
+
+    def accumulate_bm25(
+        self,
+        weighted_terms: Sequence[Tuple[str, float]],
+        corpus: InvertedIndex,
+        k1: float = BM25_K1,
+        b: float = BM25_B
+    ) -> Tuple['np.ndarray', 'np.ndarray']:
+        # BM25 against another corpus's statistics (this matrix as one
+        # segment of it), so the weights are computed for the query's rows
+        # only, in the same order of operations as bm25_term_scores.
+        average_length = corpus.average_length or 1.0
+        spans = []
+        for term, weight in weighted_terms:
+            row = self.rows.get(term)
+            if row is None:
+                continue
+            start, end = self.indptr[row], self.indptr[row + 1]
+            frequencies = self.frequencies[start:end]
+            length_norms = k1 * (1 - b + b * self.lengths[self.indices[start:end]] / average_length)
+            spans.append((row, bm25_idf(corpus, term) * frequencies * (k1 + 1) / (frequencies + length_norms) * weight))
+        return self._sum(spans)
+
+    def _sum(self, spans: Sequence[Tuple[int, 'np.ndarray']]) -> Tuple['np.ndarray', 'np.ndarray']:
+        if not spans:
+            return np.zeros(self.document_count), np.zeros(self.document_count, dtype=bool)
+
+        # One gather and one bincount for the whole query, instead of a
+        # Python loop over every matching document.
+        indices = np.concatenate([self.indices[self.indptr[row]:self.indptr[row + 1]] for row, _ in spans])
+        weights = np.concatenate([weights for _, weights in spans])
+
+        matched = np.zeros(self.document_count, dtype=bool)
+        matched[indices] = True
+        return np.bincount(indices, weights=weights, minlength=self.document_count), matched
+
+
+class MatrixScorer:
+    def __init__(self, index: InvertedIndex) -> None:
+        self.index = index
+        self.version = index.version
+        self.matrix = TermDocumentMatrix(index)
+
+    def rank_documents(
+        self,
+        query: ParsedQuery,
+        limit: int,
+        offset: int = 0,
+        scoring: str = 'bm25'
+    ) -> Optional[Tuple[List[Tuple[float, str]], int]]:
+        # None means "not handled here"; the caller falls back to the
+        # regular search pipeline.
+        if self.index.version != self.version:
+            return None
+
+        if scoring == SCORING_LEGACY:
+            scored = self._legacy_scores(query)
+        else:
+            scored = self._bm25_scores(query)
+
+        if scored is None:
+            return None
+
+        scores, candidates = scored
+        return self._select(scores, candidates, limit, offset, normalize=scoring != SCORING_LEGACY), len(candidates)
+
+    def segment_results(
+        self,
+        query: ParsedQuery,
+        depth: int,
+        scoring: str,
+        corpus: InvertedIndex,
+        deleted: AbstractSet[int]
+    ) -> Optional[ShardResult]:
+        # The top `depth` raw entries for this index as the base segment of
+        # a live index: BM25 uses the statistics of all segments, and
+        # deleted or replaced ordinals are left out, so the entries merge
+        # with the delta segments' like a shard's.
+        if self.index.version != self.version:
+            return None
+
+        if scoring == SCORING_LEGACY:
+            scored = self._legacy_scores(query, deleted)
+        else:
+            scored = self._bm25_scores(query, corpus, deleted)
+
+        if scored is None:
+            return None
+
+        scores, candidates = scored
+        ranked = self._top(scores, candidates, depth) if depth > 0 else candidates[:0]
+        return [
+            (float(scores[ordinal]), int(ordinal) if scoring == SCORING_LEGACY else 0.0, self.index.doc_ids[ordinal])
+            for ordinal in ranked
+        ], len(candidates)
+
+    def _bm25_scores(
+        self,
+        query: ParsedQuery,
+        corpus: Optional[InvertedIndex] = None,
+        deleted: AbstractSet[int] = frozenset()
+    ) -> Tuple['np.ndarray', 'np.ndarray']:
+        weighted_terms = [
+            (term, float(query_frequency))
+            for term, query_frequency in Counter(query_tokens(query.terms)).items()
+        ]
+        if corpus is None:
+            scores, matched = self.matrix.accumulate(
+                [(self.matrix.rows[term], weight) for term, weight in weighted_terms if term in self.matrix.rows],
+                self.matrix.bm25_weights
+            )
+        else:
+            scores, matched = self.matrix.accumulate_bm25(weighted_terms, corpus)
+        return scores, self._candidates(query, matched, 'bm25', deleted)
+
+    def _legacy_scores(
+        self,
+        query: ParsedQuery,
+        deleted: AbstractSet[int] = frozenset()
+    ) -> Optional[Tuple['np.ndarray', 'np.ndarray']]:
+        query_terms = query.terms
+
+        # Substring counts can be rebuilt from token frequencies only when a
+        # term can't span a token boundary, i.e. it is made of word characters.
+        if not query_terms or not all(WORD_TERM.fullmatch(term) for term in query_terms):
+            return None
+
+        weighted_rows = [
+            (self.matrix.rows[vocabulary_term], float(vocabulary_term.count(term)))
+            for term in query_terms
+            for vocabulary_term in self.index.expand_term(term)
+        ]
+        totals, matched = self.matrix.accumulate(weighted_rows, self.matrix.frequencies)
+        candidates = self._candidates(query, matched, SCORING_LEGACY, deleted)
+
+        # Legacy relevance only depends on the total match count, so it
+        # runs once per distinct count rather than once per document.
+        distinct, inverse = np.unique(totals[candidates], return_inverse=True)
+        relevance = np.array([relevance_from_matches(int(total), len(query_terms)) for total in distinct])
+        scores = np.zeros(self.matrix.document_count)
+        scores[candidates] = relevance[inverse] if len(candidates) else 0.0
+        return scores, candidates
+
+    def _candidates(
+        self,
+        query: ParsedQuery,
+        matched: 'np.ndarray',
+        scoring: str,
+        deleted: AbstractSet[int] = frozenset()
+    ) -> 'np.ndarray':
+        if query.simple:
+            if deleted:
+                matched[np.fromiter(deleted, dtype=np.int64, count=len(deleted))] = False
+            return np.flatnonzero(matched)
+        return np.array(sorted(matching_ordinals(self.index, query, scoring) - deleted), dtype=np.int64)
+
+    def _select(
+        self,
+        scores: 'np.ndarray',
+        candidates: 'np.ndarray',
+        limit: int,
+        offset: int,
+        normalize: bool
+    ) -> List[Tuple[float, str]]:
+        depth = min(offset + limit, len(candidates))
+        if depth <= offset:
+            return []
+
+        ranked = self._top(scores, candidates, depth)[offset:]
+
+        top_score = float(scores[candidates].max()) if normalize else 1.0
+        return [
+            (round(float(scores[ordinal]) / top_score, 3) if normalize else float(scores[ordinal]), self.index.doc_ids[ordinal])
+            for ordinal in ranked
+        ]
+
+    def _top(self, scores: 'np.ndarray', candidates: 'np.ndarray', depth: int) -> 'np.ndarray':
+        if depth < len(candidates):
+            # Partial selection of the top `depth` candidates; only those are
+            # fully sorted.
+            top = np.argpartition(-scores[candidates], depth - 1)[:depth]
+        else:
+            top = np.arange(len(candidates))
+
+        ordinals = candidates[top]
+        return ordinals[np.lexsort((ordinals, -scores[ordinals]))]
@@ -0,0 +1,82 @@
+import os
+import resource
+import sys
+from typing import Dict, List, Optional
+
+
+SMAPS_FIELDS = {
+    "Rss": "rss_kb",
+    "Pss": "pss_kb",
+    "Shared_Clean": "shared_clean_kb",
+    "Shared_Dirty": "shared_dirty_kb",
+    "Private_Clean": "private_clean_kb",
+    "Private_Dirty": "private_dirty_kb",
+}
+
+
+def process_memory(pid: Optional[int] = None) -> Dict[str, int]:
+    pid = pid or os.getpid()
+    memory: Dict[str, int] = {}
+
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as handle:
+            for line in handle:
+                name, _, value = line.partition(':')
+                if name in SMAPS_FIELDS:
+                    memory[SMAPS_FIELDS[name]] = int(value.split()[0])
+    except OSError:
+        if pid != os.getpid():
+            return memory
+        # No smaps on this platform: peak RSS is the best available figure.
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {"max_rss_kb": max_rss // 1024 if sys.platform == 'darwin' else max_rss}
+
+    # Unique set size: pages only this process maps, i.e. what killing it frees.
+    memory["uss_kb"] = memory.get("private_clean_kb", 0) + memory.get("private_dirty_kb", 0)
+    return memory
+
+
+def child_pids(pid: int) -> List[int]:
+    children: List[int] = []
+    task_dir = f"/proc/{pid}/task"
+
+    for task in os.listdir(task_dir):
+        try:
+            with open(os.path.join(task_dir, task, "children")) as handle:
+                children.extend(int(child) for child in handle.read().split())
+        except OSError:
+            continue
+
+    if not children:
+        for entry in os.listdir("/proc"):
+            if entry.isdigit() and _parent_pid(int(entry)) == pid:
+                children.append(int(entry))
+
+    return sorted(children)
+
+
+def _parent_pid(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/stat") as handle:
+            return int(handle.read().rsplit(')', 1)[1].split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def main(argv: List[str]) -> int:
+    if len(argv) != 1 or not argv[0].isdigit():
+        print("usage: python -m src.memory <gunicorn master pid>", file=sys.stderr)
+        return 2
+
+    master = int(argv[0])
+    print(f"{'pid':>8} {'role':>7} {'rss_kb':>10} {'pss_kb':>10} {'uss_kb':>10}")
+
+    for pid, role in [(master, 'master')] + [(child, 'worker') for child in child_pids(master)]:
+        memory = process_memory(pid)
+        print(f"{pid:>8} {role:>7} {memory.get('rss_kb', 0):>10} {memory.get('pss_kb', 0):>10} {memory.get('uss_kb', 0):>10}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,132 @@
+from typing import Dict, FrozenSet, List, Optional, Sequence, Set, Tuple
+from src.documents import get_normalized_document
+from src.index import InvertedIndex
+from src.live import SegmentStatistics, merge_indexes
+from src.query import ParsedQuery
+from src.scoring import SCORING_BM25, bm25_scores
+from src.search import matching_ordinals, normalize_bm25, select_page
+
+
+# Reported as the search backend in /api/stats.
+SEARCH_BACKEND_PASSAGES = 'passages'
+
+Passage = Tuple[int, int]
+
+
+class PassageIndex:
+    # A second inverted index whose entries are paragraphs rather than whole
+    # documents, built from a frozen document index. BM25 runs over
+    # passage-level statistics; a document ranks by its best passage, which
+    # also becomes its snippet.
+
+    def __init__(
+        self,
+        index: InvertedIndex,
+        passages: Optional[InvertedIndex] = None,
+        ranges: Optional[List[Passage]] = None,
+        first_passage: Optional[List[int]] = None
+    ) -> None:
+        self.index = index
+        # Token range of each passage within its document, and the range of
+        # passage ordinals belonging to each document ordinal.
+        if passages is not None and ranges is not None and first_passage is not None:
+            self.passages, self.ranges, self.first_passage = passages, ranges, first_passage
+            return
+
+        self.passages = InvertedIndex()
+        self.ranges = []
+        self.first_passage = [0]
+
+        for ordinal, doc_id in enumerate(index.doc_ids):
+            document = get_normalized_document(doc_id)
+            for start, end in document.passages if document is not None else ():
+                self.passages.add_document(doc_id, document.tokens[start:end])
+                self.ranges.append((start, end))
+            self.first_passage.append(len(self.ranges))
+
+    @classmethod
+    def merged(cls, index: InvertedIndex, parts: Sequence[Tuple['PassageIndex', FrozenSet[int]]]) -> 'PassageIndex':
+        # The passage index of `index`, the merge of these parts' document
+        # indexes, put together from their passages rather than by
+        # normalizing every document again.
+        ranges: List[Passage] = []
+        first_passage = [0]
+
+        for passage_index, deleted in parts:
+            for ordinal in range(len(passage_index.index)):
+                if ordinal in deleted:
+                    continue
+                ranges.extend(passage_index.ranges[passage_index.first_passage[ordinal]:passage_index.first_passage[ordinal + 1]])
+                first_passage.append(len(ranges))
+
+        passages = merge_indexes([(passage_index.passages, passage_index.dead_passages(deleted)) for passage_index, deleted in parts])
+        return cls(index, passages, ranges, first_passage)
+
+    def __len__(self) -> int:
+        return len(self.ranges)
+
+    def dead_passages(self, deleted: FrozenSet[int]) -> FrozenSet[int]:
+        return frozenset(
+            passage
+            for ordinal in deleted
+            for passage in range(self.first_passage[ordinal], self.first_passage[ordinal + 1])
+        )
+
+    def best_passages(
+        self,
+        query: ParsedQuery,
+        corpus: Optional[SegmentStatistics] = None,
+        dead: FrozenSet[int] = frozenset()
+    ) -> Dict[str, Tuple[float, int]]:
+        # Which documents match is decided on whole documents, as in the
+        # default pipeline, so boolean and proximity queries keep their
+        # meaning and counts; passages only decide the order and snippet.
+        ordinals: Optional[Set[int]] = None
+        if not query.simple:
+            ordinals = {
+                passage
+                for ordinal in matching_ordinals(self.index, query, SCORING_BM25)
+                for passage in range(self.first_passage[ordinal], self.first_passage[ordinal + 1])
+            }
+
+        # Best passage per document; the earlier one wins a tie.
+        best: Dict[str, Tuple[float, int]] = {}
+        for passage, score in bm25_scores(self.passages, query.terms, ordinals=ordinals, corpus=corpus).items():
+            if passage in dead:
+                continue
+            doc_id = self.passages.doc_ids[passage]
+            if doc_id not in best or (score, -passage) > (best[doc_id][0], -best[doc_id][1]):
+                best[doc_id] = (score, passage)
+
+        return best
+
+    def rank_documents(
+        self,
+        query: ParsedQuery,
+        limit: int,
+        offset: int = 0
+    ) -> Tuple[List[Tuple[float, str]], int, Dict[str, Passage]]:
+        return rank_passages([(self, frozenset())], query, limit, offset)
+
+
+def rank_passages(
+    parts: Sequence[Tuple[PassageIndex, FrozenSet[int]]],
+    query: ParsedQuery,
+    limit: int,
+    offset: int = 0
+) -> Tuple[List[Tuple[float, str]], int, Dict[str, Passage]]:
+    # Passage indexes of a live index's segments, each with the ordinals of
+    # its deleted or replaced documents, ranked with passage statistics of
+    # all segments together.
+    passage_parts = [(part, part.dead_passages(deleted)) for part, deleted in parts]
+    corpus = SegmentStatistics([(part.passages, dead) for part, dead in passage_parts])
+    entries: List[Tuple[float, str]] = []
+    best_ranges: Dict[str, Passage] = {}
+
+    for part, dead in passage_parts:
+        for doc_id, (score, passage) in part.best_passages(query, corpus, dead).items():
+            entries.append((score, doc_id))
+            best_ranges[doc_id] = part.ranges[passage]
+
+    page = select_page(normalize_bm25(entries), limit, offset)
+    return page, len(entries), {doc_id: best_ranges[doc_id] for _, doc_id in page}
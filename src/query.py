@@ -0,0 +1,432 @@
+import re
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import AbstractSet, Callable, Dict, List, Optional, Sequence, Set, Tuple, Union
+from src.documents import TOKEN_PATTERN, tokenize
+from src.index import InvertedIndex
+
+
+DEFAULT_NEAR_DISTANCE = 10
+
+QUERY_TOKEN_PATTERN = re.compile(r'([+-](?=["(\w]))?(?:"([^"]*)"?|([()])|([^\s()"]+))')
+NEAR_PATTERN = re.compile(r'NEAR(?:/(\d+))?')
+
+Span = Tuple[int, int]
+
+
+@dataclass(frozen=True)
+class Term:
+    text: str
+
+    def __str__(self) -> str:
+        return self.text
+
+
+@dataclass(frozen=True)
+class Phrase:
+    tokens: Tuple[str, ...]
+
+    def __str__(self) -> str:
+        return '"' + ' '.join(self.tokens) + '"'
+
+
+@dataclass(frozen=True)
+class Near:
+    left: 'Clause'
+    right: 'Clause'
+    distance: int
+
+    def __str__(self) -> str:
+        return f"{self.left} NEAR/{self.distance} {self.right}"
+
+
+@dataclass(frozen=True)
+class Bool:
+    must: Tuple['Node', ...] = ()
+    should: Tuple['Node', ...] = ()
+    must_not: Tuple['Node', ...] = ()
+
+    def __str__(self) -> str:
+        parts = [f"+{_grouped(node)}" for node in self.must]
+        parts += [_grouped(node) for node in self.should]
+        parts += [f"-{_grouped(node)}" for node in self.must_not]
+        return ' '.join(parts)
+
+
+Clause = Union[Term, Phrase, Near]
+Node = Union[Term, Phrase, Near, Bool]
+
+
+def _grouped(node: Node) -> str:
+    return f"({node})" if isinstance(node, Bool) else str(node)
+
+
+@dataclass(frozen=True)
+class ParsedQuery:
+    root: Optional[Node]
+    clauses: Tuple[Clause, ...] = field(default=(), compare=False)
+
+    def __str__(self) -> str:
+        return str(self.root) if self.root is not None else ''
+
+    def __bool__(self) -> bool:
+        return self.root is not None
+
+    @property
+    def simple(self) -> bool:
+        # A bag of plain terms keeps the original "any term matches" behaviour.
+        if isinstance(self.root, Term):
+            return True
+        return (
+            isinstance(self.root, Bool)
+            and not self.root.must
+            and not self.root.must_not
+            and all(isinstance(node, Term) for node in self.root.should)
+        )
+
+    @property
+    def terms(self) -> List[str]:
+        terms: List[str] = []
+        for clause in self.clauses:
+            terms.extend(clause_terms(clause))
+        return terms
+
+
+def clause_terms(clause: Clause) -> List[str]:
+    if isinstance(clause, Term):
+        return [clause.text]
+    if isinstance(clause, Phrase):
+        return list(clause.tokens)
+    return clause_terms(clause.left) + clause_terms(clause.right)
+
+
+class _Negated:
+    def __init__(self, node: Node) -> None:
+        self.node = node
+
+
+Parsed = Tuple[Optional[Union[Node, _Negated]], Optional[str]]
+
+
+class _Parser:
+    # Precedence, loosest first: implicit/explicit OR sequence, AND, NEAR,
+    # then NOT and +/- prefixes on a single operand.
+
+    def __init__(self, query: str) -> None:
+        self.tokens: List[Tuple[str, object]] = []
+        self.position = 0
+
+        for match in QUERY_TOKEN_PATTERN.finditer(query):
+            modifier, phrase, paren, word = match.groups()
+            if modifier:
+                self.tokens.append((modifier, None))
+            if phrase is not None:
+                phrase_tokens = tuple(tokenize(phrase))
+                if phrase_tokens:
+                    leaf = Phrase(phrase_tokens) if len(phrase_tokens) > 1 else Term(phrase_tokens[0])
+                    self.tokens.append(('atom', leaf))
+            elif paren:
+                self.tokens.append((paren, None))
+            elif word in ('AND', 'OR', 'NOT'):
+                self.tokens.append((word, None))
+            elif NEAR_PATTERN.fullmatch(word):
+                distance = NEAR_PATTERN.fullmatch(word).group(1)
+                self.tokens.append(('NEAR', int(distance) if distance else DEFAULT_NEAR_DISTANCE))
+            else:
+                self.tokens.append(('atom', Term(word.lower())))
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.position][0] if self.position < len(self.tokens) else None
+
+    def advance(self) -> Tuple[str, object]:
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def parse(self) -> Optional[Node]:
+        root = self.sequence()
+        while self.position < len(self.tokens):
+            # Stray closing parenthesis: skip it and keep going.
+            self.advance()
+            rest = self.sequence()
+            if rest is not None:
+                root = rest if root is None else Bool(should=(root, rest))
+        return root
+
+    def sequence(self) -> Optional[Node]:
+        must: List[Node] = []
+        should: List[Node] = []
+        must_not: List[Node] = []
+
+        while self.peek() not in (None, ')'):
+            if self.peek() == 'OR':
+                self.advance()
+                continue
+
+            item, modifier = self.conjunction()
+            if item is None:
+                continue
+            if isinstance(item, _Negated):
+                must_not.append(item.node)
+            elif modifier == '-':
+                must_not.append(item)
+            elif modifier == '+':
+                must.append(item)
+            else:
+                should.append(item)
+
+        if not must and not must_not and len(should) == 1:
+            return should[0]
+        if not must and not should and not must_not:
+            return None
+        # As in most engines, optional clauses only affect ranking once
+        # something is required.
+        return Bool(must=tuple(must), should=tuple(should), must_not=tuple(must_not))
+
+    def conjunction(self) -> Parsed:
+        first, modifier = self.proximity()
+        if self.peek() != 'AND':
+            return first, modifier
+
+        items = [_Negated(first) if modifier == '-' and first is not None else first]
+        while self.peek() == 'AND':
+            self.advance()
+            item, item_modifier = self.proximity()
+            items.append(_Negated(item) if item_modifier == '-' and item is not None else item)
+
+        must = tuple(item for item in items if item is not None and not isinstance(item, _Negated))
+        must_not = tuple(item.node for item in items if isinstance(item, _Negated))
+        if not must:
+            return (Bool(must_not=must_not) if must_not else None), None
+        return Bool(must=must, must_not=must_not), None
+
+    def proximity(self) -> Parsed:
+        left, modifier = self.unary()
+
+        while self.peek() == 'NEAR':
+            _, distance = self.advance()
+            right, _ = self.unary()
+            if right is None or isinstance(right, _Negated) or isinstance(left, _Negated):
+                continue
+            if left is None:
+                left = right
+            elif isinstance(left, Bool) or isinstance(right, Bool):
+                left = Bool(must=(left, right))
+            else:
+                left = Near(left, right, distance)
+
+        return left, modifier
+
+    def unary(self) -> Parsed:
+        kind = self.peek()
+
+        if kind is None or kind == ')':
+            return None, None
+        if kind == 'NOT':
+            self.advance()
+            operand, _ = self.unary()
+            if operand is None or isinstance(operand, _Negated):
+                return None, None
+            return _Negated(operand), None
+        if kind == '(':
+            self.advance()
+            group = self.sequence()
+            if self.peek() == ')':
+                self.advance()
+            return group, None
+        if kind in ('+', '-'):
+            self.advance()
+            operand, _ = self.unary()
+            if isinstance(operand, _Negated):
+                return None, None
+            return operand, kind
+        if kind in ('AND', 'OR', 'NEAR'):
+            # Operator without a left operand: ignore it.
+            self.advance()
+            return None, None
+
+        return self.advance()[1], None
+
+
+def parse_query(query: str) -> ParsedQuery:
+    root = _Parser(query).parse()
+    return ParsedQuery(root, tuple(_positive_clauses(root)) if root is not None else ())
+
+
+def _positive_clauses(node: Node) -> List[Clause]:
+    if not isinstance(node, Bool):
+        return [node]
+    clauses: List[Clause] = []
+    for child in node.must + node.should:
+        clauses.extend(_positive_clauses(child))
+    return clauses
+
+
+def replace_tokens(query: ParsedQuery, replace: Callable[[str], str]) -> ParsedQuery:
+    # Rewrites every term and phrase token, keeping the query's structure
+    # and each term's punctuation ("e-mail" stays hyphenated).
+    if query.root is None:
+        return query
+    root = _replace_node_tokens(query.root, replace)
+    return ParsedQuery(root, tuple(_positive_clauses(root)))
+
+
+def _replace_node_tokens(node: Node, replace: Callable[[str], str]) -> Node:
+    if isinstance(node, Term):
+        return Term(TOKEN_PATTERN.sub(lambda match: replace(match.group()), node.text))
+    if isinstance(node, Phrase):
+        return Phrase(tuple(replace(token) for token in node.tokens))
+    if isinstance(node, Near):
+        return Near(_replace_node_tokens(node.left, replace), _replace_node_tokens(node.right, replace), node.distance)
+    return Bool(
+        tuple(_replace_node_tokens(child, replace) for child in node.must),
+        tuple(_replace_node_tokens(child, replace) for child in node.should),
+        tuple(_replace_node_tokens(child, replace) for child in node.must_not)
+    )
+
+
+class TermMatcher(ABC):
+    def __init__(self, index: InvertedIndex) -> None:
+        self.index = index
+
+    @abstractmethod
+    def estimate(self, text: str) -> int:
+        ...
+
+    @abstractmethod
+    def ordinals(self, text: str, within: Optional[AbstractSet[int]] = None) -> Set[int]:
+        ...
+
+
+def estimate(index: InvertedIndex, node: Node, matcher: TermMatcher) -> int:
+    if isinstance(node, Term):
+        return matcher.estimate(node.text)
+    if isinstance(node, Phrase):
+        return min(index.doc_freq(token) for token in node.tokens)
+    if isinstance(node, Near):
+        return min(estimate(index, node.left, matcher), estimate(index, node.right, matcher))
+    if node.must:
+        return min(estimate(index, child, matcher) for child in node.must)
+    return sum(estimate(index, child, matcher) for child in node.should)
+
+
+def evaluate(
+    index: InvertedIndex,
+    node: Node,
+    matcher: TermMatcher,
+    within: Optional[AbstractSet[int]] = None
+) -> Set[int]:
+    if isinstance(node, Term):
+        return matcher.ordinals(node.text, within)
+
+    if not isinstance(node, Bool):
+        return set(clause_spans(index, node, within))
+
+    if node.must:
+        # Intersect the rarest clauses first so later ones only check a
+        # shrinking candidate set, and stop as soon as nothing is left.
+        result: Optional[Set[int]] = None
+        for child in sorted(node.must, key=lambda child: estimate(index, child, matcher)):
+            result = evaluate(index, child, matcher, within if result is None else result)
+            if not result:
+                return set()
+    else:
+        result = set()
+        for child in node.should:
+            result |= evaluate(index, child, matcher, within)
+
+    for child in node.must_not:
+        if not result:
+            break
+        result -= evaluate(index, child, matcher, result)
+
+    return result
+
+
+def clause_spans(
+    index: InvertedIndex,
+    clause: Clause,
+    within: Optional[AbstractSet[int]] = None
+) -> Dict[int, List[Span]]:
+    if isinstance(clause, Term):
+        tokens = tokenize(clause.text)
+        if len(tokens) != 1:
+            return clause_spans(index, Phrase(tuple(tokens)), within) if tokens else {}
+        return {
+            ordinal: [(position, position) for position in positions]
+            for ordinal, positions in index.positions.get(tokens[0], {}).items()
+            if within is None or ordinal in within
+        }
+
+    if isinstance(clause, Phrase):
+        return phrase_spans(index, clause.tokens, within)
+
+    left = clause_spans(index, clause.left, within)
+    right = clause_spans(index, clause.right, left.keys()) if left else {}
+    spans: Dict[int, List[Span]] = {}
+
+    for ordinal in right:
+        matched = near_spans(left[ordinal], right[ordinal], clause.distance)
+        if matched:
+            spans[ordinal] = matched
+
+    return spans
+
+
+def phrase_spans(
+    index: InvertedIndex,
+    tokens: Sequence[str],
+    within: Optional[AbstractSet[int]] = None
+) -> Dict[int, List[Span]]:
+    term_positions = [index.positions.get(token) for token in tokens]
+    if not all(term_positions):
+        return {}
+
+    # Walk the documents of the rarest token (or the candidate set, if
+    # smaller) and check the other tokens against them.
+    rarest = min(term_positions, key=len)
+    candidates = within if within is not None and len(within) < len(rarest) else rarest
+    spans: Dict[int, List[Span]] = {}
+
+    for ordinal in candidates:
+        if within is not None and ordinal not in within:
+            continue
+        if not all(ordinal in positions for positions in term_positions):
+            continue
+
+        document_positions = [term_positions[offset][ordinal] for offset in range(len(tokens))]
+        starts = [
+            start for start in document_positions[0]
+            if all(_contains(document_positions[offset], start + offset) for offset in range(1, len(tokens)))
+        ]
+        if starts:
+            spans[ordinal] = [(start, start + len(tokens) - 1) for start in starts]
+
+    return spans
+
+
+def near_spans(left: List[Span], right: List[Span], distance: int) -> List[Span]:
+    right = sorted(right)
+    right_starts = [start for start, _ in right]
+    widest = max(end - start for start, end in right)
+    matched: List[Span] = []
+
+    for left_start, left_end in left:
+        # Only right spans starting inside this window can be within distance.
+        first = bisect_left(right_starts, left_start - distance - 1 - widest)
+        for right_start, right_end in islice(right, first, None):
+            if right_start > left_end + distance + 1:
+                break
+            # Tokens strictly between the two spans, in either order.
+            gap = max(right_start - left_end, left_start - right_end) - 1
+            if gap <= distance:
+                matched.append((min(left_start, right_start), max(left_end, right_end)))
+
+    return sorted(set(matched))
+
+
+def _contains(sorted_positions: Sequence[int], position: int) -> bool:
+    offset = bisect_left(sorted_positions, position)
+    return offset < len(sorted_positions) and sorted_positions[offset] == position
@@ -0,0 +1,98 @@
+import math
+from collections import Counter
+from typing import AbstractSet, Dict, List, Optional, Sequence
+from src.documents import tokenize
+from src.index import InvertedIndex
+
+
+SCORING_BM25 = 'bm25'
+SCORING_LEGACY = 'legacy'
+SCORING_MODES = (SCORING_BM25, SCORING_LEGACY)
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TermScores = Dict[str, Dict[int, float]]
+
+
+def query_tokens(query_terms: Sequence[str]) -> List[str]:
+    return [token for term in query_terms for token in tokenize(term)]
+
+
+def bm25_idf(index: InvertedIndex, term: str) -> float:
+    doc_freq = index.doc_freq(term)
+    return math.log(1 + (len(index) - doc_freq + 0.5) / (doc_freq + 0.5))
+
+
+def bm25_term_scores(
+    index: InvertedIndex,
+    term: str,
+    k1: float = BM25_K1,
+    b: float = BM25_B,
+    corpus: Optional[InvertedIndex] = None
+) -> Dict[int, float]:
+    term_postings = index.postings.get(term)
+    if not term_postings:
+        return {}
+    
+    # A shard scores its own postings against corpus-wide statistics, so its
+    # scores are comparable with every other shard's.
+    statistics = corpus if corpus is not None else index
+    idf = bm25_idf(statistics, term)
+    average_length = statistics.average_length or 1.0
+    scores: Dict[int, float] = {}
+    
+    for ordinal, term_frequency in term_postings.items():
+        length_norm = k1 * (1 - b + b * index.doc_lengths[ordinal] / average_length)
+        scores[ordinal] = idf * term_frequency * (k1 + 1) / (term_frequency + length_norm)
+    
+    return scores
+
+
+def bm25_scores(
+    index: InvertedIndex,
+    query_terms: Sequence[str],
+    k1: float = BM25_K1,
+    b: float = BM25_B,
+    ordinals: Optional[AbstractSet[int]] = None,
+    shared: Optional[TermScores] = None,
+    corpus: Optional[InvertedIndex] = None
+) -> Dict[int, float]:
+    scores: Dict[int, float] = {}
+    
+    for term, query_frequency in Counter(query_tokens(query_terms)).items():
+        # Per-term contributions only depend on the index, so a batch of
+        # queries can pass `shared` to compute each term once.
+        term_scores = shared.get(term) if shared is not None else None
+        if term_scores is None:
+            term_scores = bm25_term_scores(index, term, k1, b, corpus)
+            if shared is not None:
+                shared[term] = term_scores
+        
+        for ordinal, term_score in term_scores.items():
+            if ordinals is not None and ordinal not in ordinals:
+                continue
+            scores[ordinal] = scores.get(ordinal, 0.0) + term_score * query_frequency
+    
+    return scores
+
+
+class CorpusStatistics:
+    # The statistics BM25 needs for one query's tokens, copied out of a
+    # larger corpus (such as a live index's segments) so they can be sent
+    # to a shard's process.
+    
+    def __init__(self, document_count: int, average_length: float, doc_freqs: Dict[str, int]) -> None:
+        self.document_count = document_count
+        self.average_length = average_length
+        self.doc_freqs = doc_freqs
+    
+    @classmethod
+    def for_query(cls, corpus: InvertedIndex, query_terms: Sequence[str]) -> 'CorpusStatistics':
+        return cls(len(corpus), corpus.average_length, {token: corpus.doc_freq(token) for token in query_tokens(query_terms)})
+    
+    def __len__(self) -> int:
+        return self.document_count
+    
+    def doc_freq(self, term: str) -> int:
+        return self.doc_freqs.get(term, 0)
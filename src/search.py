@@ -0,0 +1,176 @@
+import heapq
+from typing import AbstractSet, Any, Dict, Iterator, List, Mapping, Optional, Set, Tuple
+from src.documents import get_normalized_document, tokenize
+from src.index import InvertedIndex
+from src.query import Clause, Near, ParsedQuery, Phrase, TermMatcher, evaluate
+from src.scoring import SCORING_BM25, SCORING_LEGACY, TermScores, bm25_scores, query_tokens
+from src.snippets import PASSAGE_SNIPPET_LENGTH, build_snippet
+from src.utils import compute_mock_relevance, matches_query
+
+
+class ExactTermMatcher(TermMatcher):
+    def estimate(self, text: str) -> int:
+        return sum(self.index.doc_freq(token) for token in query_tokens([text]))
+
+    def ordinals(self, text: str, within: Optional[AbstractSet[int]] = None) -> Set[int]:
+        ordinals: Set[int] = set()
+        for token in query_tokens([text]):
+            postings = self.index.postings.get(token, ())
+            if within is not None and len(within) < len(postings):
+                ordinals.update(ordinal for ordinal in within if ordinal in postings)
+            else:
+                ordinals.update(ordinal for ordinal in postings if within is None or ordinal in within)
+        return ordinals
+
+
+class SubstringTermMatcher(TermMatcher):
+    def estimate(self, text: str) -> int:
+        # An upper bound from document frequencies, so planning doesn't
+        # build the ordinal sets `ordinals()` builds again.
+        parts = tokenize(text)
+        if not parts:
+            return len(self.index)
+        return min(sum(self.index.doc_freq(term) for term in self.index.expand_term(part)) for part in parts)
+
+    def ordinals(self, text: str, within: Optional[AbstractSet[int]] = None) -> Set[int]:
+        candidates = self.index.term_ordinals(text)
+        if within is not None:
+            candidates &= set(within)
+        return {
+            ordinal for ordinal in candidates
+            if matches_query([text], get_normalized_document(self.index.doc_ids[ordinal]))
+        }
+
+
+def matching_ordinals(index: InvertedIndex, query: ParsedQuery, scoring: str) -> Set[int]:
+    if query.root is None:
+        return set()
+    matcher = SubstringTermMatcher(index) if scoring == SCORING_LEGACY else ExactTermMatcher(index)
+    return evaluate(index, query.root, matcher)
+
+
+def score_legacy(index: InvertedIndex, query: ParsedQuery) -> List[Tuple[float, int, str]]:
+    query_terms = query.terms
+    scored: List[Tuple[float, int, str]] = []
+
+    if not query.simple:
+        doc_ids = [index.doc_ids[ordinal] for ordinal in sorted(matching_ordinals(index, query, SCORING_LEGACY))]
+    else:
+        doc_ids = index.candidates(query_terms)
+
+    for order, doc_id in enumerate(doc_ids):
+        doc = get_normalized_document(doc_id)
+        if not query.simple or matches_query(query_terms, doc):
+            scored.append((compute_mock_relevance(query_terms, doc), order, doc_id))
+
+    return scored
+
+
+def bm25_entries(
+    index: InvertedIndex,
+    query: ParsedQuery,
+    shared: Optional[TermScores] = None,
+    corpus: Optional[InvertedIndex] = None
+) -> List[Tuple[float, str]]:
+    ordinals = matching_ordinals(index, query, SCORING_BM25) if not query.simple else None
+    scores = bm25_scores(index, query.terms, ordinals=ordinals, shared=shared, corpus=corpus)
+    return [(score, index.doc_ids[ordinal]) for ordinal, score in scores.items()]
+
+
+def normalize_bm25(entries: List[Tuple[float, str]]) -> List[Tuple[float, float, str]]:
+    if not entries:
+        return []
+
+    # Raw BM25 is unbounded; report scores relative to the best match so
+    # relevance_score keeps its documented 0.0-1.0 range.
+    top_score = max(score for score, _ in entries)
+    return [(round(score / top_score, 3), -score, doc_id) for score, doc_id in entries]
+
+
+def score_bm25(
+    index: InvertedIndex,
+    query: ParsedQuery,
+    shared: Optional[TermScores] = None
+) -> List[Tuple[float, float, str]]:
+    return normalize_bm25(bm25_entries(index, query, shared))
+
+
+def snippet_terms(query: ParsedQuery) -> List[str]:
+    terms: List[str] = []
+
+    def collect(clause: Clause) -> None:
+        if isinstance(clause, Near):
+            collect(clause.left)
+            collect(clause.right)
+        else:
+            terms.append(' '.join(clause.tokens) if isinstance(clause, Phrase) else clause.text)
+
+    for clause in query.clauses:
+        collect(clause)
+
+    return terms
+
+
+def rank_documents(
+    index: InvertedIndex,
+    query: ParsedQuery,
+    limit: int,
+    offset: int = 0,
+    scoring: str = SCORING_BM25,
+    shared: Optional[TermScores] = None
+) -> Tuple[List[Tuple[float, str]], int]:
+    if scoring == SCORING_LEGACY:
+        scored = score_legacy(index, query)
+    else:
+        scored = score_bm25(index, query, shared)
+
+    return select_page(scored, limit, offset), len(scored)
+
+
+def select_page(scored: List[Tuple[float, float, str]], limit: int, offset: int = 0) -> List[Tuple[float, str]]:
+    page = heapq.nsmallest(offset + limit, scored, key=lambda entry: (-entry[0], entry[1]))[offset:]
+    return [(relevance_score, doc_id) for relevance_score, _, doc_id in page]
+
+
+def iter_results(
+    query: ParsedQuery,
+    page: List[Tuple[float, str]],
+    scoring: str = SCORING_BM25,
+    passages: Optional[Mapping[str, Tuple[int, int]]] = None
+) -> Iterator[Dict[str, Any]]:
+    highlight_terms = snippet_terms(query)
+    exact = scoring != SCORING_LEGACY
+
+    for relevance_score, doc_id in page:
+        doc = get_normalized_document(doc_id)
+        if doc is None:
+            # Deleted between ranking and rendering.
+            continue
+        # A ranked passage is the snippet, unless the document has been
+        # replaced by a shorter one since the passage index was built.
+        passage = passages.get(doc_id) if passages is not None else None
+        if passage is not None and passage[1] <= doc.length:
+            snippet, highlights = build_snippet(
+                doc, highlight_terms, exact=exact, max_length=PASSAGE_SNIPPET_LENGTH, passage=passage
+            )
+        else:
+            snippet, highlights = build_snippet(doc, highlight_terms, exact=exact)
+        yield {
+            "id": doc.id,
+            "title": doc.title,
+            "summary": doc.summary,
+            "relevance_score": relevance_score,
+            "snippet": snippet,
+            "highlights": highlights
+        }
+
+
+def search_documents(
+    index: InvertedIndex,
+    query: ParsedQuery,
+    limit: int,
+    offset: int = 0,
+    scoring: str = SCORING_BM25
+) -> Tuple[List[Dict[str, Any]], int]:
+    page, total = rank_documents(index, query, limit, offset, scoring)
+    return list(iter_results(query, page, scoring)), total
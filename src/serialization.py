@@ -0,0 +1,105 @@
+import json
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+JSON_BACKEND = 'orjson' if orjson is not None else 'json'
+FRAGMENT_FIELDS = ('id', 'title', 'summary')
+DEFAULT_FRAGMENT_CACHE_SIZE = 4096
+COMPACT_SEPARATORS = (',', ':')
+# Encoder options FastJSONProvider can translate to orjson.
+ORJSON_KWARGS = {'separators', 'indent', 'sort_keys'}
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    # Used by jsonify. Flask always asks for compact separators (or, in
+    # debug mode, two-space indentation) and sorted keys, which orjson has
+    # options for; any other encoder option falls back to the stdlib.
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        option = self._orjson_option(kwargs)
+        if option is not None:
+            return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+        return super().dumps(obj, **kwargs)
+
+    def _orjson_option(self, kwargs: Dict[str, Any]) -> Optional[int]:
+        if orjson is None or not set(kwargs) <= ORJSON_KWARGS:
+            return None
+        if tuple(kwargs.get('separators', COMPACT_SEPARATORS)) != COMPACT_SEPARATORS or kwargs.get('indent') not in (None, 2):
+            return None
+
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get('indent') == 2:
+            option |= orjson.OPT_INDENT_2
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+
+class FragmentEncoder:
+    def __init__(self, capacity: int = DEFAULT_FRAGMENT_CACHE_SIZE) -> None:
+        self.capacity = capacity
+        self._fragments: Dict[Tuple[str, ...], bytes] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._fragments)
+
+    def fragment(self, document: Dict[str, Any]) -> bytes:
+        # Keyed on the field values themselves, so an edited document simply
+        # gets a new fragment. The strings come from the document cache and
+        # keep their hashes, which makes the lookup cheap.
+        key = tuple(document[field] for field in FRAGMENT_FIELDS)
+        encoded = self._fragments.get(key)
+
+        if encoded is None:
+            encoded = b','.join(dumps(field) + b':' + dumps(value) for field, value in zip(FRAGMENT_FIELDS, key))
+            with self._lock:
+                if len(self._fragments) >= self.capacity:
+                    self._fragments.clear()
+                self._fragments[key] = encoded
+
+        return encoded
+
+    def preload(self, documents: Iterable[Optional[Dict[str, Any]]]) -> None:
+        for document in documents:
+            if document is None or len(self._fragments) >= self.capacity:
+                continue
+            self.fragment(document)
+
+    def encode_result(self, result: Dict[str, Any]) -> bytes:
+        rest = [
+            dumps(field) + b':' + dumps(value)
+            for field, value in result.items() if field not in FRAGMENT_FIELDS
+        ]
+        return b'{' + b','.join([self.fragment(result)] + rest) + b'}'
+
+    def encode_results(self, results: Sequence[Dict[str, Any]]) -> bytes:
+        return b'[' + b','.join(self.encode_result(result) for result in results) + b']'
+
+    def encode_response(self, response: Dict[str, Any]) -> bytes:
+        # `results` lists are spliced from pre-encoded fragments; everything
+        # else goes through the regular encoder.
+        parts: List[bytes] = []
+        for field, value in response.items():
+            encoded = self.encode_results(value) if field == 'results' and _is_result_list(value) else dumps(value)
+            parts.append(dumps(field) + b':' + encoded)
+        return b'{' + b','.join(parts) + b'}'
+
+
+def _is_result_list(value: Any) -> bool:
+    return isinstance(value, list) and all(
+        isinstance(item, dict) and all(field in item for field in FRAGMENT_FIELDS) for item in value
+    )
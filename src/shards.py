@@ -0,0 +1,241 @@
+import heapq
+import multiprocessing
+import os
+import threading
+from multiprocessing.pool import Pool
+from typing import AbstractSet, Any, Dict, List, Mapping, Optional, Sequence, Tuple
+from src.documents import get_store
+from src.index import InvertedIndex
+from src.query import ParsedQuery
+from src.scoring import SCORING_BM25, SCORING_LEGACY, CorpusStatistics
+from src.search import bm25_entries, normalize_bm25, rank_documents, score_legacy, select_page
+
+
+ShardResult = Tuple[List[Tuple[float, float, str]], int]
+
+# Filled in the parent before a pool forks; children read the shards from
+# these copy-on-write pages instead of receiving them over a pipe. Shards
+# built after the fork are sent to the process that scores them.
+_registry: Dict[int, Dict[int, InvertedIndex]] = {}
+
+
+def partition_index(index: InvertedIndex, shard_count: int) -> List[InvertedIndex]:
+    size = max(1, -(-len(index) // shard_count))
+    bounds = [(start, min(start + size, len(index))) for start in range(0, len(index), size)]
+    postings: List[Dict[str, Dict[int, int]]] = [{} for _ in bounds]
+    positions: List[Dict[str, Dict[int, List[int]]]] = [{} for _ in bounds]
+
+    # Contiguous ordinal ranges, so a shard's local ordinals keep the global
+    # order and ties still break the same way after the merge.
+    for term, term_postings in index.postings.items():
+        term_positions = index.positions.get(term, {})
+        for ordinal, frequency in term_postings.items():
+            shard = ordinal // size
+            local = ordinal - bounds[shard][0]
+            postings[shard].setdefault(term, {})[local] = frequency
+            positions[shard].setdefault(term, {})[local] = list(term_positions.get(ordinal, ()))
+
+    return [
+        InvertedIndex(
+            postings=postings[shard],
+            doc_ids=index.doc_ids[start:end],
+            doc_lengths=list(index.doc_lengths[start:end]),
+            positions=positions[shard]
+        )
+        for shard, (start, end) in enumerate(bounds)
+    ]
+
+
+def score_shard(
+    searcher_id: int,
+    shard_number: int,
+    query: ParsedQuery,
+    scoring: str,
+    depth: int,
+    statistics: CorpusStatistics,
+    deleted_ids: AbstractSet[str] = frozenset()
+) -> Optional[ShardResult]:
+    # `statistics` describe the whole corpus, or a live index this
+    # searcher's corpus is only the base segment of. None when the
+    # searcher was replaced before this task ran.
+    shards = _registry.get(searcher_id)
+    if shards is None:
+        return None
+    shard = shards[shard_number]
+
+    if scoring == SCORING_LEGACY:
+        # Shards cover ascending ordinal ranges, so pairing the candidate
+        # order with the shard number keeps the global tie-break order.
+        scored = [
+            (score, (shard_number, order), doc_id)
+            for score, order, doc_id in score_legacy(shard, query) if doc_id not in deleted_ids
+        ]
+        return heapq.nsmallest(depth, scored, key=lambda entry: (-entry[0], entry[1])), len(scored)
+
+    entries = [
+        (score, doc_id)
+        for score, doc_id in bm25_entries(shard, query, corpus=statistics)
+        if doc_id not in deleted_ids
+    ]
+    return [(score, 0.0, doc_id) for score, doc_id in heapq.nlargest(depth, entries, key=lambda entry: entry[0])], len(entries)
+
+
+def install_shards(
+    searcher_id: int,
+    previous_id: int,
+    shards: Dict[int, InvertedIndex],
+    documents: Sequence[Dict[str, Any]]
+) -> None:
+    # Runs in a pool process. Legacy scoring reads the shard's documents
+    # from this process's copy of the store, which only has what it held
+    # when the pool forked.
+    store = get_store()
+    for document in documents:
+        store.put(document)
+    _registry.pop(previous_id, None)
+    _registry[searcher_id] = shards
+
+
+class ShardedSearcher:
+    def __init__(self, index: InvertedIndex, shard_count: int) -> None:
+        self.index = index
+        self.version = index.version
+        self.shard_count = shard_count
+        self.shards = partition_index(index, shard_count)
+        _registry[id(self)] = dict(enumerate(self.shards))
+
+        # One single-process pool per shard, so shards built later can be
+        # sent to the process that scores them.
+        self._pools: List[Pool] = []
+        self._pool_pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        # Forks the scoring processes, which read the shards from pages
+        # shared copy-on-write. Call it while this process has no other
+        # threads (gunicorn's post_fork hook, or before a server starts):
+        # a child forked next to a running thread can inherit a lock that
+        # thread held, such as a document store's cache lock, and deadlock.
+        # Pools don't survive a fork, so each worker starts its own.
+        with self._lock:
+            if self._pool_pid != os.getpid():
+                context = multiprocessing.get_context('fork')
+                self._pools = [context.Pool(1) for _ in self.shards]
+                self._pool_pid = os.getpid()
+
+    def rebuild(self, index: InvertedIndex, documents: Mapping[str, Dict[str, Any]]) -> 'ShardedSearcher':
+        # A searcher over a new index that takes over this one's processes
+        # instead of forking new ones, which a worker running threads can't
+        # do safely. `documents` holds every document added or replaced
+        # since this searcher's index was built. This searcher then scores
+        # unsharded, and its shards are released everywhere.
+        searcher = ShardedSearcher(index, self.shard_count)
+        with self._lock:
+            pools = self._pools if self._pool_pid == os.getpid() else []
+            self._pools = []
+            self._pool_pid = None
+            _registry.pop(id(self), None)
+
+        for number, pool in enumerate(pools):
+            shards = {
+                shard_number: shard
+                for shard_number, shard in enumerate(searcher.shards) if shard_number % len(pools) == number
+            }
+            changed = [
+                documents[doc_id]
+                for shard in shards.values() for doc_id in shard.doc_ids if doc_id in documents
+            ]
+            pool.apply(install_shards, (id(searcher), id(self), shards, changed))
+
+        if pools:
+            with searcher._lock:
+                searcher._pools = pools
+                searcher._pool_pid = os.getpid()
+        return searcher
+
+    def _started_pools(self) -> List[Pool]:
+        with self._lock:
+            return self._pools if self._pool_pid == os.getpid() else []
+
+    def _score_shards(
+        self,
+        query: ParsedQuery,
+        depth: int,
+        scoring: str,
+        statistics: CorpusStatistics,
+        deleted_ids: AbstractSet[str] = frozenset()
+    ) -> Optional[List[ShardResult]]:
+        # None when there is no pool in this process, the index changed
+        # after partitioning, or the searcher was replaced meanwhile.
+        pools = self._started_pools()
+        if not pools or self.index.version != self.version:
+            return None
+
+        pending = [
+            pools[shard_number % len(pools)].apply_async(
+                score_shard, (id(self), shard_number, query, scoring, depth, statistics, deleted_ids)
+            )
+            for shard_number in range(len(self.shards))
+        ]
+        results = [result.get() for result in pending]
+        if any(result is None for result in results):
+            return None
+        return results
+
+    def rank_documents(
+        self,
+        query: ParsedQuery,
+        limit: int,
+        offset: int = 0,
+        scoring: str = SCORING_BM25
+    ) -> Tuple[List[Tuple[float, str]], int]:
+        depth = offset + limit
+        statistics = CorpusStatistics.for_query(self.index, query.terms)
+        shard_results = self._score_shards(query, depth, scoring, statistics)
+        if shard_results is None:
+            # Stay correct, unsharded.
+            return rank_documents(self.index, query, limit, offset, scoring)
+
+        return merge_shard_results(shard_results, scoring, limit, offset)
+
+    def segment_results(
+        self,
+        query: ParsedQuery,
+        depth: int,
+        scoring: str,
+        corpus: InvertedIndex,
+        deleted_ids: AbstractSet[str]
+    ) -> Optional[List[ShardResult]]:
+        # The shards' entries for this index as the base segment of a live
+        # index, scored against the statistics of all segments; None when
+        # the pool can't serve them.
+        statistics = CorpusStatistics.for_query(corpus, query.terms)
+        return self._score_shards(query, depth, scoring, statistics, deleted_ids)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pool_pid == os.getpid():
+                for pool in self._pools:
+                    # Let queries already running on the pool finish.
+                    pool.close()
+                    pool.join()
+            self._pools = []
+            self._pool_pid = None
+            _registry.pop(id(self), None)
+
+
+def merge_shard_results(
+    shard_results: Sequence[ShardResult],
+    scoring: str,
+    limit: int,
+    offset: int = 0
+) -> Tuple[List[Tuple[float, str]], int]:
+    total = sum(count for _, count in shard_results)
+    merged: List[Any] = [entry for entries, _ in shard_results for entry in entries]
+
+    if scoring != SCORING_LEGACY:
+        # Every shard used corpus-wide statistics, so raw scores compare
+        # directly and are normalized once, against the global best.
+        merged = normalize_bm25([(score, doc_id) for score, _, doc_id in merged])
+
+    return select_page(merged, limit, offset), total
@@ -0,0 +1,251 @@
+import argparse
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+from src.documents import get_store, set_store
+from src.index import InvertedIndex
+from src.store import DocumentStore, open_store
+
+
+SNAPSHOT_MAGIC = b"LDIX"
+SNAPSHOT_FORMAT_VERSION = 2
+PREAMBLE = struct.Struct("<4sII")
+ITEM_SIZE = array('i').itemsize
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class PostingView(Mapping[int, int]):
+    __slots__ = ('_ordinals', '_frequencies')
+
+    def __init__(self, ordinals: memoryview, frequencies: memoryview) -> None:
+        self._ordinals = ordinals
+        self._frequencies = frequencies
+
+    def __len__(self) -> int:
+        return len(self._ordinals)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._ordinals)
+
+    def __getitem__(self, ordinal: int) -> int:
+        position = bisect_left(self._ordinals, ordinal)
+        if position == len(self._ordinals) or self._ordinals[position] != ordinal:
+            raise KeyError(ordinal)
+        return self._frequencies[position]
+
+    def items(self) -> Iterator[Tuple[int, int]]:
+        return zip(self._ordinals, self._frequencies)
+
+
+class PositionsView(Mapping[int, memoryview]):
+    __slots__ = ('_ordinals', '_frequencies', '_starts', '_positions')
+
+    def __init__(self, ordinals: memoryview, frequencies: memoryview, starts: memoryview, positions: memoryview) -> None:
+        self._ordinals = ordinals
+        self._frequencies = frequencies
+        self._starts = starts
+        self._positions = positions
+
+    def __len__(self) -> int:
+        return len(self._ordinals)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._ordinals)
+
+    def __getitem__(self, ordinal: int) -> memoryview:
+        position = bisect_left(self._ordinals, ordinal)
+        if position == len(self._ordinals) or self._ordinals[position] != ordinal:
+            raise KeyError(ordinal)
+        start = self._starts[position]
+        return self._positions[start:start + self._frequencies[position]]
+
+    def items(self) -> Iterator[Tuple[int, memoryview]]:
+        for ordinal, start, frequency in zip(self._ordinals, self._starts, self._frequencies):
+            yield ordinal, self._positions[start:start + frequency]
+
+
+class MappedPostings(Mapping[str, PostingView]):
+    def __init__(self, buffer: memoryview, terms: Dict[str, List[int]]) -> None:
+        self._buffer = buffer
+        self._terms = terms
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._terms)
+
+    def __contains__(self, term: object) -> bool:
+        return term in self._terms
+
+    def __getitem__(self, term: str) -> PostingView:
+        offset, count, _ = self._terms[term]
+        size = count * ITEM_SIZE
+        return PostingView(
+            self._buffer[offset:offset + size].cast('i'),
+            self._buffer[offset + size:offset + 2 * size].cast('i')
+        )
+
+
+class MappedPositions(MappedPostings):
+    def __getitem__(self, term: str) -> PositionsView:
+        offset, count, position_count = self._terms[term]
+        size = count * ITEM_SIZE
+        positions_offset = offset + 3 * size
+        return PositionsView(
+            self._buffer[offset:offset + size].cast('i'),
+            self._buffer[offset + size:offset + 2 * size].cast('i'),
+            self._buffer[offset + 2 * size:positions_offset].cast('i'),
+            self._buffer[positions_offset:positions_offset + position_count * ITEM_SIZE].cast('i')
+        )
+
+
+def save_snapshot(index: InvertedIndex, path: str, fingerprint: str = '') -> None:
+    terms: Dict[str, List[int]] = {}
+    body = bytearray()
+
+    doc_lengths_offset = len(body)
+    body += array('i', index.doc_lengths).tobytes()
+
+    # Per term: document ordinals, term frequencies, offsets into the
+    # term's position block, then the positions themselves.
+    for term, term_postings in index.postings.items():
+        ordinals = sorted(term_postings)
+        term_positions = index.positions[term]
+        frequencies = [term_postings[ordinal] for ordinal in ordinals]
+        starts = [0] * len(ordinals)
+        for position in range(1, len(ordinals)):
+            starts[position] = starts[position - 1] + frequencies[position - 1]
+
+        terms[term] = [len(body), len(ordinals), sum(frequencies)]
+        body += array('i', ordinals).tobytes()
+        body += array('i', frequencies).tobytes()
+        body += array('i', starts).tobytes()
+        for ordinal in ordinals:
+            body += array('i', term_positions[ordinal]).tobytes()
+
+    header = json.dumps({
+        "fingerprint": fingerprint,
+        "byteorder": sys.byteorder,
+        "item_size": ITEM_SIZE,
+        "doc_ids": index.doc_ids,
+        "doc_lengths_offset": doc_lengths_offset,
+        "terms": terms
+    }).encode('utf-8')
+    # Keep the body aligned so integer arrays can be cast straight from the map.
+    header += b" " * (-(PREAMBLE.size + len(header)) % ITEM_SIZE)
+
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, 'wb') as handle:
+        handle.write(PREAMBLE.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT_VERSION, len(header)))
+        handle.write(header)
+        handle.write(body)
+    os.replace(temporary_path, path)
+
+
+def read_header(path: str) -> Tuple[Dict[str, Any], int]:
+    with open(path, 'rb') as handle:
+        preamble = handle.read(PREAMBLE.size)
+        if len(preamble) != PREAMBLE.size:
+            raise SnapshotError(f"{path} is not an index snapshot")
+
+        magic, format_version, header_length = PREAMBLE.unpack(preamble)
+        if magic != SNAPSHOT_MAGIC:
+            raise SnapshotError(f"{path} is not an index snapshot")
+        if format_version != SNAPSHOT_FORMAT_VERSION:
+            raise SnapshotError(
+                f"{path} has snapshot format {format_version}, expected {SNAPSHOT_FORMAT_VERSION}"
+            )
+
+        header = json.loads(handle.read(header_length))
+
+    if header["byteorder"] != sys.byteorder or header["item_size"] != ITEM_SIZE:
+        raise SnapshotError(f"{path} was built on an incompatible platform")
+
+    return header, PREAMBLE.size + header_length
+
+
+def load_snapshot(path: str, fingerprint: Optional[str] = None) -> InvertedIndex:
+    header, body_offset = read_header(path)
+
+    if fingerprint is not None and header["fingerprint"] != fingerprint:
+        raise SnapshotError(f"{path} was built from a different corpus")
+
+    with open(path, 'rb') as handle:
+        mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+    # Posting arrays stay in the shared read-only mapping; only the term
+    # dictionary and document ids are materialized per process.
+    body = memoryview(mapped)[body_offset:]
+    doc_count = len(header["doc_ids"])
+    lengths_offset = header["doc_lengths_offset"]
+
+    return InvertedIndex(
+        postings=MappedPostings(body, header["terms"]),
+        doc_ids=header["doc_ids"],
+        doc_lengths=body[lengths_offset:lengths_offset + doc_count * ITEM_SIZE].cast('i'),
+        positions=MappedPositions(body, header["terms"])
+    )
+
+
+def load_or_build_index(store: DocumentStore, snapshot_path: str = '') -> InvertedIndex:
+    if snapshot_path and os.path.exists(snapshot_path):
+        try:
+            return load_snapshot(snapshot_path, store.fingerprint())
+        except SnapshotError as error:
+            logger.warning("Ignoring index snapshot, rebuilding in memory: %s", error)
+
+    return InvertedIndex.from_documents(store.iter_normalized())
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog='python -m src.snapshot', description="Build or inspect index snapshots.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help="Build a snapshot from a document store.")
+    build.add_argument('output', help="Snapshot file to write.")
+    build.add_argument('--store', default='', help="Document store spec (defaults to the built-in corpus).")
+
+    info = commands.add_parser('info', help="Print snapshot metadata.")
+    info.add_argument('path')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        if args.store:
+            set_store(open_store(args.store))
+        store = get_store()
+        index = InvertedIndex.from_documents(store.iter_normalized())
+        save_snapshot(index, args.output, store.fingerprint())
+        print(f"Wrote snapshot of {len(index)} documents and {len(index.postings)} terms to {args.output}")
+        return 0
+
+    try:
+        header, _ = read_header(args.path)
+    except SnapshotError as error:
+        print(str(error), file=sys.stderr)
+        return 1
+
+    print(json.dumps({
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "fingerprint": header["fingerprint"],
+        "documents": len(header["doc_ids"]),
+        "terms": len(header["terms"]),
+        "size_bytes": os.path.getsize(args.path)
+    }, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
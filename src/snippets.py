@@ -0,0 +1,133 @@
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+from src.documents import NormalizedDocument, tokenize
+
+
+ELLIPSIS = "..."
+# Long enough for a typical paragraph to be returned whole.
+PASSAGE_SNIPPET_LENGTH = 600
+
+Hit = Tuple[int, int, int]
+
+
+def find_hits(
+    document: NormalizedDocument,
+    terms: Sequence[str],
+    exact: bool = True,
+    passage: Optional[Tuple[int, int]] = None
+) -> List[Hit]:
+    single: Dict[str, List[int]] = {}
+    substrings: List[Tuple[int, str]] = []
+    phrases: Dict[str, List[Tuple[int, List[str]]]] = {}
+
+    for term_id, term in enumerate(terms):
+        tokens = tokenize(term)
+        if len(tokens) > 1:
+            phrases.setdefault(tokens[0], []).append((term_id, tokens))
+        elif tokens and exact:
+            single.setdefault(tokens[0], []).append(term_id)
+        elif tokens:
+            substrings.append((term_id, tokens[0]))
+
+    hits: List[Hit] = []
+    doc_tokens = document.tokens
+    offsets = document.offsets
+    first, stop = passage if passage is not None else (0, len(doc_tokens))
+
+    # One pass over the document's tokens; hits come out ordered by position.
+    for position in range(first, stop):
+        token = doc_tokens[position]
+        start, end = offsets[position]
+
+        for term_id in single.get(token, ()):
+            hits.append((start, end, term_id))
+
+        for term_id, term in substrings:
+            found = token.find(term)
+            if found != -1:
+                hits.append((start + found, start + found + len(term), term_id))
+
+        for term_id, tokens in phrases.get(token, ()):
+            last = position + len(tokens)
+            if last <= stop and doc_tokens[position:last] == tokens:
+                hits.append((start, offsets[last - 1][1], term_id))
+
+    return hits
+
+
+def densest_window(hits: Sequence[Hit], width: int) -> Tuple[int, int]:
+    # Two pointers over the hits: keep the window no wider than `width`
+    # characters and prefer the one covering the most distinct terms,
+    # then the most hits.
+    counts: Counter = Counter()
+    best = (0, 0, 0, 1)
+    first = 0
+
+    for last, (_, end, term_id) in enumerate(hits):
+        counts[term_id] += 1
+        while end - hits[first][0] > width and first < last:
+            counts[hits[first][2]] -= 1
+            if not counts[hits[first][2]]:
+                del counts[hits[first][2]]
+            first += 1
+
+        coverage = (len(counts), last - first + 1)
+        if coverage > best[:2]:
+            best = (coverage[0], coverage[1], first, last + 1)
+
+    return best[2], best[3]
+
+
+def build_snippet(
+    document: NormalizedDocument,
+    terms: Sequence[str],
+    exact: bool = True,
+    max_length: int = 200,
+    context_chars: int = 50,
+    passage: Optional[Tuple[int, int]] = None
+) -> Tuple[str, List[List[int]]]:
+    # With a passage, the snippet is drawn from that paragraph only, and is
+    # the whole paragraph when it fits in `max_length`.
+    content = document.content
+    lower, upper = passage_bounds(document, passage) if passage is not None else (0, len(content))
+    hits = find_hits(document, terms, exact, passage) if terms else []
+
+    if passage is not None and upper - lower <= max_length:
+        start, end = lower, upper
+    elif not hits:
+        start, end = lower, min(upper, lower + max_length)
+    else:
+        first, last = densest_window(hits, max(max_length - 2 * context_chars, 1))
+        window = hits[first:last]
+        window_start = window[0][0]
+        window_end = max(end for _, end, _ in window)
+
+        start = max(lower, window_start - context_chars)
+        end = min(upper, window_end + context_chars, start + max_length)
+        hits = window
+
+    prefix = ELLIPSIS if start > lower else ""
+    snippet = prefix + content[start:end] + (ELLIPSIS if end < upper else "")
+
+    # Offsets are relative to the returned snippet; overlapping hits (a
+    # phrase and one of its words, say) are merged into one highlight.
+    highlights: List[List[int]] = []
+    shift = len(prefix) - start
+    for hit_start, hit_end, _ in sorted(hits):
+        if hit_end > end:
+            continue
+        if highlights and hit_start + shift <= highlights[-1][1]:
+            highlights[-1][1] = max(highlights[-1][1], hit_end + shift)
+        else:
+            highlights.append([hit_start + shift, hit_end + shift])
+
+    return snippet, highlights
+
+
+def passage_bounds(document: NormalizedDocument, passage: Tuple[int, int]) -> Tuple[int, int]:
+    # From the paragraph's first token to the next paragraph, so trailing
+    # punctuation is kept and the blank lines are not.
+    first, stop = passage
+    lower = document.offsets[first][0]
+    upper = document.offsets[stop][0] if stop < len(document.offsets) else len(document.content)
+    return lower, lower + len(document.content[lower:upper].rstrip())
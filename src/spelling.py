@@ -0,0 +1,153 @@
+import re
+from bisect import bisect_left
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from src.index import InvertedIndex
+from src.query import ParsedQuery, replace_tokens
+
+
+# Shorter terms have too many neighbours one edit away to guess from.
+MIN_CORRECTION_LENGTH = 4
+LONG_TERM_LENGTH = 8
+GRAM_SIZE = 3
+QUERY_WORD_PATTERN = re.compile(r'\w+')
+QUERY_OPERATORS = {'AND', 'OR', 'NOT', 'NEAR'}
+
+
+def max_edits(term: str) -> int:
+    if len(term) < MIN_CORRECTION_LENGTH or not term.isalpha():
+        return 0
+    return 1 if len(term) < LONG_TERM_LENGTH else 2
+
+
+def trigrams(term: str) -> Set[str]:
+    padded = f"${term}$"
+    return {padded[start:start + GRAM_SIZE] for start in range(len(padded) - GRAM_SIZE + 1)}
+
+
+def edit_distance(left: str, right: str, bound: int) -> int:
+    # Levenshtein distance counting a swap of adjacent characters as one
+    # edit (optimal string alignment), or bound + 1 as soon as every cell
+    # of a row exceeds the bound.
+    if abs(len(left) - len(right)) > bound:
+        return bound + 1
+
+    before: List[int] = []
+    previous = list(range(len(right) + 1))
+    for row, left_char in enumerate(left, 1):
+        current = [row]
+        for column, right_char in enumerate(right, 1):
+            cost = min(
+                previous[column] + 1,
+                current[column - 1] + 1,
+                previous[column - 1] + (left_char != right_char)
+            )
+            if row > 1 and column > 1 and left_char == right[column - 2] and left[row - 2] == right_char:
+                cost = min(cost, before[column - 2] + 1)
+            current.append(cost)
+        if min(current) > bound:
+            return bound + 1
+        before, previous = previous, current
+
+    return min(previous[-1], bound + 1)
+
+
+class TrigramIndex:
+    # Maps (term length, trigram) to vocabulary terms. A term within k edits
+    # of the query is at most k characters longer or shorter and shares all
+    # but 4k of its trigrams (a swap breaks four), so lookups only count
+    # postings for a handful of lengths and verify the few terms that pass
+    # the count filter.
+
+    def __init__(self, index: InvertedIndex) -> None:
+        self.terms: List[str] = []
+        self.gram_counts: List[int] = []
+        self.postings: Dict[Tuple[int, str], List[int]] = {}
+        # Every distinct suffix long enough to hold a correctable term, so
+        # legacy substring matching can be checked with one bisection
+        # instead of a scan over the vocabulary.
+        self.suffixes: List[str] = sorted({
+            term[start:]
+            for term in index.postings
+            for start in range(len(term) - MIN_CORRECTION_LENGTH + 1)
+        })
+
+        for term in index.postings:
+            if len(term) < MIN_CORRECTION_LENGTH - 1 or not term.isalpha():
+                continue
+            grams = trigrams(term)
+            term_id = len(self.terms)
+            self.terms.append(term)
+            self.gram_counts.append(len(grams))
+            for gram in grams:
+                self.postings.setdefault((len(term), gram), []).append(term_id)
+
+    def contains(self, term: str) -> bool:
+        # Whether a vocabulary term contains `term`; only answered for terms
+        # of at least MIN_CORRECTION_LENGTH characters, the only ones that
+        # are ever corrected.
+        position = bisect_left(self.suffixes, term)
+        return position < len(self.suffixes) and self.suffixes[position].startswith(term)
+
+    def candidates(self, term: str, edits: int) -> List[str]:
+        grams = trigrams(term)
+        shared: Counter = Counter()
+
+        for length in range(len(term) - edits, len(term) + edits + 1):
+            for gram in grams:
+                shared.update(self.postings.get((length, gram), ()))
+
+        return [
+            self.terms[term_id] for term_id, count in shared.items()
+            if count >= max(len(grams), self.gram_counts[term_id]) - (GRAM_SIZE + 1) * edits
+        ]
+
+    def suggest(self, term: str, doc_freq: Callable[[str], int], extra: Iterable[str] = ()) -> Optional[str]:
+        # The closest term that still occurs in the corpus. On ties a word
+        # form of the term ("patents" for "patent") beats an unrelated word,
+        # then the more common term wins. `extra` covers terms added since
+        # the index was built.
+        edits = max_edits(term)
+        if not edits:
+            return None
+
+        best: Optional[Tuple[int, bool, int, str]] = None
+        for candidate in [*self.candidates(term, edits), *extra]:
+            distance = edit_distance(term, candidate, edits)
+            if distance > edits or candidate == term:
+                continue
+            frequency = doc_freq(candidate)
+            ranked = (distance, not candidate.startswith(term), -frequency, candidate)
+            if frequency and (best is None or ranked < best):
+                best = ranked
+
+        return best[3] if best is not None else None
+
+
+def correct_query(
+    query: ParsedQuery,
+    is_known: Callable[[str], bool],
+    suggest: Callable[[str], Optional[str]]
+) -> Tuple[ParsedQuery, Dict[str, str]]:
+    corrections: Dict[str, str] = {}
+
+    def replace(token: str) -> str:
+        if token not in corrections:
+            correction = None if is_known(token) else suggest(token)
+            corrections[token] = correction or token
+        return corrections[token]
+
+    corrected = replace_tokens(query, replace)
+    return corrected, {token: correction for token, correction in corrections.items() if correction != token}
+
+
+def corrected_text(query: str, corrections: Dict[str, str]) -> str:
+    # Applies corrections to the query as typed, so operators, quotes and
+    # grouping come back unchanged.
+    def replace(match: re.Match) -> str:
+        word = match.group()
+        if word in QUERY_OPERATORS:
+            return word
+        return corrections.get(word.lower(), word)
+
+    return QUERY_WORD_PATTERN.sub(replace, query)
@@ -0,0 +1,361 @@
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from src.documents import LEGAL_DOCUMENTS, NormalizedDocument, normalize_document
+
+
+DEFAULT_NORMALIZED_CACHE_SIZE = 256
+
+
+class DocumentStore(ABC):
+    def __init__(self, cache_size: int = DEFAULT_NORMALIZED_CACHE_SIZE) -> None:
+        self._metadata: Dict[str, Dict[str, Any]] = {}
+        self._etags: Dict[str, str] = {}
+        self._ingested: Dict[str, Dict[str, Any]] = {}
+        self.last_modified = time.time()
+        # Set by the first ingested change; None while the store matches its source.
+        self.changed_at: Optional[float] = None
+        self._normalized: 'OrderedDict[str, NormalizedDocument]' = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._metadata)
+
+    def __contains__(self, document_id: str) -> bool:
+        return document_id in self._metadata
+
+    def ids(self) -> List[str]:
+        return list(self._metadata)
+
+    def metadata(self, document_id: str) -> Optional[Dict[str, Any]]:
+        return self._metadata.get(document_id)
+
+    def etag(self, document_id: str) -> Optional[str]:
+        return self._etags.get(document_id)
+
+    def get(self, document_id: str) -> Optional[Dict[str, Any]]:
+        if document_id not in self._metadata:
+            return None
+        ingested = self._ingested.get(document_id)
+        if ingested is not None:
+            return dict(ingested)
+        return self._load_document(document_id)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for document_id in list(self._metadata):
+            document = self.get(document_id)
+            if document is not None:
+                yield document
+
+    def put(self, document: Dict[str, Any]) -> bool:
+        # Ingested documents are held in memory on top of the backing
+        # files, which are never written to; the ingest journal is what
+        # makes them durable.
+        with self._lock:
+            created = document['id'] not in self._metadata
+            self._remember(document)
+            self._ingested[document['id']] = dict(document)
+            self._normalized.pop(document['id'], None)
+            self.last_modified = self.changed_at = time.time()
+        return created
+
+    def delete(self, document_id: str) -> bool:
+        with self._lock:
+            if document_id not in self._metadata:
+                return False
+            del self._metadata[document_id]
+            self._etags.pop(document_id, None)
+            self._ingested.pop(document_id, None)
+            self._normalized.pop(document_id, None)
+            self.last_modified = self.changed_at = time.time()
+        return True
+
+    def normalized(self, document_id: str) -> Optional[NormalizedDocument]:
+        with self._lock:
+            document = self._normalized.get(document_id)
+            if document is not None:
+                self._normalized.move_to_end(document_id)
+                return document
+
+        raw = self.get(document_id)
+        if raw is None:
+            return None
+
+        document = normalize_document(raw)
+        with self._lock:
+            self._normalized[document_id] = document
+            while len(self._normalized) > self._cache_size:
+                self._normalized.popitem(last=False)
+        return document
+
+    def iter_normalized(self) -> Iterator[NormalizedDocument]:
+        for document_id in list(self._metadata):
+            document = self.normalized(document_id)
+            if document is not None:
+                yield document
+
+    def preload_normalized(self) -> int:
+        # Fills the cache up front so forked workers share the normalized
+        # documents instead of each normalizing into its own heap.
+        count = 0
+        for document_id in self.ids()[:self._cache_size]:
+            if self.normalized(document_id) is not None:
+                count += 1
+        return count
+
+    @abstractmethod
+    def fingerprint(self) -> str:
+        ...
+
+    def _remember(self, document: Dict[str, Any], hashed: bool = True) -> None:
+        # File-backed stores see every full document once while loading,
+        # which is the only time its content hash is computed.
+        self._metadata[document['id']] = {key: value for key, value in document.items() if key != 'content'}
+        if hashed:
+            self._etags[document['id']] = document_etag(document)
+
+    def _load_document(self, document_id: str) -> Dict[str, Any]:
+        return {**self._metadata[document_id], "content": self._load_content(document_id)}
+
+    @abstractmethod
+    def _load_content(self, document_id: str) -> str:
+        ...
+
+
+class MemoryStore(DocumentStore):
+    def __init__(self, documents: Dict[str, Dict[str, Any]]) -> None:
+        super().__init__(cache_size=len(documents))
+        self._documents = documents
+
+        # Nothing is normalized or hashed up front: with an index snapshot
+        # most documents are only ever read for a results page, and
+        # `normalized()` caches each one on first use without evicting.
+        for document in documents.values():
+            self._remember(document, hashed=False)
+
+    def etag(self, document_id: str) -> Optional[str]:
+        etag = self._etags.get(document_id)
+        if etag is None and document_id in self._metadata:
+            document = self.get(document_id)
+            etag = self._etags[document_id] = document_etag(document)
+        return etag
+
+    def _load_document(self, document_id: str) -> Dict[str, Any]:
+        return self._documents[document_id]
+
+    def fingerprint(self) -> str:
+        digest = hashlib.sha1()
+        for document in self._documents.values():
+            digest.update(json.dumps(document, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _load_content(self, document_id: str) -> str:
+        return self._documents[document_id]['content']
+
+
+class JsonlStore(DocumentStore):
+    def __init__(self, path: str, cache_size: int = DEFAULT_NORMALIZED_CACHE_SIZE) -> None:
+        super().__init__(cache_size)
+        self.path = path
+        self.last_modified = os.stat(path).st_mtime
+        self._spans: Dict[str, Tuple[int, int]] = {}
+
+        with open(path, 'rb') as handle:
+            offset = 0
+            for line in handle:
+                if line.strip():
+                    document = json.loads(line)
+                    self._remember(document)
+                    self._spans[document['id']] = (offset, len(line))
+                offset += len(line)
+
+        self._fd = os.open(path, os.O_RDONLY)
+
+    def _load_document(self, document_id: str) -> Dict[str, Any]:
+        offset, length = self._spans[document_id]
+        return json.loads(os.pread(self._fd, length, offset))
+
+    def fingerprint(self) -> str:
+        return _stat_fingerprint([self.path])
+
+    def _load_content(self, document_id: str) -> str:
+        return self._load_document(document_id)['content']
+
+
+class DirectoryStore(DocumentStore):
+    def __init__(self, path: str, cache_size: int = DEFAULT_NORMALIZED_CACHE_SIZE) -> None:
+        super().__init__(cache_size)
+        self.path = path
+        self.last_modified = 0.0
+        self._files: Dict[str, str] = {}
+
+        for name in sorted(os.listdir(path)):
+            if not name.endswith('.json'):
+                continue
+            file_path = os.path.join(path, name)
+            document = self._read(file_path)
+            document.setdefault('id', name[:-len('.json')])
+            self._remember(document)
+            self._files[document['id']] = file_path
+            self.last_modified = max(self.last_modified, os.stat(file_path).st_mtime)
+
+    def _load_document(self, document_id: str) -> Dict[str, Any]:
+        return {"id": document_id, **self._read(self._files[document_id])}
+
+    def fingerprint(self) -> str:
+        return _stat_fingerprint(list(self._files.values()))
+
+    def _load_content(self, document_id: str) -> str:
+        return self._load_document(document_id)['content']
+
+    @staticmethod
+    def _read(file_path: str) -> Dict[str, Any]:
+        with open(file_path, encoding='utf-8') as handle:
+            return json.load(handle)
+
+
+class ReadOnlyConnections:
+    # One read-only connection per thread and per process, so forked
+    # workers never share a handle opened by the parent.
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+
+    def get(self) -> sqlite3.Connection:
+        if getattr(self._local, 'pid', None) != os.getpid():
+            self._local.connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+
+class SqliteStore(DocumentStore):
+    def __init__(self, path: str, cache_size: int = DEFAULT_NORMALIZED_CACHE_SIZE) -> None:
+        super().__init__(cache_size)
+        self.path = path
+        self.last_modified = os.stat(path).st_mtime
+        self.connections = ReadOnlyConnections(path)
+
+        rows = self._connection().execute(
+            "SELECT id, title, summary, content, relevance_score FROM documents ORDER BY rowid"
+        )
+        for document_id, title, summary, content, relevance_score in rows:
+            self._remember({
+                "id": document_id,
+                "title": title,
+                "summary": summary,
+                "content": content,
+                "relevance_score": relevance_score
+            })
+
+    def _connection(self) -> sqlite3.Connection:
+        return self.connections.get()
+
+    def fingerprint(self) -> str:
+        return _stat_fingerprint([self.path])
+
+    def _load_content(self, document_id: str) -> str:
+        row = self._connection().execute("SELECT content FROM documents WHERE id = ?", (document_id,)).fetchone()
+        return row[0]
+
+
+def document_etag(document: Dict[str, Any]) -> str:
+    payload = json.dumps(document, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha1(payload).hexdigest()
+
+
+def _stat_fingerprint(paths: List[str]) -> str:
+    digest = hashlib.sha1()
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def open_store(spec: str, cache_size: int = DEFAULT_NORMALIZED_CACHE_SIZE) -> DocumentStore:
+    kind, _, path = spec.partition(':')
+
+    if not path:
+        kind, path = '', spec
+
+    if not kind:
+        if os.path.isdir(path):
+            kind = 'dir'
+        elif path.endswith(('.db', '.sqlite', '.sqlite3')):
+            kind = 'sqlite'
+        else:
+            kind = 'jsonl'
+
+    if kind == 'jsonl':
+        return JsonlStore(path, cache_size)
+    if kind == 'dir':
+        return DirectoryStore(path, cache_size)
+    if kind == 'sqlite':
+        return SqliteStore(path, cache_size)
+
+    raise ValueError(f"Unknown document store type: {kind}")
+
+
+def write_jsonl(documents: Iterable[Dict[str, Any]], path: str) -> None:
+    with open(path, 'w', encoding='utf-8') as handle:
+        for document in documents:
+            handle.write(json.dumps(document, ensure_ascii=False) + "\n")
+
+
+def write_directory(documents: Iterable[Dict[str, Any]], path: str) -> None:
+    os.makedirs(path, exist_ok=True)
+    for document in documents:
+        with open(os.path.join(path, f"{document['id']}.json"), 'w', encoding='utf-8') as handle:
+            json.dump(document, handle, ensure_ascii=False, indent=2)
+
+
+def write_sqlite(documents: Iterable[Dict[str, Any]], path: str) -> None:
+    from src.fts import create_fts_index, fts5_available
+
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "id TEXT PRIMARY KEY, title TEXT NOT NULL, summary TEXT NOT NULL, "
+            "content TEXT NOT NULL, relevance_score REAL)"
+        )
+        connection.executemany(
+            "INSERT OR REPLACE INTO documents (id, title, summary, content, relevance_score) VALUES (?, ?, ?, ?, ?)",
+            [
+                (doc['id'], doc['title'], doc['summary'], doc['content'], doc.get('relevance_score'))
+                for doc in documents
+            ]
+        )
+        # Ship the full-text index in the same file, for SEARCH_BACKEND=fts5.
+        if fts5_available(connection):
+            create_fts_index(connection)
+    connection.close()
+
+
+def main(argv: List[str]) -> int:
+    if len(argv) != 2 or argv[0] != 'export':
+        print("usage: python -m src.store export <jsonl:PATH|dir:PATH|sqlite:PATH>", file=sys.stderr)
+        return 2
+
+    kind, _, path = argv[1].partition(':')
+    writers = {"jsonl": write_jsonl, "dir": write_directory, "sqlite": write_sqlite}
+
+    if kind not in writers or not path:
+        print(f"Unknown export target: {argv[1]}", file=sys.stderr)
+        return 2
+
+    writers[kind](LEGAL_DOCUMENTS.values(), path)
+    print(f"Exported {len(LEGAL_DOCUMENTS)} documents to {argv[1]}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
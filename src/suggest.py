@@ -0,0 +1,158 @@
+import heapq
+from bisect import bisect_left
+from typing import AbstractSet, Any, Callable, Dict, Generic, Iterable, List, Optional, Sequence, Tuple, TypeVar
+from src.documents import TOKEN_PATTERN, tokenize
+from src.index import InvertedIndex
+from src.store import DocumentStore
+
+
+# Prefixes matching more keys than this get their top suggestions
+# precomputed; narrower ones are ranked on the fly.
+WIDE_PREFIX = 64
+KEY_END = '\U0010ffff'
+
+Value = TypeVar('Value')
+
+
+class PrefixTable(Generic[Value]):
+    # Keys in sorted order, so every key starting with a prefix sits in one
+    # contiguous range found by two bisections. Short prefixes cover most of
+    # the table, so their best entries are ranked once, at build time.
+
+    def __init__(self, entries: Iterable[Tuple[str, Any, Value]], limit: int) -> None:
+        ordered = sorted(entries, key=lambda entry: entry[0])
+        self.keys = [key for key, _, _ in ordered]
+        self.ranks = [rank for _, rank, _ in ordered]
+        self.values = [value for _, _, value in ordered]
+        self.limit = limit
+        self._top: Dict[str, List[Tuple[Any, Value]]] = {}
+
+        wide = [('', 0, len(self.keys))]
+        while wide:
+            prefix, low, high = wide.pop()
+            self._top[prefix] = self._ranked(low, high, limit)
+            depth = len(prefix)
+            start = low
+            while start < high:
+                if len(self.keys[start]) <= depth:
+                    start += 1
+                    continue
+                child = prefix + self.keys[start][depth]
+                end = bisect_left(self.keys, child + KEY_END, start, high)
+                if end - start > WIDE_PREFIX:
+                    wide.append((child, start, end))
+                start = end
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def lookup(self, prefix: str, limit: int, keep: Optional[Callable[[Value], bool]] = None) -> List[Value]:
+        return [value for _, value in self.ranked_lookup(prefix, limit, keep)]
+
+    def ranked_lookup(
+        self,
+        prefix: str,
+        limit: int,
+        keep: Optional[Callable[[Value], bool]] = None
+    ) -> List[Tuple[Any, Value]]:
+        # Values with the best rank they have under the prefix. `keep`
+        # filters out values that no longer apply; if it leaves too few of
+        # the precomputed ones, the whole range is ranked instead.
+        top = self._top.get(prefix)
+        if top is not None:
+            kept = [(rank, value) for rank, value in top if keep is None or keep(value)]
+            if len(kept) >= limit or len(top) < self.limit:
+                return kept[:limit]
+        low = bisect_left(self.keys, prefix)
+        high = bisect_left(self.keys, prefix + KEY_END, low)
+        return self._ranked(low, high, min(limit, self.limit), keep)
+
+    def _ranked(
+        self,
+        low: int,
+        high: int,
+        limit: int,
+        keep: Optional[Callable[[Value], bool]] = None
+    ) -> List[Tuple[Any, Value]]:
+        # A value can sit under several keys (a title under each of its
+        # words), so take more entries until `limit` distinct ones are found.
+        count = limit
+        while True:
+            positions = heapq.nsmallest(count, range(low, high), key=self.ranks.__getitem__)
+            found: Dict[Value, Any] = {}
+            for position in positions:
+                value = self.values[position]
+                if value not in found and (keep is None or keep(value)):
+                    found[value] = self.ranks[position]
+            if len(found) >= limit or len(positions) < count:
+                return [(rank, value) for value, rank in found.items()][:limit]
+            count *= 2
+
+
+class SuggestIndex:
+    # Type-ahead over corpus terms, ranked by document frequency, and over
+    # document titles, matched from the start of any title word.
+
+    def __init__(self, index: InvertedIndex, store: DocumentStore, limit: int) -> None:
+        self.index = index
+        self.terms: PrefixTable[Tuple[str, int]] = PrefixTable(
+            ((term, -index.doc_freq(term), (term, index.doc_freq(term))) for term in index.postings),
+            limit
+        )
+        self.titles: PrefixTable[Tuple[str, str]] = PrefixTable(self._title_entries(index, store), limit)
+
+    @staticmethod
+    def _title_entries(index: InvertedIndex, store: DocumentStore) -> Iterable[Tuple[str, Any, Tuple[str, str]]]:
+        for ordinal, document_id in enumerate(index.doc_ids):
+            metadata = store.metadata(document_id)
+            if metadata is None:
+                continue
+            title = metadata['title']
+            words = tokenize(title)
+            # Titles that start with the typed text come first, then shorter
+            # titles.
+            for start in range(len(words)):
+                yield ' '.join(words[start:]), (start, len(words), ordinal), (document_id, title)
+
+    def suggest(self, text: str, limit: int) -> Dict[str, List[Dict[str, Any]]]:
+        return suggest_segments([(self, frozenset())], text, limit, self.index.doc_freq)
+
+
+def suggest_segments(
+    parts: Sequence[Tuple[SuggestIndex, AbstractSet[str]]],
+    text: str,
+    limit: int,
+    doc_freq: Callable[[str], int]
+) -> Dict[str, List[Dict[str, Any]]]:
+    # Suggestions from the indexes of a live index's segments, each with
+    # the ids of its documents that were deleted or replaced since. Terms
+    # are ranked by their document frequency across all segments, titles as
+    # a single index over the merged segments would rank them.
+    words = list(TOKEN_PATTERN.finditer(text))
+    terms: List[Dict[str, Any]] = []
+    titles: List[Dict[str, Any]] = []
+
+    # The last word is still being typed unless the text ends after it.
+    last = words[-1] if words else None
+    if last is not None and last.end() == len(text):
+        head = text[:last.start()]
+        frequencies = {
+            term: doc_freq(term)
+            for part, _ in parts
+            for term, _ in part.terms.lookup(last.group().lower(), limit)
+        }
+        ranked = sorted((-frequency, term) for term, frequency in frequencies.items() if frequency)
+        terms = [{"term": term, "text": head + term, "doc_freq": -frequency} for frequency, term in ranked[:limit]]
+
+    if words:
+        key = ' '.join(word.group().lower() for word in words)
+        matches = sorted(
+            ((start, length, number, ordinal), document_id, title)
+            for number, (part, deleted) in enumerate(parts)
+            for (start, length, ordinal), (document_id, title) in part.titles.ranked_lookup(
+                key, limit, lambda value: value[0] not in deleted
+            )
+        )
+        titles = [{"id": document_id, "title": title} for _, document_id, title in matches[:limit]]
+
+    return {"terms": terms, "titles": titles}
@@ -1,14 +1,30 @@
-from typing import Dict, List, Tuple
+from typing import Dict, List, Sequence, Tuple, Union
 import math
+from src.documents import NormalizedDocument
 
 
-def compute_mock_relevance(query: str, document_content: str) -> float:
+QueryInput = Union[str, Sequence[str]]
+DocumentInput = Union[str, NormalizedDocument]
+
+
+def normalize_query(query: QueryInput) -> List[str]:
+    if isinstance(query, str):
+        return query.lower().split()
+    return list(query)
+
+
+def _content_and_text(document: DocumentInput) -> Tuple[str, str]:
+    if isinstance(document, NormalizedDocument):
+        return document.content, document.text
+    return document, document.lower()
+
+
+def compute_mock_relevance(query: QueryInput, document_content: DocumentInput) -> float:
     if not query or not document_content:
         return 0.0
     
-    query_lower = query.lower()
-    doc_lower = document_content.lower()
-    query_terms = query_lower.split()
+    _, doc_lower = _content_and_text(document_content)
+    query_terms = normalize_query(query)
     
     if not query_terms:
         return 0.0
@@ -18,22 +34,25 @@ def compute_mock_relevance(query: str, document_content: str) -> float:
         count = doc_lower.count(term)
         total_matches += count
     
+    return relevance_from_matches(total_matches, len(query_terms))
+
+
+def relevance_from_matches(total_matches: int, term_count: int) -> float:
     if total_matches == 0:
         return 0.0
     
-    base_score = min(total_matches / (len(query_terms) * 10), 1.0)
+    base_score = min(total_matches / (term_count * 10), 1.0)
     relevance_score = min(1.0, math.log(1 + base_score * 10) / math.log(11))
     
     return round(relevance_score, 3)
 
 
-def matches_query(query: str, document_content: str) -> bool:
+def matches_query(query: QueryInput, document_content: DocumentInput) -> bool:
     if not query or not document_content:
         return False
     
-    query_lower = query.lower()
-    doc_lower = document_content.lower()
-    query_terms = query_lower.split()
+    _, doc_lower = _content_and_text(document_content)
+    query_terms = normalize_query(query)
     
     for term in query_terms:
         if term in doc_lower:
@@ -42,13 +61,14 @@ def matches_query(query: str, document_content: str) -> bool:
     return False
 
 
-def extract_snippet(content: str, query: str, max_length: int = 200, context_chars: int = 50) -> str:
+def extract_snippet(content: DocumentInput, query: QueryInput, max_length: int = 200, context_chars: int = 50) -> str:
     if not content or not query:
+        if isinstance(content, NormalizedDocument):
+            content = content.content
         return content[:max_length] if content else ""
     
-    query_lower = query.lower()
-    content_lower = content.lower()
-    query_terms = query_lower.split()
+    content, content_lower = _content_and_text(content)
+    query_terms = normalize_query(query)
     
     best_position = -1
     for term in query_terms:
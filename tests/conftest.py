@@ -0,0 +1,5 @@
+from src.documents import normalize_document
+
+
+def make_document(doc_id, content):
+    return normalize_document({"id": doc_id, "title": doc_id, "summary": "", "content": content})
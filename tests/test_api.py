@@ -1,6 +1,13 @@
 import pytest
+import gzip
 import json
+import config
+import app as app_module
 from app import app
+from flask import jsonify
+from src import serialization
+from src.journal import IngestJournal
+from src.serialization import FastJSONProvider
 
 
 @pytest.fixture
@@ -149,6 +156,8 @@ class TestGenerateEndpoint:
             assert 'snippet' in result
             assert isinstance(result['snippet'], str)
             assert len(result['snippet']) > 0
+            for start, end in result['highlights']:
+                assert 'patent' in result['snippet'][start:end].lower()
     
     def test_generate_results_sorted_by_relevance(self, client):
         response = client.post(
@@ -263,3 +272,825 @@ class TestErrorHandling:
         )
         
         assert response.status_code in [400, 500]
+
+
+class TestGeneratePagination:
+    
+    def test_limit_restricts_results_but_count_is_total(self, client):
+        response = client.post(
+            '/api/generate',
+            data=json.dumps({'query': 'law', 'limit': 3}),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        
+        assert len(data['results']) == 3
+        assert data['count'] > 3
+        assert data['limit'] == 3
+        assert data['offset'] == 0
+    
+    def test_offset_returns_next_page(self, client):
+        full = json.loads(client.post(
+            '/api/generate',
+            data=json.dumps({'query': 'law', 'limit': 10}),
+            content_type='application/json'
+        ).data)
+        page = json.loads(client.post(
+            '/api/generate',
+            data=json.dumps({'query': 'law', 'limit': 2, 'offset': 2}),
+            content_type='application/json'
+        ).data)
+        
+        assert [r['id'] for r in page['results']] == [r['id'] for r in full['results'][2:4]]
+        assert page['count'] == full['count']
+    
+    def test_offset_past_end(self, client):
+        response = client.post(
+            '/api/generate',
+            data=json.dumps({'query': 'contract', 'offset': 1000}),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['results'] == []
+        assert data['count'] > 0
+    
+    def test_invalid_limit(self, client):
+        for limit in [0, -1, 'ten', 10000, True]:
+            response = client.post(
+                '/api/generate',
+                data=json.dumps({'query': 'contract', 'limit': limit}),
+                content_type='application/json'
+            )
+            
+            assert response.status_code == 400
+            assert 'limit' in json.loads(response.data)['error']
+    
+    def test_invalid_offset(self, client):
+        response = client.post(
+            '/api/generate',
+            data=json.dumps({'query': 'contract', 'offset': -5}),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == 400
+        assert 'offset' in json.loads(response.data)['error']
+
+
+class TestGenerateScoring:
+    
+    def test_default_scoring_mode_is_reported(self, client):
+        response = client.post(
+            '/api/generate',
+            data=json.dumps({'query': 'contract'}),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == 200
+        assert json.loads(response.data)['scoring'] == config.Config.SEARCH_SCORING_MODE
+    
+    def test_legacy_scoring_matches_substrings(self, client, monkeypatch):
+        # Typo correction would turn the BM25 query into another word.
+        monkeypatch.setattr(app_module, 'spelling_index', None)
+        bm25 = json.loads(client.post(
+            '/api/generate',
+            data=json.dumps({'query': 'patent', 'scoring': 'bm25'}),
+            content_type='application/json'
+        ).data)
+        legacy = json.loads(client.post(
+            '/api/generate',
+            data=json.dumps({'query': 'patent', 'scoring': 'legacy'}),
+            content_type='application/json'
+        ).data)
+        
+        assert legacy['scoring'] == 'legacy'
+        assert legacy['count'] > bm25['count']
+    
+    def test_invalid_scoring_mode(self, client):
+        response = client.post(
+            '/api/generate',
+            data=json.dumps({'query': 'contract', 'scoring': 'magic'}),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == 400
+        assert 'scoring' in json.loads(response.data)['error']
+
+
+class TestSearchBackendConfig:
+    
+    @pytest.mark.parametrize('backend, scoring', [('python', 'legacy'), ('matrix', 'legacy'), ('fts5', 'bm25')])
+    def test_supported_backends(self, backend, scoring):
+        assert app_module.search_backend_error(backend, scoring, False) is None
+    
+    def test_unknown_backend(self):
+        assert 'SEARCH_BACKEND must be one of' in app_module.search_backend_error('magic', 'bm25', False)
+    
+    def test_matrix_needs_numpy(self, monkeypatch):
+        monkeypatch.setattr(app_module, 'MATRIX_AVAILABLE', False)
+        
+        assert 'numpy' in app_module.search_backend_error('matrix', 'bm25', False)
+    
+    def test_fts5_needs_bm25(self):
+        assert 'SEARCH_SCORING_MODE=bm25' in app_module.search_backend_error('fts5', 'legacy', False)
+    
+    def test_fts5_rejects_ingestion(self):
+        assert 'INGEST_TOKEN' in app_module.search_backend_error('fts5', 'bm25', True)
+        assert app_module.search_backend_error('python', 'bm25', True) is None
+
+
+class TestStatsEndpoint:
+    
+    def test_repeated_query_is_served_from_cache(self, client):
+        request_body = json.dumps({'query': 'Fiduciary   DUTIES', 'limit': 7})
+        
+        before = json.loads(client.get('/api/stats').data)['cache']
+        first = client.post('/api/generate', data=request_body, content_type='application/json')
+        second = client.post(
+            '/api/generate',
+            data=json.dumps({'query': 'fiduciary duties', 'limit': 7}),
+            content_type='application/json'
+        )
+        after = json.loads(client.get('/api/stats').data)['cache']
+        
+        assert first.status_code == second.status_code == 200
+        assert json.loads(first.data)['results'] == json.loads(second.data)['results']
+        assert json.loads(second.data)['query'] == 'fiduciary duties'
+        assert after['hits'] == before['hits'] + 1
+        assert after['misses'] == before['misses'] + 1
+    
+    def test_stats_fields(self, client):
+        response = client.get('/api/stats')
+        
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert isinstance(data['pid'], int)
+        assert data['documents'] == 10
+        assert {'hits', 'misses', 'evictions', 'size', 'capacity'} <= set(data['cache'])
+
+
+class TestGeneratePhraseQueries:
+    
+    def test_quoted_phrase(self, client):
+        response = client.post(
+            '/api/generate',
+            data=json.dumps({'query': '"statute of frauds"'}),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['count'] == 1
+        assert data['results'][0]['id'] == 'doc1'
+    
+    def test_near_query(self, client):
+        response = client.post(
+            '/api/generate',
+            data=json.dumps({'query': 'breach NEAR/3 damages'}),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == 200
+        assert [r['id'] for r in json.loads(response.data)['results']] == ['doc1']
+
+
+class TestGenerateBooleanQueries:
+    
+    def test_not_excludes_documents(self, client):
+        response = client.post(
+            '/api/generate',
+            data=json.dumps({'query': 'rights NOT property'}),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == 200
+        ids = [r['id'] for r in json.loads(response.data)['results']]
+        assert ids
+        assert 'doc3' not in ids
+    
+    def test_required_prefix(self, client):
+        response = client.post(
+            '/api/generate',
+            data=json.dumps({'query': '+law +rights', 'scoring': 'bm25'}),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['count'] == 4
+
+
+class TestGenerateStreaming:
+    
+    def read_records(self, response):
+        return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    
+    def test_stream_flag_returns_ndjson(self, client):
+        response = client.post(
+            '/api/generate',
+            data=json.dumps({'query': 'law', 'limit': 3, 'stream': True}),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        records = self.read_records(response)
+        assert len(records) == 4
+        assert all('id' in record for record in records[:3])
+        assert records[-1]['done'] is True
+        assert records[-1]['limit'] == 3
+    
+    def test_stream_matches_json_response(self, client):
+        body = {'query': 'contract law', 'limit': 5}
+        regular = json.loads(client.post('/api/generate', data=json.dumps(body), content_type='application/json').data)
+        streamed = self.read_records(client.post(
+            '/api/generate',
+            data=json.dumps(body),
+            content_type='application/json',
+            headers={'Accept': 'application/x-ndjson'}
+        ))
+        
+        assert streamed[:-1] == regular['results']
+        assert streamed[-1]['count'] == regular['count']
+    
+    def test_stream_without_matches_sends_trailer_only(self, client):
+        response = client.post(
+            '/api/generate',
+            data=json.dumps({'query': 'xyznonexistent', 'stream': True}),
+            content_type='application/json'
+        )
+        
+        assert self.read_records(response) == [{
+            'done': True, 'query': 'xyznonexistent', 'corrected_query': None,
+            'count': 0, 'limit': 10, 'offset': 0, 'scoring': config.Config.SEARCH_SCORING_MODE
+        }]
+    
+    def test_invalid_stream_flag(self, client):
+        response = client.post(
+            '/api/generate',
+            data=json.dumps({'query': 'law', 'stream': 'yes'}),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == 400
+
+
+class TestGenerateBatch:
+    
+    def post_batch(self, client, body):
+        return client.post('/api/generate/batch', data=json.dumps(body), content_type='application/json')
+    
+    def test_batch_matches_single_queries(self, client):
+        queries = ['contract law', {'query': 'rights', 'limit': 2}, {'query': 'patent', 'scoring': 'legacy'}]
+        response = self.post_batch(client, {'queries': queries})
+        
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['count'] == 3
+        
+        for query, batched in zip(queries, data['results']):
+            body = query if isinstance(query, dict) else {'query': query}
+            single = json.loads(client.post('/api/generate', data=json.dumps(body), content_type='application/json').data)
+            assert batched == single
+    
+    def test_repeated_queries(self, client):
+        data = json.loads(self.post_batch(client, {'queries': ['law', 'law']}).data)
+        
+        assert data['results'][0] == data['results'][1]
+    
+    def test_empty_batch(self, client):
+        assert self.post_batch(client, {'queries': []}).status_code == 400
+    
+    def test_batch_too_large(self, client):
+        response = self.post_batch(client, {'queries': ['law'] * (config.Config.SEARCH_BATCH_MAX_SIZE + 1)})
+        
+        assert response.status_code == 400
+    
+    def test_invalid_item_reports_position(self, client):
+        response = self.post_batch(client, {'queries': ['law', {'query': 'law', 'limit': 0}]})
+        
+        assert response.status_code == 400
+        assert json.loads(response.data)['error'].startswith('queries[1]:')
+
+
+class TestBulkDocuments:
+    
+    def test_fetch_several_with_projection(self, client):
+        response = client.get('/api/documents?ids=doc1,doc3&fields=title,summary')
+        
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert [document['id'] for document in data['documents']] == ['doc1', 'doc3']
+        assert set(data['documents'][0]) == {'id', 'title', 'summary'}
+        assert data['missing'] == []
+    
+    def test_full_documents_without_fields(self, client):
+        data = json.loads(client.get('/api/documents?ids=doc2').data)
+        
+        assert data['documents'][0] == json.loads(client.get('/api/documents/doc2').data)
+    
+    def test_missing_and_duplicate_ids(self, client):
+        data = json.loads(client.get('/api/documents?ids=doc1,doc999,doc1').data)
+        
+        assert [document['id'] for document in data['documents']] == ['doc1']
+        assert data['missing'] == ['doc999']
+    
+    def test_ids_required(self, client):
+        assert client.get('/api/documents').status_code == 400
+        assert client.get('/api/documents?ids=,').status_code == 400
+    
+    def test_unknown_field(self, client):
+        assert client.get('/api/documents?ids=doc1&fields=title,secret').status_code == 400
+    
+    def test_too_many_ids(self, client):
+        ids = ','.join(f"doc{n}" for n in range(config.Config.DOCUMENT_BATCH_MAX_SIZE + 1))
+        
+        assert client.get(f'/api/documents?ids={ids}').status_code == 400
+
+
+class TestConditionalRequests:
+    
+    def test_document_has_validators(self, client):
+        response = client.get('/api/documents/doc1')
+        
+        assert response.status_code == 200
+        assert response.headers['ETag']
+        assert response.headers['Last-Modified']
+        assert response.headers['Cache-Control'] == f"public, max-age={config.Config.DOCUMENT_CACHE_MAX_AGE}"
+    
+    def test_document_etag_is_stable_and_unique(self, client):
+        first = client.get('/api/documents/doc1').headers['ETag']
+        
+        assert client.get('/api/documents/doc1').headers['ETag'] == first
+        assert client.get('/api/documents/doc2').headers['ETag'] != first
+    
+    def test_if_none_match_returns_304(self, client):
+        etag = client.get('/api/documents/doc1').headers['ETag']
+        response = client.get('/api/documents/doc1', headers={'If-None-Match': etag})
+        
+        assert response.status_code == 304
+        assert response.data == b''
+        assert response.headers['ETag'] == etag
+    
+    def test_stale_etag_returns_body(self, client):
+        response = client.get('/api/documents/doc1', headers={'If-None-Match': '"stale"'})
+        
+        assert response.status_code == 200
+        assert json.loads(response.data)['id'] == 'doc1'
+    
+    def test_if_modified_since(self, client):
+        last_modified = client.get('/api/documents/doc1').headers['Last-Modified']
+        
+        assert client.get('/api/documents/doc1', headers={'If-Modified-Since': last_modified}).status_code == 304
+        assert client.get(
+            '/api/documents/doc1', headers={'If-Modified-Since': 'Mon, 01 Jan 2001 00:00:00 GMT'}
+        ).status_code == 200
+    
+    def test_bulk_documents_etag_depends_on_fields(self, client):
+        projected = client.get('/api/documents?ids=doc1,doc2&fields=title')
+        full = client.get('/api/documents?ids=doc1,doc2')
+        
+        assert projected.headers['ETag'] != full.headers['ETag']
+        assert client.get(
+            '/api/documents?ids=doc1,doc2&fields=title', headers={'If-None-Match': projected.headers['ETag']}
+        ).status_code == 304
+    
+    def test_search_revalidation(self, client):
+        body = json.dumps({'query': 'contract law'})
+        response = client.post('/api/generate', data=body, content_type='application/json')
+        
+        assert response.headers['Cache-Control'] == 'no-cache'
+        assert client.post(
+            '/api/generate', data=body, content_type='application/json',
+            headers={'If-None-Match': response.headers['ETag']}
+        ).status_code == 412
+        
+        other = client.post('/api/generate', data=json.dumps({'query': 'contract law', 'limit': 2}), content_type='application/json')
+        assert other.headers['ETag'] != response.headers['ETag']
+    
+    def test_search_by_url_revalidation(self, client):
+        response = client.get('/api/generate?query=contract+law&limit=2')
+        posted = client.post('/api/generate', data=json.dumps({'query': 'contract law', 'limit': 2}), content_type='application/json')
+        
+        assert response.status_code == 200
+        assert response.data == posted.data
+        assert response.headers['ETag'] == posted.headers['ETag']
+        
+        revalidated = client.get('/api/generate?query=contract+law&limit=2', headers={'If-None-Match': response.headers['ETag']})
+        assert revalidated.status_code == 304
+        assert revalidated.headers['ETag'] == response.headers['ETag']
+    
+    def test_search_etag_follows_the_shared_journal(self, monkeypatch, tmp_path):
+        path = str(tmp_path / 'journal.jsonl')
+        writer, reader = IngestJournal(path), IngestJournal(path)
+        writer.append([{"op": "delete", "id": "doc-x"}], lambda entries: [False] * len(entries))
+        reader.replay(lambda entries: [False] * len(entries))
+        
+        monkeypatch.setattr(app_module, 'ingest_journal', writer)
+        written = app_module.search_etag('law', ('law',))
+        # Another worker: same journal position, its own change time.
+        monkeypatch.setattr(app_module, 'ingest_journal', reader)
+        monkeypatch.setattr(app_module.get_store(), 'changed_at', 1.0)
+        
+        assert app_module.search_etag('law', ('law',)) == written
+        
+        writer.append([{"op": "delete", "id": "doc-y"}], lambda entries: [False] * len(entries))
+        reader.replay(lambda entries: [False] * len(entries))
+        
+        assert app_module.search_etag('law', ('law',)) != written
+    
+    @pytest.mark.parametrize('query_string, error', [
+        ('', 'Query parameter is required'),
+        ('query=law&limit=many', 'limit must be an integer'),
+        ('query=law&offset=-1', 'offset must be a non-negative integer'),
+        ('query=law&stream=yes', 'stream must be a boolean'),
+    ])
+    def test_search_by_url_validation(self, client, query_string, error):
+        response = client.get(f'/api/generate?{query_string}')
+        
+        assert response.status_code == 400
+        assert json.loads(response.data)['error'].startswith(error)
+
+
+class TestCompression:
+    
+    def test_document_is_gzipped(self, client):
+        plain = client.get('/api/documents/doc1')
+        response = client.get('/api/documents/doc1', headers={'Accept-Encoding': 'gzip'})
+        
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert json.loads(gzip.decompress(response.data)) == json.loads(plain.data)
+        assert len(response.data) < len(plain.data)
+    
+    def test_identity_response_varies_on_encoding(self, client):
+        response = client.get('/api/documents/doc1')
+        
+        assert 'Content-Encoding' not in response.headers
+        assert 'Accept-Encoding' in response.headers['Vary']
+    
+    def test_compressed_document_is_not_recompressed(self, client):
+        client.get('/api/documents/doc2', headers={'Accept-Encoding': 'gzip'})
+        hits = app_module.document_bodies.stats()['hits']
+        client.get('/api/documents/doc2', headers={'Accept-Encoding': 'gzip'})
+        
+        assert app_module.document_bodies.stats()['hits'] == hits + 1
+    
+    def test_compressed_document_revalidates(self, client):
+        response = client.get('/api/documents/doc1', headers={'Accept-Encoding': 'gzip'})
+        etag = response.headers['ETag']
+        
+        assert etag.startswith('W/')
+        
+        revalidated = client.get('/api/documents/doc1', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        assert revalidated.status_code == 304
+        assert revalidated.headers['ETag'] == etag
+        assert 'Accept-Encoding' in revalidated.headers['Vary']
+    
+    def test_identity_document_revalidates_with_strong_etag(self, client):
+        etag = client.get('/api/documents/doc1').headers['ETag']
+        revalidated = client.get('/api/documents/doc1', headers={'If-None-Match': etag})
+        
+        assert not etag.startswith('W/')
+        assert revalidated.headers['ETag'] == etag
+        assert 'Accept-Encoding' in revalidated.headers['Vary']
+    
+    def test_search_revalidation_keeps_validator(self, client):
+        headers = {'Accept-Encoding': 'gzip'}
+        response = client.get('/api/generate?query=law', headers=headers)
+        revalidated = client.get('/api/generate?query=law', headers={**headers, 'If-None-Match': response.headers['ETag']})
+        
+        assert response.headers['ETag'].startswith('W/')
+        assert revalidated.status_code == 304
+        assert revalidated.headers['ETag'] == response.headers['ETag']
+        assert 'Accept-Encoding' in revalidated.headers['Vary']
+    
+    def test_search_results_are_compressed(self, client):
+        response = client.post(
+            '/api/generate',
+            data=json.dumps({'query': 'law'}),
+            content_type='application/json',
+            headers={'Accept-Encoding': 'gzip'}
+        )
+        
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert json.loads(gzip.decompress(response.data))['query'] == 'law'
+    
+    def test_small_responses_are_not_compressed(self, client):
+        response = client.get('/api/health', headers={'Accept-Encoding': 'gzip'})
+        
+        assert 'Content-Encoding' not in response.headers
+        assert json.loads(response.data) == {'status': 'ok'}
+
+
+class TestJsonProvider:
+    
+    def test_jsonify_uses_fast_provider(self):
+        assert isinstance(app.json, FastJSONProvider)
+    
+    def test_jsonify_encodes_with_orjson(self, monkeypatch):
+        orjson = pytest.importorskip('orjson')
+        calls = []
+        
+        class Recording:
+            def __getattr__(self, name):
+                return getattr(orjson, name)
+            
+            def dumps(self, *args, **kwargs):
+                calls.append(kwargs['option'])
+                return orjson.dumps(*args, **kwargs)
+        
+        monkeypatch.setattr(serialization, 'orjson', Recording())
+        with app.app_context():
+            compact = jsonify({"b": 1, "a": [2]}).get_data(as_text=True)
+            monkeypatch.setattr(app, 'debug', True)
+            indented = jsonify({"b": 1, "a": [2]}).get_data(as_text=True)
+        
+        # Same bytes the stdlib provider produced, keys sorted.
+        assert compact == '{"a":[2],"b":1}\n'
+        assert indented == json.dumps({"a": [2], "b": 1}, indent=2) + '\n'
+        assert len(calls) == 2 and all(option & orjson.OPT_SORT_KEYS for option in calls)
+    
+    def test_other_encoder_options_use_the_stdlib(self):
+        with app.app_context():
+            assert app.json.dumps({"a": "é"}, ensure_ascii=True) == '{"a": "\\u00e9"}'
+    
+    def test_document_body_is_cached_without_compression(self, client):
+        first = client.get('/api/documents/doc4')
+        hits = app_module.document_bodies.stats()['hits']
+        second = client.get('/api/documents/doc4')
+        
+        assert app_module.document_bodies.stats()['hits'] == hits + 1
+        assert first.data == second.data
+        assert json.loads(second.data)['id'] == 'doc4'
+
+
+INGEST_TOKEN = 'test-ingest-token'
+INGEST_HEADERS = {'Authorization': f'Bearer {INGEST_TOKEN}'}
+
+
+@pytest.fixture
+def ingest_client(client, monkeypatch):
+    monkeypatch.setattr(config.Config, 'INGEST_TOKEN', INGEST_TOKEN)
+    yield client
+    
+    # Leave the shared corpus as the other tests expect it.
+    for document_id in list(app_module.get_store().ids()):
+        if document_id.startswith('ingest-'):
+            app_module.ingest([{'op': 'delete', 'id': document_id}])
+    app_module.live_index.wait_for_merge(5)
+    app_module.live_index.merge()
+
+
+def ingested_document(document_id, content):
+    return {'id': document_id, 'title': 'Ingested', 'summary': 'Added through the API.', 'content': content}
+
+
+def search_ids(client, query):
+    response = client.post('/api/generate', data=json.dumps({'query': query}), content_type='application/json')
+    return [result['id'] for result in json.loads(response.data)['results']]
+
+
+class TestDocumentIngestion:
+    
+    def test_disabled_without_token(self, client, monkeypatch):
+        monkeypatch.setattr(config.Config, 'INGEST_TOKEN', '')
+        response = client.put('/api/documents/ingest-1', json=ingested_document('ingest-1', 'Text.'))
+        
+        assert response.status_code == 403
+    
+    def test_requires_bearer_token(self, ingest_client):
+        missing = ingest_client.put('/api/documents/ingest-1', json=ingested_document('ingest-1', 'Text.'))
+        wrong = ingest_client.delete('/api/documents/doc1', headers={'Authorization': 'Bearer nope'})
+        
+        assert missing.status_code == wrong.status_code == 401
+        assert missing.headers['WWW-Authenticate'] == 'Bearer'
+        assert 'doc1' in app_module.get_store()
+    
+    def test_put_update_delete_lifecycle(self, ingest_client):
+        created = ingest_client.put(
+            '/api/documents/ingest-1',
+            json=ingested_document('ingest-1', 'The zeppelin charter governs airship leases.'),
+            headers=INGEST_HEADERS
+        )
+        
+        assert created.status_code == 201
+        assert json.loads(created.data)['status'] == 'created'
+        assert search_ids(ingest_client, 'zeppelin') == ['ingest-1']
+        assert json.loads(ingest_client.get('/api/documents/ingest-1').data)['title'] == 'Ingested'
+        
+        updated = ingest_client.put(
+            '/api/documents/ingest-1',
+            json=ingested_document('ingest-1', 'The dirigible charter governs airship leases.'),
+            headers=INGEST_HEADERS
+        )
+        
+        assert updated.status_code == 200
+        assert json.loads(updated.data)['status'] == 'updated'
+        assert search_ids(ingest_client, 'zeppelin') == []
+        assert search_ids(ingest_client, 'dirigible') == ['ingest-1']
+        
+        deleted = ingest_client.delete('/api/documents/ingest-1', headers=INGEST_HEADERS)
+        
+        assert deleted.status_code == 200
+        assert search_ids(ingest_client, 'dirigible') == []
+        assert ingest_client.get('/api/documents/ingest-1').status_code == 404
+        assert ingest_client.delete('/api/documents/ingest-1', headers=INGEST_HEADERS).status_code == 404
+    
+    def test_ingestion_invalidates_cached_searches(self, ingest_client):
+        before = search_ids(ingest_client, 'contract')
+        ingest_client.put(
+            '/api/documents/ingest-2',
+            json=ingested_document('ingest-2', 'Contract contract contract.'),
+            headers=INGEST_HEADERS
+        )
+        
+        assert 'ingest-2' not in before
+        assert 'ingest-2' in search_ids(ingest_client, 'contract')
+    
+    def test_batch_ingestion(self, ingest_client):
+        response = ingest_client.post(
+            '/api/documents',
+            json={'documents': [
+                ingested_document('ingest-3', 'Quokka habitat protection.'),
+                ingested_document('ingest-4', 'Quokka export permits.')
+            ]},
+            headers=INGEST_HEADERS
+        )
+        
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert [result['status'] for result in data['results']] == ['created', 'created']
+        assert sorted(search_ids(ingest_client, 'quokka')) == ['ingest-3', 'ingest-4']
+        
+        # Far below the merge threshold: the batch waits in one delta segment.
+        stats = json.loads(ingest_client.get('/api/stats').data)
+        assert stats['documents'] == 12
+        assert stats['index']['delta_documents'] == 2
+        assert stats['index']['delta_segments'] == 1
+        assert stats['index']['merge_threshold'] == config.Config.INGEST_MERGE_THRESHOLD
+    
+    def test_invalid_documents(self, ingest_client):
+        batch = ingest_client.post(
+            '/api/documents',
+            json={'documents': [ingested_document('ingest-5', 'Text.'), {'id': 'ingest-6', 'title': 'No content'}]},
+            headers=INGEST_HEADERS
+        )
+        mismatch = ingest_client.put(
+            '/api/documents/ingest-7',
+            json=ingested_document('ingest-8', 'Text.'),
+            headers=INGEST_HEADERS
+        )
+        unknown = ingest_client.put(
+            '/api/documents/ingest-9',
+            json={**ingested_document('ingest-9', 'Text.'), 'author': 'x'},
+            headers=INGEST_HEADERS
+        )
+        
+        assert batch.status_code == mismatch.status_code == unknown.status_code == 400
+        assert json.loads(batch.data)['error'].startswith('documents[1]: summary')
+        assert 'ingest-5' not in app_module.get_store()
+
+
+class TestSpellingCorrection:
+    
+    def search(self, client, query, **options):
+        response = client.post('/api/generate', data=json.dumps({'query': query, **options}), content_type='application/json')
+        return json.loads(response.data)
+    
+    def test_typo_is_corrected(self, client):
+        typo = self.search(client, 'neglegence')
+        correct = self.search(client, 'negligence')
+        
+        assert typo['query'] == 'neglegence'
+        assert typo['corrected_query'] == 'negligence'
+        assert correct['corrected_query'] is None
+        assert typo['count'] == correct['count'] > 0
+        assert [result['id'] for result in typo['results']] == [result['id'] for result in correct['results']]
+    
+    def test_corrected_query_keeps_operators(self, client):
+        data = self.search(client, '"statute of fruads" OR arbitation', scoring='legacy')
+        
+        assert data['corrected_query'] == '"statute of frauds" OR arbitration'
+        assert data['count'] > 0
+    
+    def test_word_forms_are_not_corrected(self, client):
+        # Legacy scoring finds "patent" inside "patents".
+        assert self.search(client, 'patent', scoring='legacy')['corrected_query'] is None
+    
+    @pytest.mark.parametrize('query, corrected', [('contrac', 'contract'), ('patent', 'patents')])
+    def test_bm25_corrects_tokens_without_exact_matches(self, client, query, corrected):
+        # BM25 only matches whole tokens, so these would find nothing.
+        data = self.search(client, query, scoring='bm25')
+        
+        assert data['corrected_query'] == corrected
+        assert data['count'] > 0
+    
+    def test_unknown_terms_without_close_match(self, client):
+        data = self.search(client, 'xyznonexistent')
+        
+        assert data['corrected_query'] is None
+        assert data['count'] == 0
+    
+    def test_disabled(self, client, monkeypatch):
+        monkeypatch.setattr(app_module, 'spelling_index', None)
+        data = self.search(client, 'neglegence')
+        
+        assert data['corrected_query'] is None
+        assert data['count'] == 0
+    
+    def test_stream_and_batch_report_corrections(self, client):
+        streamed = client.post(
+            '/api/generate',
+            data=json.dumps({'query': 'arbitation', 'stream': True}),
+            content_type='application/json'
+        )
+        batch = client.post(
+            '/api/generate/batch',
+            data=json.dumps({'queries': ['arbitation', 'arbitration']}),
+            content_type='application/json'
+        )
+        
+        assert json.loads(streamed.data.splitlines()[-1])['corrected_query'] == 'arbitration'
+        assert [entry['corrected_query'] for entry in json.loads(batch.data)['results']] == ['arbitration', None]
+    
+    def test_ingested_terms_are_suggested(self, ingest_client, monkeypatch):
+        # Keep the document in a delta segment, outside the trigram index.
+        monkeypatch.setattr(app_module.live_index, 'merge_threshold', 100)
+        ingest_client.put(
+            '/api/documents/ingest-1',
+            json=ingested_document('ingest-1', 'The zeppelin charter governs airship leases.'),
+            headers=INGEST_HEADERS
+        )
+        
+        data = self.search(ingest_client, 'zepelin')
+        
+        assert data['corrected_query'] == 'zeppelin'
+        assert [result['id'] for result in data['results']] == ['ingest-1']
+
+
+class TestSuggestEndpoint:
+    
+    def test_suggest(self, client):
+        response = client.get('/api/suggest?q=contract%20la&limit=3')
+        
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['query'] == 'contract la'
+        assert data['terms'][0] == {'term': 'law', 'text': 'contract law', 'doc_freq': 6}
+        assert len(data['terms']) == 3
+        assert data['titles'] == [{'id': 'doc1', 'title': 'Contract Law Fundamentals'}]
+    
+    def test_default_limit(self, client):
+        data = json.loads(client.get('/api/suggest?q=c').data)
+        
+        assert len(data['terms']) == config.Config.SUGGEST_DEFAULT_LIMIT
+    
+    @pytest.mark.parametrize('query_string', ['', 'q=', 'q=%20', 'q=law&limit=0', 'q=law&limit=abc', 'q=law&limit=1000'])
+    def test_invalid_parameters(self, client, query_string):
+        response = client.get(f'/api/suggest?{query_string}')
+        
+        assert response.status_code == 400
+        assert 'error' in json.loads(response.data)
+    
+    def test_ingested_titles_before_and_after_merge(self, ingest_client):
+        ingest_client.put(
+            '/api/documents/ingest-1',
+            json={**ingested_document('ingest-1', 'The zeppelin charter governs airship leases.'), 'title': 'Zeppelin Charters'},
+            headers=INGEST_HEADERS
+        )
+        pending = json.loads(ingest_client.get('/api/suggest?q=zep').data)
+        app_module.live_index.merge()
+        merged = json.loads(ingest_client.get('/api/suggest?q=zep').data)
+        
+        for data in (pending, merged):
+            assert data['terms'] == [{'term': 'zeppelin', 'text': 'zeppelin', 'doc_freq': 1}]
+            assert data['titles'] == [{'id': 'ingest-1', 'title': 'Zeppelin Charters'}]
+    
+    def test_ingested_titles_while_a_merge_rebuilds(self, ingest_client, monkeypatch):
+        document = {**ingested_document('ingest-1', 'The zeppelin charter governs airship leases.'), 'title': 'Zeppelin Charters'}
+        ingest_client.put('/api/documents/ingest-1', json=document, headers=INGEST_HEADERS)
+        seen = []
+        
+        def on_merge(base, merged):
+            # The new base is published, its suggestion index not built yet.
+            seen.append(json.loads(ingest_client.get('/api/suggest?q=zep').data)['titles'])
+            app_module.ingest([{'op': 'delete', 'id': 'ingest-1'}])
+            seen.append(json.loads(ingest_client.get('/api/suggest?q=zep').data)['titles'])
+            app_module.build_accelerators(base, merged)
+        
+        monkeypatch.setattr(app_module.live_index, 'on_merge', on_merge)
+        app_module.live_index.merge()
+        
+        assert seen == [[{'id': 'ingest-1', 'title': 'Zeppelin Charters'}], []]
+        assert app_module.live_index.merged is None
+    
+    def test_deleted_titles_are_not_suggested(self, ingest_client):
+        document = {**ingested_document('ingest-1', 'The zeppelin charter governs airship leases.'), 'title': 'Zeppelin Charters'}
+        ingest_client.put('/api/documents/ingest-1', json=document, headers=INGEST_HEADERS)
+        ingest_client.delete('/api/documents/ingest-1', headers=INGEST_HEADERS)
+        
+        assert json.loads(ingest_client.get('/api/suggest?q=zep').data) == {'query': 'zep', 'terms': [], 'titles': []}
@@ -0,0 +1,155 @@
+import asyncio
+import json
+import pytest
+from app import app
+from asgi import ASGIBridge, build_environ
+
+
+def run(bridge, method, path, body=b'', headers=(), query_string=b'', chunk_size=None):
+    chunks = [body] if chunk_size is None else [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)] or [b'']
+    incoming = [
+        {'type': 'http.request', 'body': chunk, 'more_body': position < len(chunks) - 1}
+        for position, chunk in enumerate(chunks)
+    ]
+    sent = []
+    
+    async def receive():
+        return incoming.pop(0)
+    
+    async def send(message):
+        sent.append(message)
+    
+    scope = {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'query_string': query_string,
+        'root_path': '',
+        'headers': [(name.encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+        'client': ('127.0.0.1', 50000),
+        'server': ('testserver', 80)
+    }
+    asyncio.run(bridge(scope, receive, send))
+    return sent
+
+
+def response_body(sent):
+    return b''.join(message.get('body', b'') for message in sent if message['type'] == 'http.response.body')
+
+
+@pytest.fixture(scope='module')
+def bridge():
+    bridge = ASGIBridge(app, max_workers=2, max_body_size=4096)
+    yield bridge
+    bridge.executor.shutdown()
+
+
+class TestBuildEnviron:
+    
+    def test_headers_and_query(self):
+        environ = build_environ({
+            'method': 'GET',
+            'path': '/api/documents',
+            'query_string': b'ids=doc1',
+            'headers': [(b'content-type', b'application/json'), (b'x-tag', b'a'), (b'x-tag', b'b')]
+        }, b'{}')
+        
+        assert environ['QUERY_STRING'] == 'ids=doc1'
+        assert environ['CONTENT_TYPE'] == 'application/json'
+        assert environ['CONTENT_LENGTH'] == '2'
+        assert environ['HTTP_X_TAG'] == 'a,b'
+        assert environ['wsgi.input'].read() == b'{}'
+    
+    def test_repeated_cookie_headers(self):
+        environ = build_environ({
+            'method': 'GET',
+            'path': '/',
+            'headers': [(b'cookie', b'a=1'), (b'cookie', b'b=2')]
+        }, b'')
+        
+        assert environ['HTTP_COOKIE'] == 'a=1; b=2'
+
+
+class TestASGIBridge:
+    
+    def test_get(self, bridge):
+        sent = run(bridge, 'GET', '/api/health')
+        
+        assert sent[0]['status'] == 200
+        assert json.loads(response_body(sent)) == {'status': 'ok'}
+    
+    def test_post_body_in_chunks(self, bridge):
+        body = json.dumps({'query': 'contract law', 'limit': 2}).encode('utf-8')
+        sent = run(bridge, 'POST', '/api/generate', body, [('content-type', 'application/json')], chunk_size=7)
+        
+        assert sent[0]['status'] == 200
+        assert len(json.loads(response_body(sent))['results']) <= 2
+    
+    def test_query_string(self, bridge):
+        sent = run(bridge, 'GET', '/api/documents', query_string=b'ids=doc1,doc2&fields=title')
+        
+        assert [document['id'] for document in json.loads(response_body(sent))['documents']] == ['doc1', 'doc2']
+    
+    def test_streaming_response_is_sent_incrementally(self, bridge):
+        body = json.dumps({'query': 'law', 'limit': 3, 'stream': True}).encode('utf-8')
+        sent = run(bridge, 'POST', '/api/generate', body, [('content-type', 'application/json')])
+        body_messages = [message for message in sent if message['type'] == 'http.response.body' and message['body']]
+        
+        assert len(body_messages) == 4
+        assert json.loads(body_messages[-1]['body'])['done'] is True
+        assert sent[-1]['more_body'] is False
+    
+    def test_body_too_large(self, bridge):
+        sent = run(bridge, 'POST', '/api/generate', b'x' * 5000, [('content-type', 'application/json')], chunk_size=1000)
+        
+        assert sent[0]['status'] == 413
+    
+    def test_disconnect_skips_the_app(self):
+        calls = []
+        bridge = ASGIBridge(lambda environ, start_response: calls.append(environ) or [], max_workers=1)
+        incoming = [{'type': 'http.request', 'body': b'{"query"', 'more_body': True}, {'type': 'http.disconnect'}]
+        sent = []
+        
+        async def receive():
+            return incoming.pop(0)
+        
+        async def send(message):
+            sent.append(message)
+        
+        asyncio.run(bridge({'type': 'http', 'method': 'POST', 'path': '/api/generate'}, receive, send))
+        bridge.executor.shutdown()
+        
+        assert calls == [] and sent == []
+    
+    def test_not_found(self, bridge):
+        assert run(bridge, 'GET', '/api/missing')[0]['status'] == 404
+    
+    def test_concurrent_requests(self, bridge):
+        async def request_many():
+            loop = asyncio.get_running_loop()
+            return await asyncio.gather(*[
+                loop.run_in_executor(None, run, bridge, 'GET', f'/api/documents/doc{number}')
+                for number in range(1, 11)
+            ])
+        
+        for number, sent in enumerate(asyncio.run(request_many()), start=1):
+            assert json.loads(response_body(sent))['id'] == f'doc{number}'
+    
+    def test_lifespan(self):
+        started = []
+        bridge = ASGIBridge(app, max_workers=1, on_startup=lambda: started.append(True))
+        messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+        
+        async def receive():
+            return messages.pop(0)
+        
+        async def send(message):
+            sent.append(message)
+        
+        asyncio.run(bridge({'type': 'lifespan'}, receive, send))
+        
+        assert [message['type'] for message in sent] == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+        assert started == [True]
@@ -0,0 +1,70 @@
+import pytest
+from src import cache as cache_module
+from src.cache import QueryCache
+
+
+class TestQueryCache:
+    
+    def test_miss_then_hit(self):
+        cache = QueryCache(capacity=2)
+        
+        assert cache.get("contract") is None
+        cache.put("contract", ["doc1"])
+        
+        assert cache.get("contract") == ["doc1"]
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+    
+    def test_least_recently_used_is_evicted(self):
+        cache = QueryCache(capacity=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1
+    
+    def test_entries_expire_after_ttl(self, monkeypatch):
+        now = [100.0]
+        monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+        cache = QueryCache(capacity=2, ttl=10)
+        cache.put("a", 1)
+        
+        now[0] += 5
+        assert cache.get("a") == 1
+        
+        now[0] += 6
+        assert cache.get("a") is None
+        assert cache.stats()["expirations"] == 1
+    
+    def test_new_corpus_version_invalidates_entries(self):
+        cache = QueryCache(capacity=2)
+        cache.put("a", 1, version=1)
+        
+        assert cache.get("a", version=1) == 1
+        assert cache.get("a", version=2) is None
+        assert cache.stats()["invalidations"] == 1
+        assert len(cache) == 0
+    
+    def test_zero_capacity_disables_cache(self):
+        cache = QueryCache(capacity=0)
+        cache.put("a", 1)
+        
+        assert cache.get("a") is None
+        assert len(cache) == 0
+    
+    def test_stats_report_hit_rate(self):
+        cache = QueryCache(capacity=2)
+        cache.put("a", 1)
+        cache.get("a")
+        cache.get("a")
+        cache.get("b")
+        
+        stats = cache.stats()
+        
+        assert stats["hit_rate"] == pytest.approx(0.667)
+        assert stats["size"] == 1
+        assert stats["capacity"] == 2
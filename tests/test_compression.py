@@ -0,0 +1,45 @@
+import gzip
+import pytest
+from werkzeug.http import parse_accept_header
+from src.compression import ENCODING_GZIP, SUPPORTED_ENCODINGS, compress, negotiate_encoding
+
+
+def accept(header):
+    return parse_accept_header(header)
+
+
+class TestNegotiateEncoding:
+    
+    def test_gzip(self):
+        assert negotiate_encoding(accept('gzip, deflate')) == ENCODING_GZIP
+    
+    def test_no_supported_encoding(self):
+        assert negotiate_encoding(accept('deflate')) is None
+        assert negotiate_encoding(accept('')) is None
+    
+    def test_quality_zero_is_refused(self):
+        assert negotiate_encoding(accept('gzip;q=0')) is None
+    
+    def test_prefers_brotli_on_ties(self):
+        assert negotiate_encoding(accept('gzip, br'), ('br', 'gzip')) == 'br'
+        assert negotiate_encoding(accept('gzip, br;q=0.5'), ('br', 'gzip')) == 'gzip'
+
+
+class TestCompress:
+    
+    def test_gzip_round_trip_is_deterministic(self):
+        body = b'{"content": "' + b'contract law ' * 200 + b'"}'
+        
+        assert gzip.decompress(compress(body, ENCODING_GZIP)) == body
+        assert compress(body, ENCODING_GZIP, stored=True) == compress(body, ENCODING_GZIP, stored=True)
+        assert len(compress(body, ENCODING_GZIP)) < len(body)
+    
+    def test_identity(self):
+        assert compress(b'body', None) == b'body'
+    
+    def test_brotli_round_trip(self):
+        brotli = pytest.importorskip('brotli')
+        body = b'statute of frauds ' * 100
+        
+        assert 'br' in SUPPORTED_ENCODINGS
+        assert brotli.decompress(compress(body, 'br')) == body
@@ -0,0 +1,42 @@
+import pytest
+from src.documents import (
+    LEGAL_DOCUMENTS,
+    get_normalized_document,
+    get_normalized_documents,
+    normalize_document,
+)
+
+
+class TestNormalizeDocument:
+    
+    def test_normalized_fields(self):
+        document = normalize_document({
+            "id": "d1",
+            "title": "Title",
+            "summary": "Summary",
+            "content": "Offer, Acceptance and Consideration."
+        })
+        
+        assert document.id == "d1"
+        assert document.text == "offer, acceptance and consideration."
+        assert document.tokens == ["offer", "acceptance", "and", "consideration"]
+        assert document.length == 4
+    
+    def test_offsets_point_at_tokens(self):
+        document = normalize_document({
+            "id": "d1",
+            "title": "Title",
+            "summary": "Summary",
+            "content": "Breach of contract occurs."
+        })
+        
+        for token, (start, end) in zip(document.tokens, document.offsets):
+            assert document.text[start:end] == token
+    
+    def test_corpus_is_normalized_once_at_load(self):
+        assert len(get_normalized_documents()) == len(LEGAL_DOCUMENTS)
+        assert get_normalized_document("doc1") is get_normalized_document("doc1")
+        assert get_normalized_document("doc1").content == LEGAL_DOCUMENTS["doc1"]["content"]
+    
+    def test_unknown_document(self):
+        assert get_normalized_document("doc999") is None
@@ -0,0 +1,163 @@
+import sqlite3
+import pytest
+import config
+import app as app_module
+from src import documents
+from src.documents import LEGAL_DOCUMENTS
+from src.fts import FtsError, FtsSearcher, fts5_available, match_expression, open_fts_searcher, split_highlights
+from src.query import parse_query
+from src.store import MemoryStore, SqliteStore, open_store, write_sqlite
+from tests import test_api
+from tests.test_api import client, ingest_client
+
+if not fts5_available(sqlite3.connect(':memory:')):
+    pytest.skip("SQLite was built without FTS5", allow_module_level=True)
+
+
+@pytest.fixture(scope='module')
+def database(tmp_path_factory):
+    path = tmp_path_factory.mktemp('fts') / 'docs.db'
+    write_sqlite(LEGAL_DOCUMENTS.values(), str(path))
+    return str(path)
+
+
+@pytest.fixture(scope='module')
+def searcher(database):
+    return FtsSearcher(database)
+
+
+@pytest.fixture(autouse=True)
+def fts_backend(request, database, monkeypatch):
+    # The API contract tests below run against the FTS5 backend, which only
+    # serves BM25, and the SQLite store it indexes (monkeypatch puts the
+    # previous store back); the cache is cleared so earlier in-memory
+    # results aren't replayed.
+    if request.cls is not None and issubclass(request.cls, ApiContract):
+        monkeypatch.setattr(config.Config, 'SEARCH_SCORING_MODE', 'bm25')
+        monkeypatch.setattr(documents, '_store', SqliteStore(database))
+        monkeypatch.setattr(app_module, 'fts_searcher', FtsSearcher(database, app_module.live_index.version))
+        app_module.search_cache.invalidate()
+        yield
+        app_module.search_cache.invalidate()
+    else:
+        yield
+
+
+class TestMatchExpression:
+    
+    @pytest.mark.parametrize('query, expression', [
+        ('contract', '"contract"'),
+        ('contract law', '("contract" OR "law")'),
+        ('"statute of frauds"', '"statute of frauds"'),
+        ('breach NEAR/3 damages', 'NEAR("breach" "damages", 3)'),
+        ('law AND rights', '("law" AND "rights")'),
+        ('rights NOT property', '(("rights") NOT "property")'),
+        ('e-mail', '("e" OR "mail")'),
+    ])
+    def test_translation(self, query, expression):
+        assert match_expression(parse_query(query).root) == expression
+    
+    def test_unsupported_queries(self):
+        assert match_expression(parse_query('-contract').root) is None
+        assert match_expression(parse_query('(a NEAR b) NEAR c').root) is None
+
+
+class TestSplitHighlights:
+    
+    def test_markers_become_offsets(self):
+        snippet, highlights = split_highlights('...a \x02breach\x03 of \x02contract\x03 terms')
+        
+        assert snippet == '...a breach of contract terms'
+        assert [snippet[start:end] for start, end in highlights] == ['breach', 'contract']
+    
+    def test_adjacent_highlights_merge(self):
+        assert split_highlights('\x02statute\x03\x02 of\x03 frauds') == ('statute of frauds', [[0, 10]])
+
+
+class TestFtsSearcher:
+    
+    def test_ranked_page_with_snippets(self, searcher):
+        results, total = searcher.search(parse_query('"statute of frauds"'), 10)
+        
+        assert total == 1
+        assert results[0]['id'] == 'doc1'
+        assert results[0]['relevance_score'] == 1.0
+        assert [results[0]['snippet'][start:end].lower() for start, end in results[0]['highlights']] == ['statute of frauds']
+    
+    @pytest.mark.parametrize('query', ['contract law', 'law AND rights', 'rights NOT property', 'breach NEAR/3 damages'])
+    def test_matches_same_documents(self, searcher, query):
+        expected_page, expected_total = app_module.rank_documents(app_module.live_index.base, parse_query(query), 100)
+        results, total = searcher.search(parse_query(query), 100)
+        
+        assert total == expected_total
+        assert {result['id'] for result in results} == {doc_id for _, doc_id in expected_page}
+    
+    def test_pagination(self, searcher):
+        everything, total = searcher.search(parse_query('law'), 100)
+        page, page_total = searcher.search(parse_query('law'), 3, 2)
+        
+        assert page_total == total
+        assert [result['id'] for result in page] == [result['id'] for result in everything[2:5]]
+    
+    def test_unsupported_query_falls_back(self, searcher):
+        assert searcher.search(parse_query('-contract'), 10) is None
+    
+    def test_requires_fts_table(self, tmp_path):
+        path = tmp_path / 'plain.db'
+        sqlite3.connect(str(path)).execute("CREATE TABLE documents (id TEXT)")
+        
+        with pytest.raises(FtsError):
+            FtsSearcher(str(path))
+    
+    def test_requires_sqlite_store(self, database):
+        assert isinstance(open_fts_searcher(open_store(f"sqlite:{database}")), FtsSearcher)
+        
+        with pytest.raises(FtsError):
+            open_fts_searcher(MemoryStore(LEGAL_DOCUMENTS))
+
+
+class ApiContract:
+    pass
+
+
+class TestContractSetup(ApiContract):
+    
+    def test_runs_against_the_indexed_store(self, database):
+        assert isinstance(documents.get_store(), SqliteStore)
+        assert documents.get_store().path == database
+
+
+class TestGenerateEndpointFts(ApiContract, test_api.TestGenerateEndpoint):
+    pass
+
+
+class TestGeneratePaginationFts(ApiContract, test_api.TestGeneratePagination):
+    pass
+
+
+class TestGenerateScoringFts(ApiContract, test_api.TestGenerateScoring):
+    pass
+
+
+class TestGeneratePhraseQueriesFts(ApiContract, test_api.TestGeneratePhraseQueries):
+    pass
+
+
+class TestGenerateBooleanQueriesFts(ApiContract, test_api.TestGenerateBooleanQueries):
+    pass
+
+
+class TestGenerateStreamingFts(ApiContract, test_api.TestGenerateStreaming):
+    pass
+
+
+class TestGenerateBatchFts(ApiContract, test_api.TestGenerateBatch):
+    pass
+
+
+class TestDocumentsEndpointFts(ApiContract, test_api.TestDocumentsEndpoint):
+    pass
+
+
+class TestDocumentIngestionFts(ApiContract, test_api.TestDocumentIngestion):
+    pass
@@ -0,0 +1,55 @@
+import pytest
+from src.documents import get_all_documents, get_document_by_id, get_normalized_documents
+from src.index import InvertedIndex, tokenize
+from src.utils import matches_query, normalize_query
+from tests.conftest import make_document
+
+
+@pytest.fixture
+def index():
+    return InvertedIndex.from_documents([
+        make_document("a", "Contract law governs binding agreements."),
+        make_document("b", "Employment rights protect workers. Employment contracts vary."),
+        make_document("c", "Patents and trademarks are intellectual property."),
+    ])
+
+
+class TestTokenize:
+
+    def test_tokenize_lowercases_and_strips_punctuation(self):
+        assert tokenize("Contract Law, Fundamentals!") == ["contract", "law", "fundamentals"]
+
+    def test_tokenize_empty(self):
+        assert tokenize("") == []
+
+
+class TestInvertedIndex:
+
+    def test_postings_track_term_frequencies(self, index):
+        assert index.postings["employment"] == {1: 2}
+        assert index.postings["contract"] == {0: 1}
+
+    def test_candidates_for_single_term(self, index):
+        assert index.candidates(normalize_query("patents")) == ["c"]
+
+    def test_candidates_match_substrings_like_legacy_search(self, index):
+        assert index.candidates(normalize_query("contract")) == ["a", "b"]
+
+    def test_candidates_union_of_terms_in_corpus_order(self, index):
+        assert index.candidates(normalize_query("trademarks employment")) == ["b", "c"]
+
+    def test_candidates_no_match(self, index):
+        assert index.candidates(normalize_query("xyzabc123")) == []
+
+    def test_candidates_case_insensitive(self, index):
+        assert index.candidates(normalize_query("PATENTS")) == ["c"]
+
+    def test_candidates_agree_with_linear_scan(self):
+        documents = get_all_documents()
+        index = InvertedIndex.from_documents(get_normalized_documents())
+
+        for query in ["contract", "employment rights", "law", "non-payment", "gdpr data", "xyzabc123"]:
+            expected = [doc['id'] for doc in documents if matches_query(query, doc['content'])]
+            candidates = [doc_id for doc_id in index.candidates(normalize_query(query))
+                          if matches_query(query, get_document_by_id(doc_id)['content'])]
+            assert candidates == expected
@@ -0,0 +1,125 @@
+import json
+from src.journal import IngestJournal
+
+
+class Recorder:
+    
+    def __init__(self):
+        self.entries = []
+    
+    def __call__(self, entries):
+        self.entries.extend(entries)
+        return [True] * len(entries)
+
+
+class TestIngestJournal:
+    
+    def test_replay_picks_up_other_writers(self, tmp_path):
+        path = str(tmp_path / 'ingest.jsonl')
+        first, second = IngestJournal(path), IngestJournal(path)
+        first_applied, second_applied = Recorder(), Recorder()
+        
+        assert first.append([{"op": "delete", "id": "doc1"}], first_applied) == [True]
+        assert second.replay(second_applied) == 1
+        assert second.replay(second_applied) == 0
+        assert second_applied.entries == first_applied.entries == [{"op": "delete", "id": "doc1"}]
+    
+    def test_append_catches_up_first(self, tmp_path):
+        path = str(tmp_path / 'ingest.jsonl')
+        first, second = IngestJournal(path), IngestJournal(path)
+        first_applied, second_applied = Recorder(), Recorder()
+        
+        first.append([{"op": "delete", "id": "doc1"}], first_applied)
+        second.append([{"op": "delete", "id": "doc2"}], second_applied)
+        
+        assert [entry["id"] for entry in second_applied.entries] == ["doc1", "doc2"]
+        assert first.replay(first_applied) == 1
+        assert [entry["id"] for entry in first_applied.entries] == ["doc1", "doc2"]
+    
+    def test_startup_replay(self, tmp_path):
+        path = str(tmp_path / 'ingest.jsonl')
+        IngestJournal(path).append([{"op": "delete", "id": "doc1"}, {"op": "delete", "id": "doc2"}], Recorder())
+        applied = Recorder()
+        
+        assert IngestJournal(path).replay(applied) == 2
+        assert len(applied.entries) == 2
+    
+    def test_partial_line_waits(self, tmp_path):
+        path = tmp_path / 'ingest.jsonl'
+        path.write_bytes(b'{"op":"delete","id":"doc1"}\n{"op":"del')
+        journal = IngestJournal(str(path))
+        applied = Recorder()
+        
+        assert journal.replay(applied) == 1
+        
+        with open(path, 'ab') as handle:
+            handle.write(b'ete","id":"doc2"}\n')
+        
+        assert journal.replay(applied) == 1
+        assert [entry["id"] for entry in applied.entries] == ["doc1", "doc2"]
+    
+    def test_missing_journal(self, tmp_path):
+        assert IngestJournal(str(tmp_path / 'missing.jsonl')).replay(Recorder()) == 0
+
+
+def put(document_id, content):
+    return {"op": "put", "document": {"id": document_id, "content": content}}
+
+
+class TestCompaction:
+    
+    def test_keeps_the_last_entry_per_document(self, tmp_path):
+        path = tmp_path / 'ingest.jsonl'
+        journal = IngestJournal(str(path), compact_size=1)
+        
+        journal.append([put("doc1", "first"), put("doc2", "first")], Recorder())
+        journal.append([put("doc1", "second"), {"op": "delete", "id": "doc2"}, put("doc3", "first")], Recorder())
+        
+        lines = [json.loads(line) for line in path.read_bytes().splitlines()]
+        assert lines == [put("doc1", "second"), {"op": "delete", "id": "doc2"}, put("doc3", "first")]
+        assert journal.offset == path.stat().st_size
+    
+    def test_waits_until_the_log_doubles(self, tmp_path):
+        path = tmp_path / 'ingest.jsonl'
+        journal = IngestJournal(str(path), compact_size=1)
+        
+        journal.append([put("doc1", "first"), put("doc1", "second")], Recorder())
+        compacted = path.stat().st_size
+        journal.append([put("doc1", "third")], Recorder())
+        
+        assert path.stat().st_size > compacted
+        assert journal.compact(Recorder()) is False
+    
+    def test_other_workers_reread_the_compacted_log(self, tmp_path):
+        path = str(tmp_path / 'ingest.jsonl')
+        first, second = IngestJournal(path), IngestJournal(path, compact_size=1)
+        first_applied, second_applied = Recorder(), Recorder()
+        
+        first.append([put("doc1", "first")], first_applied)
+        second.append([put("doc1", "second"), put("doc2", "first")], second_applied)
+        first.append([put("doc3", "first")], first_applied)
+        
+        # The first worker replays the compacted log from the top, then
+        # appends to it rather than to the file it had open.
+        assert first_applied.entries[-3:] == [put("doc1", "second"), put("doc2", "first"), put("doc3", "first")]
+        assert second.replay(second_applied) == 1
+        assert second_applied.entries[-1] == put("doc3", "first")
+    
+    def test_startup_replay_after_compaction(self, tmp_path):
+        path = str(tmp_path / 'ingest.jsonl')
+        journal = IngestJournal(path)
+        journal.append([put("doc1", "first"), put("doc1", "second"), {"op": "delete", "id": "doc2"}], Recorder())
+        
+        assert IngestJournal(path, compact_size=1).compact(Recorder()) is True
+        
+        applied = Recorder()
+        assert IngestJournal(path).replay(applied) == 2
+        assert applied.entries == [put("doc1", "second"), {"op": "delete", "id": "doc2"}]
+    
+    def test_disabled_without_a_size(self, tmp_path):
+        path = str(tmp_path / 'ingest.jsonl')
+        journal = IngestJournal(path)
+        journal.append([put("doc1", "first"), put("doc1", "second")], Recorder())
+        
+        assert journal.compact(Recorder()) is False
+        assert IngestJournal(path).replay(Recorder()) == 2
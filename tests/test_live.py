@@ -0,0 +1,222 @@
+import pytest
+from src import documents, live
+from src.documents import LEGAL_DOCUMENTS, get_normalized_documents
+from src.index import InvertedIndex
+from src.live import LiveIndex, merge_segments, rank_segments
+from src.query import parse_query
+from src.search import rank_documents
+from src.store import MemoryStore
+
+
+QUERIES = [
+    "contract law",
+    "rights",
+    "law AND rights",
+    "rights NOT property",
+    '"statute of frauds"',
+    "zebra crossing",
+    "xyznonexistent",
+]
+
+ADDED = {
+    "id": "doc-new",
+    "title": "Crossing Rules",
+    "summary": "Pedestrian rights.",
+    "content": "A zebra crossing gives pedestrians rights of way under traffic law."
+}
+REVISED = {**LEGAL_DOCUMENTS["doc1"], "content": "Contract law now covers every zebra crossing agreement."}
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = MemoryStore(LEGAL_DOCUMENTS)
+    monkeypatch.setattr(documents, '_store', store)
+    return store
+
+
+@pytest.fixture
+def live_index(store):
+    return LiveIndex(InvertedIndex.from_documents(get_normalized_documents()))
+
+
+def apply(store, live_index, document=None, delete=None):
+    if document is not None:
+        store.put(document)
+        live_index.put(document["id"], store.normalized(document["id"]).tokens)
+    if delete is not None:
+        store.delete(delete)
+        live_index.delete(delete)
+
+
+def rebuilt_index():
+    return InvertedIndex.from_documents(get_normalized_documents())
+
+
+class TestLiveIndex:
+    
+    def test_changes_are_searchable_before_merge(self, store, live_index):
+        version = live_index.version
+        apply(store, live_index, ADDED)
+        segments = live_index.segments()
+        
+        assert segments.pending
+        assert live_index.version == version + 1
+        assert len(live_index) == len(LEGAL_DOCUMENTS) + 1
+        assert [doc_id for _, doc_id in rank_segments(segments, parse_query("zebra"), 10)[0]] == ["doc-new"]
+    
+    def test_deleted_and_replaced_documents_leave_the_base(self, store, live_index):
+        apply(store, live_index, REVISED, delete="doc2")
+        segments = live_index.segments()
+        
+        assert segments.deleted_ids == {"doc1", "doc2"}
+        assert "doc2" not in dict((doc_id, score) for score, doc_id in rank_segments(segments, parse_query("rights"), 100)[0])
+        assert [doc_id for _, doc_id in rank_segments(segments, parse_query("zebra"), 10)[0]] == ["doc1"]
+    
+    def test_statistics_match_rebuilt_index(self, store, live_index):
+        apply(store, live_index, ADDED, delete="doc2")
+        apply(store, live_index, REVISED)
+        statistics = live_index.segments().statistics
+        index = rebuilt_index()
+        
+        assert len(statistics) == len(index)
+        assert statistics.average_length == index.average_length
+        for term in ["law", "contract", "rights", "zebra", "missing"]:
+            assert statistics.doc_freq(term) == index.doc_freq(term)
+    
+    @pytest.mark.parametrize('scoring', ['bm25', 'legacy'])
+    def test_ranking_matches_rebuilt_index(self, store, live_index, scoring):
+        apply(store, live_index, ADDED, delete="doc2")
+        apply(store, live_index, REVISED)
+        segments = live_index.segments()
+        index = rebuilt_index()
+        
+        for query in QUERIES:
+            parsed = parse_query(query)
+            page, total = rank_segments(segments, parsed, 100, 0, scoring)
+            expected_page, expected_total = rank_documents(index, parsed, 100, 0, scoring)
+            
+            assert total == expected_total
+            assert {doc_id: score for score, doc_id in page} == {doc_id: score for score, doc_id in expected_page}
+
+
+class TestMerge:
+    
+    def test_merge_folds_delta_into_base(self, store, live_index):
+        apply(store, live_index, ADDED, delete="doc2")
+        apply(store, live_index, REVISED)
+        version = live_index.version
+        
+        assert live_index.merge() is True
+        
+        segments = live_index.segments()
+        index = rebuilt_index()
+        
+        assert not segments.pending
+        assert live_index.version == version
+        assert sorted(segments.base.doc_ids) == sorted(index.doc_ids)
+        for term in ["contract", "zebra", "rights"]:
+            merged = {segments.base.doc_ids[ordinal]: frequency for ordinal, frequency in segments.base.postings[term].items()}
+            rebuilt = {index.doc_ids[ordinal]: frequency for ordinal, frequency in index.postings[term].items()}
+            assert merged == rebuilt
+        assert rank_documents(segments.base, parse_query('"zebra crossing"'), 10)[1] == 2
+    
+    def test_merge_without_changes(self, live_index):
+        base = live_index.base
+        
+        assert live_index.merge() is False
+        assert live_index.base is base
+    
+    def test_changes_during_merge_are_kept(self, store, live_index, monkeypatch):
+        apply(store, live_index, ADDED)
+        
+        def merge_while_writing(segments):
+            merged = merge_segments(segments)
+            apply(store, live_index, REVISED, delete="doc-new")
+            return merged
+        
+        monkeypatch.setattr(live, 'merge_segments', merge_while_writing)
+        live_index.merge()
+        segments = live_index.segments()
+        
+        assert "doc-new" in segments.base.doc_ids
+        assert segments.deleted_ids == {"doc1", "doc-new"}
+        assert [delta.doc_ids for delta, _ in segments.deltas] == [["doc1"]]
+        assert len(live_index) == len(LEGAL_DOCUMENTS)
+    
+    def test_background_merge(self, store):
+        merged = []
+        live_index = LiveIndex(rebuilt_index(), merge_threshold=1, on_merge=lambda base, segments: merged.append((base, segments)))
+        apply(store, live_index, ADDED)
+        pending = live_index.segments()
+        live_index.schedule_merge()
+        live_index.wait_for_merge(5)
+        
+        assert not live_index.segments().pending
+        assert merged == [(live_index.base, pending)]
+        assert live_index.stats()["merges"] == 1
+    
+    def test_merge_waits_for_threshold(self, store):
+        live_index = LiveIndex(rebuilt_index(), merge_threshold=3)
+        apply(store, live_index, ADDED)
+        live_index.schedule_merge()
+        live_index.wait_for_merge(5)
+        
+        assert live_index.segments().pending
+        assert live_index.stats()["delta_documents"] == 1
+    
+    def test_merge_ratio_scales_with_the_base(self, store):
+        live_index = LiveIndex(rebuilt_index(), merge_threshold=1, merge_ratio=0.25)
+        apply(store, live_index, ADDED)
+        live_index.schedule_merge()
+        live_index.wait_for_merge(5)
+        
+        assert live_index.stats()["merge_threshold"] == len(LEGAL_DOCUMENTS) // 4
+        assert live_index.segments().pending
+
+
+class TestDeltaSegments:
+    
+    def added(self, number):
+        return {**ADDED, "id": f"doc-new-{number}", "content": f"Zebra crossing number {number}."}
+    
+    def test_each_write_adds_a_segment_and_equal_ones_fold(self, store, live_index):
+        for number in range(7):
+            apply(store, live_index, self.added(number))
+        
+        # Seven single-document writes leave segments of four, two and one.
+        assert [len(delta) for delta, _ in live_index.segments().deltas] == [4, 2, 1]
+        assert live_index.stats()["delta_segments"] == 3
+    
+    def test_replaced_documents_are_dropped_when_segments_fold(self, store, live_index):
+        apply(store, live_index, self.added(0))
+        apply(store, live_index, {**self.added(0), "content": "Revised zebra rules."})
+        segments = live_index.segments()
+        
+        assert [(delta.doc_ids, dead) for delta, dead in segments.deltas] == [(["doc-new-0"], frozenset())]
+        assert rank_segments(segments, parse_query("revised"), 10)[1] == 1
+    
+    @pytest.mark.parametrize('scoring', ['bm25', 'legacy'])
+    def test_ranking_across_segments_matches_rebuilt_index(self, store, live_index, scoring):
+        for number in range(3):
+            apply(store, live_index, self.added(number))
+        apply(store, live_index, REVISED, delete="doc-new-1")
+        apply(store, live_index, self.added(3))
+        segments = live_index.segments()
+        index = rebuilt_index()
+        
+        assert len(segments.deltas) > 1
+        for query in QUERIES + ["zebra", "number"]:
+            parsed = parse_query(query)
+            page, total = rank_segments(segments, parsed, 100, 0, scoring)
+            expected_page, expected_total = rank_documents(index, parsed, 100, 0, scoring)
+            
+            assert total == expected_total
+            assert {doc_id: score for score, doc_id in page} == {doc_id: score for score, doc_id in expected_page}
+    
+    def test_merge_folds_every_segment(self, store, live_index):
+        for number in range(3):
+            apply(store, live_index, self.added(number))
+        live_index.merge()
+        
+        assert not live_index.segments().pending
+        assert sorted(live_index.base.doc_ids) == sorted(rebuilt_index().doc_ids)
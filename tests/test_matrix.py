@@ -0,0 +1,98 @@
+import pytest
+from src.documents import get_normalized_document, get_normalized_documents
+from src.index import InvertedIndex
+from src.live import LiveIndex, rank_segments
+from src.query import parse_query
+from src.scoring import bm25_term_scores
+from src.search import rank_documents
+
+np = pytest.importorskip('numpy')
+
+from src.matrix import MatrixScorer, TermDocumentMatrix
+
+
+QUERIES = [
+    "contract law",
+    "rights",
+    "law law contract",
+    "law AND rights",
+    "rights NOT property",
+    '"statute of frauds"',
+    "breach NEAR/3 damages",
+    "employment discrimination",
+    "act",
+    "xyznonexistent",
+]
+
+
+@pytest.fixture(scope='module')
+def index():
+    return InvertedIndex.from_documents(get_normalized_documents())
+
+
+@pytest.fixture(scope='module')
+def scorer(index):
+    return MatrixScorer(index)
+
+
+class TestTermDocumentMatrix:
+    
+    def test_rows_hold_postings(self, index):
+        matrix = TermDocumentMatrix(index)
+        row = matrix.rows["contract"]
+        start, end = matrix.indptr[row], matrix.indptr[row + 1]
+        
+        assert dict(zip(matrix.indices[start:end].tolist(), matrix.frequencies[start:end].tolist())) == index.postings["contract"]
+    
+    def test_bm25_weights_match_term_scores(self, index):
+        matrix = TermDocumentMatrix(index)
+        
+        for term in ["law", "contract", "rights"]:
+            row = matrix.rows[term]
+            start, end = matrix.indptr[row], matrix.indptr[row + 1]
+            
+            assert dict(zip(matrix.indices[start:end].tolist(), matrix.bm25_weights[start:end].tolist())) == bm25_term_scores(index, term)
+
+
+class TestMatrixScorer:
+    
+    @pytest.mark.parametrize('scoring', ['bm25', 'legacy'])
+    def test_matches_default_ranking(self, index, scorer, scoring):
+        for query in QUERIES:
+            parsed = parse_query(query)
+            
+            for limit, offset in [(10, 0), (3, 2), (100, 0)]:
+                assert scorer.rank_documents(parsed, limit, offset, scoring) == rank_documents(index, parsed, limit, offset, scoring)
+    
+    def test_offset_past_results(self, scorer):
+        page, total = scorer.rank_documents(parse_query("contract"), 10, 500)
+        
+        assert page == []
+        assert total > 0
+    
+    def test_legacy_punctuation_falls_back(self, scorer):
+        assert scorer.rank_documents(parse_query("law."), 10, 0, 'legacy') is None
+    
+    def test_falls_back_when_index_changes(self):
+        local_index = InvertedIndex.from_documents(get_normalized_documents())
+        scorer = MatrixScorer(local_index)
+        local_index.add_document("extra", ["contract"])
+        
+        assert scorer.rank_documents(parse_query("contract"), 10) is None
+    
+    @pytest.mark.parametrize('scoring', ['bm25', 'legacy'])
+    def test_serves_the_base_of_a_live_index(self, index, scorer, scoring):
+        live_index = LiveIndex(index)
+        live_index.delete("doc2")
+        live_index.put("doc3", get_normalized_document("doc3").tokens)
+        segments = live_index.segments()
+        
+        for query in QUERIES:
+            parsed = parse_query(query)
+            base_results = scorer.segment_results(parsed, 5, scoring, segments.statistics, segments.tombstones)
+            if base_results is None:
+                # Legacy terms the matrix can't count.
+                continue
+            
+            assert rank_segments(segments, parsed, 5, 0, scoring, [base_results]) == rank_segments(segments, parsed, 5, 0, scoring)
+            assert "doc2" not in {doc_id for _, _, doc_id in base_results[0]}
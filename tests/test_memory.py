@@ -0,0 +1,33 @@
+import os
+import sys
+import pytest
+from src.memory import child_pids, main, process_memory
+
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith('linux'), reason="reads /proc")
+
+
+class TestProcessMemory:
+    
+    def test_reports_unique_set_size(self):
+        memory = process_memory()
+        
+        assert memory['rss_kb'] > 0
+        assert memory['uss_kb'] == memory['private_clean_kb'] + memory['private_dirty_kb']
+        assert memory['uss_kb'] <= memory['rss_kb']
+    
+    def test_other_process(self):
+        assert process_memory(os.getppid())['rss_kb'] > 0
+    
+    def test_child_pids(self):
+        assert os.getpid() in child_pids(os.getppid())
+    
+    def test_cli_lists_master_and_workers(self, capsys):
+        assert main([str(os.getppid())]) == 0
+        
+        output = capsys.readouterr().out
+        assert 'master' in output
+        assert str(os.getpid()) in output
+    
+    def test_cli_usage(self):
+        assert main([]) == 2
@@ -0,0 +1,190 @@
+import json
+import pytest
+import config
+import app as app_module
+from src import documents
+from src.index import InvertedIndex
+from src.live import LiveIndex, merge_segments
+from src.passages import PassageIndex, rank_passages
+from src.query import parse_query
+from src.search import iter_results
+from src.snippets import ELLIPSIS, build_snippet
+from src.store import MemoryStore
+from tests.conftest import make_document
+from tests.test_api import INGEST_HEADERS, client, ingest_client, ingested_document
+
+
+CONTENT = {
+    "a": "Contracts need an offer.\n\nBreach of contract leads to damages. Damages compensate the breach.\n\nCourts rarely order specific performance.",
+    "b": "Damages are the usual remedy for breach, whatever the contract.",
+    "c": "Tenants have rights.\n  \n\nLandlords have rights under property law.",
+}
+
+
+def passage_text(document, passage):
+    start, end = passage
+    return ' '.join(document.tokens[start:end])
+
+
+@pytest.fixture
+def passage_index(monkeypatch):
+    store = MemoryStore({doc_id: {"id": doc_id, "title": doc_id, "summary": "", "content": content} for doc_id, content in CONTENT.items()})
+    monkeypatch.setattr(documents, '_store', store)
+    return PassageIndex(InvertedIndex.from_documents(documents.get_normalized_documents()))
+
+
+class TestSplitPassages:
+    
+    def test_blank_lines_separate_passages(self):
+        document = make_document("doc", CONTENT["a"])
+        
+        assert [passage_text(document, passage) for passage in document.passages] == [
+            "contracts need an offer",
+            "breach of contract leads to damages damages compensate the breach",
+            "courts rarely order specific performance",
+        ]
+    
+    def test_whitespace_only_lines_and_single_paragraphs(self):
+        assert len(make_document("doc", CONTENT["c"]).passages) == 2
+        assert make_document("doc", CONTENT["b"]).passages == [(0, 10)]
+        assert make_document("doc", "").passages == []
+
+
+class TestPassageSnippets:
+    
+    def test_short_passage_is_returned_whole(self):
+        document = make_document("doc", CONTENT["a"])
+        snippet, highlights = build_snippet(document, ["damages"], max_length=200, passage=document.passages[1])
+        
+        assert snippet == "Breach of contract leads to damages. Damages compensate the breach."
+        assert [snippet[start:end] for start, end in highlights] == ["damages", "Damages"]
+    
+    def test_long_passage_is_trimmed_within_its_bounds(self):
+        document = make_document("doc", CONTENT["a"])
+        snippet, highlights = build_snippet(document, ["compensate"], max_length=30, context_chars=5, passage=document.passages[1])
+        
+        assert snippet.startswith(ELLIPSIS) and snippet.endswith(ELLIPSIS)
+        assert "offer" not in snippet and "Courts" not in snippet
+        assert [snippet[start:end] for start, end in highlights] == ["compensate"]
+    
+    def test_hits_outside_the_passage_are_ignored(self):
+        document = make_document("doc", CONTENT["a"])
+        snippet, highlights = build_snippet(document, ["offer"], max_length=200, passage=document.passages[2])
+        
+        assert snippet == "Courts rarely order specific performance."
+        assert highlights == []
+
+
+class TestPassageIndex:
+    
+    def test_documents_rank_by_best_passage(self, passage_index):
+        page, total, passages = passage_index.rank_documents(parse_query("breach damages"), 10)
+        
+        assert total == 2
+        assert page[0] == (1.0, "a")
+        assert passages["a"] == documents.get_normalized_document("a").passages[1]
+        assert passages["b"] == (0, 10)
+    
+    def test_boolean_queries_match_whole_documents(self, passage_index):
+        # "offer" and "damages" are in different passages of "a".
+        page, total, passages = passage_index.rank_documents(parse_query("offer AND damages"), 10)
+        
+        assert total == 1
+        assert [doc_id for _, doc_id in page] == ["a"]
+    
+    def test_pagination_and_snippets(self, passage_index):
+        query = parse_query("rights OR damages")
+        everything, total, _ = passage_index.rank_documents(query, 10)
+        page, page_total, passages = passage_index.rank_documents(query, 1, 1)
+        results = list(iter_results(query, page, passages=passages))
+        
+        assert page_total == total == 3
+        assert page == everything[1:2]
+        assert list(passages) == [page[0][1]]
+        assert len(results) == 1 and "\n" not in results[0]["snippet"]
+
+
+class TestPassageSegments:
+    
+    @pytest.fixture
+    def segments(self, passage_index):
+        live_index = LiveIndex(passage_index.index)
+        changes = [
+            ("d", "Damages for breach.\n\nRights of tenants."),
+            ("a", "Breach of contract.\n\nNo damages here, only rights.")
+        ]
+        for doc_id, content in changes:
+            documents.get_store().put({"id": doc_id, "title": doc_id, "summary": "", "content": content})
+            live_index.put(doc_id, documents.get_normalized_document(doc_id).tokens)
+        documents.get_store().delete("c")
+        live_index.delete("c")
+        return live_index.segments()
+    
+    def parts(self, passage_index, segments):
+        return [(passage_index, segments.tombstones), *((PassageIndex(delta), dead) for delta, dead in segments.deltas)]
+    
+    @pytest.mark.parametrize('query', ["breach damages", "rights", "offer AND damages", "tenants OR contract"])
+    def test_ranking_matches_rebuilt_index(self, passage_index, segments, query):
+        rebuilt = PassageIndex(InvertedIndex.from_documents(documents.get_normalized_documents()))
+        
+        assert rank_passages(self.parts(passage_index, segments), parse_query(query), 10) == rebuilt.rank_documents(parse_query(query), 10)
+    
+    def test_merged_passages_match_rebuilt_index(self, passage_index, segments, monkeypatch):
+        merged_index = merge_segments(segments)
+        rebuilt = PassageIndex(merged_index)
+        parts = self.parts(passage_index, segments)
+        # Nothing is normalized again.
+        monkeypatch.setattr('src.passages.get_normalized_document', None)
+        merged = PassageIndex.merged(merged_index, parts)
+        
+        assert merged.ranges == rebuilt.ranges
+        assert merged.first_passage == rebuilt.first_passage
+        assert merged.passages.doc_ids == rebuilt.passages.doc_ids
+        assert merged.passages.postings == rebuilt.passages.postings
+
+
+class TestPassageSearchEndpoint:
+    
+    @pytest.fixture(autouse=True)
+    def passages(self, monkeypatch):
+        monkeypatch.setattr(config.Config, 'SEARCH_SCORING_MODE', 'bm25')
+        monkeypatch.setattr(app_module, 'passage_index', PassageIndex(app_module.live_index.base))
+        app_module.search_cache.invalidate()
+        yield
+        app_module.search_cache.invalidate()
+    
+    def search(self, client, query, **options):
+        response = client.post('/api/generate', data=json.dumps({'query': query, **options}), content_type='application/json')
+        return json.loads(response.data)
+    
+    def test_snippets_are_whole_passages(self, client):
+        data = self.search(client, '"statute of frauds"')
+        snippet = data['results'][0]['snippet']
+        
+        assert data['count'] == 1
+        assert snippet.startswith('Contracts may be written or oral') and not snippet.startswith(ELLIPSIS)
+        assert [snippet[start:end] for start, end in data['results'][0]['highlights']] == ['Statute of Frauds']
+    
+    def test_counts_match_document_search(self, client, monkeypatch):
+        queries = ['breach damages', 'law AND rights', 'rights NOT property', 'breach NEAR/3 damages']
+        with_passages = [self.search(client, query)['count'] for query in queries]
+        monkeypatch.setattr(app_module, 'passage_index', None)
+        app_module.search_cache.invalidate()
+        
+        assert with_passages == [self.search(client, query)['count'] for query in queries]
+    
+    def test_legacy_scoring_uses_documents(self, client):
+        data = self.search(client, 'contract', scoring='legacy')
+        
+        assert all(len(result['snippet']) <= 200 + 2 * len(ELLIPSIS) for result in data['results'])
+    
+    def test_stats_report_backend(self, client):
+        assert json.loads(client.get('/api/stats').data)['backend'] == 'passages'
+    
+    def test_ingested_documents_are_split_into_passages(self, ingest_client):
+        content = "Zeppelin leases need a charter.\n\nA zeppelin charter must name the airship."
+        ingest_client.put('/api/documents/ingest-1', json=ingested_document('ingest-1', content), headers=INGEST_HEADERS)
+        data = self.search(ingest_client, 'zeppelin charter airship')
+        
+        assert data['results'][0]['id'] == 'ingest-1'
+        assert data['results'][0]['snippet'] == "A zeppelin charter must name the airship."
@@ -0,0 +1,182 @@
+import pytest
+from src.documents import get_store
+from src.index import InvertedIndex
+from src.query import (
+    DEFAULT_NEAR_DISTANCE,
+    Bool,
+    Near,
+    Phrase,
+    Term,
+    TermMatcher,
+    clause_spans,
+    evaluate,
+    parse_query,
+)
+from src.search import ExactTermMatcher, SubstringTermMatcher, search_documents
+from tests.conftest import make_document
+
+
+@pytest.fixture
+def index():
+    return InvertedIndex.from_documents([
+        make_document("a", "Contracts under the statute of frauds must be written."),
+        make_document("b", "The statute says frauds of any kind are void."),
+        make_document("c", "Breach of contract allows damages. Damages follow breach."),
+    ])
+
+
+class TestParseQuery:
+    
+    def test_plain_terms(self):
+        assert parse_query("Contract LAW").clauses == (Term("contract"), Term("law"))
+    
+    def test_quoted_phrase(self):
+        parsed = parse_query('"Statute of Frauds" contract')
+        
+        assert parsed.clauses == (Phrase(("statute", "of", "frauds")), Term("contract"))
+        assert not parsed.simple
+        assert parsed.terms == ["statute", "of", "frauds", "contract"]
+    
+    def test_single_word_quotes_are_a_term(self):
+        assert parse_query('"contract"').clauses == (Term("contract"),)
+    
+    def test_unbalanced_quote_runs_to_end(self):
+        assert parse_query('"statute of frauds').clauses == (Phrase(("statute", "of", "frauds")),)
+    
+    def test_near_with_distance(self):
+        assert parse_query("breach NEAR/3 damages").clauses == (Near(Term("breach"), Term("damages"), 3),)
+    
+    def test_near_default_distance(self):
+        assert parse_query("breach NEAR damages").clauses[0].distance == DEFAULT_NEAR_DISTANCE
+    
+    def test_lowercase_near_is_a_term(self):
+        assert parse_query("near miss").clauses == (Term("near"), Term("miss"))
+    
+    def test_canonical_form(self):
+        assert str(parse_query('  "Statute  of frauds"   BREACH NEAR/2 damages ')) == '"statute of frauds" breach NEAR/2 damages'
+
+
+class TestBooleanParsing:
+    
+    def test_plain_terms_are_simple(self):
+        parsed = parse_query("contract law")
+        
+        assert parsed.simple
+        assert parsed.root == Bool(should=(Term("contract"), Term("law")))
+    
+    def test_and_binds_tighter_than_or(self):
+        parsed = parse_query("contract AND breach OR tort")
+        
+        assert parsed.root == Bool(should=(Bool(must=(Term("contract"), Term("breach"))), Term("tort")))
+        assert not parsed.simple
+    
+    def test_not_excludes(self):
+        assert parse_query("contract NOT tort").root == Bool(should=(Term("contract"),), must_not=(Term("tort"),))
+    
+    def test_and_not(self):
+        assert parse_query("contract AND NOT tort").root == Bool(must=(Term("contract"),), must_not=(Term("tort"),))
+    
+    def test_required_and_prohibited_prefixes(self):
+        parsed = parse_query('+contract -"statute of frauds" breach')
+        
+        assert parsed.root == Bool(
+            must=(Term("contract"),),
+            should=(Term("breach"),),
+            must_not=(Phrase(("statute", "of", "frauds")),)
+        )
+        assert parsed.terms == ["contract", "breach"]
+    
+    def test_parentheses_group(self):
+        assert parse_query("(contract OR tort) AND damages").root == Bool(
+            must=(Bool(should=(Term("contract"), Term("tort"))), Term("damages"))
+        )
+    
+    def test_dangling_operators_are_ignored(self):
+        assert parse_query("AND contract OR").root == Term("contract")
+        assert not parse_query("NOT")
+    
+    def test_canonical_form_round_trips(self):
+        parsed = parse_query("(contract OR tort) AND damages NOT void")
+        
+        assert parse_query(str(parsed)) == parsed
+
+
+class TestQueryPlanner:
+    
+    def test_and_intersects(self, index):
+        assert evaluate(index, parse_query("statute AND frauds").root, ExactTermMatcher(index)) == {0, 1}
+    
+    def test_not_subtracts(self, index):
+        assert evaluate(index, parse_query("statute NOT void").root, ExactTermMatcher(index)) == {0}
+    
+    def test_or_unions(self, index):
+        assert evaluate(index, parse_query("void OR damages").root, ExactTermMatcher(index)) == {1, 2}
+    
+    def test_rare_term_first_short_circuits(self, index):
+        class CountingMatcher(ExactTermMatcher):
+            def __init__(self, index):
+                super().__init__(index)
+                self.calls = []
+            
+            def ordinals(self, text, within=None):
+                self.calls.append(text)
+                return super().ordinals(text, within)
+        
+        matcher = CountingMatcher(index)
+        
+        assert evaluate(index, parse_query("the AND missing AND statute").root, matcher) == set()
+        assert matcher.calls == ["missing"]
+    
+    def test_substring_estimate_bounds_matches_without_building_them(self, index, monkeypatch):
+        matcher = SubstringTermMatcher(index)
+        expected = {text: len(index.term_ordinals(text)) for text in ["statute", "stat", "void", "frauds statute", "missing"]}
+        monkeypatch.setattr(index, 'term_ordinals', None)
+        
+        for text, count in expected.items():
+            assert matcher.estimate(text) >= count
+        assert matcher.estimate("missing") == 0
+    
+    def test_matcher_must_implement_lookups(self, index):
+        class EstimateOnly(TermMatcher):
+            def estimate(self, text):
+                return 0
+        
+        with pytest.raises(TypeError):
+            EstimateOnly(index)
+    
+    def test_search_respects_boolean_operators(self):
+        corpus_index = InvertedIndex.from_documents(get_store().iter_normalized())
+        
+        for scoring in ['bm25', 'legacy']:
+            everything, _ = search_documents(corpus_index, parse_query("rights"), 10, scoring=scoring)
+            excluded, _ = search_documents(corpus_index, parse_query("property"), 10, scoring=scoring)
+            results, total = search_documents(corpus_index, parse_query("rights NOT property"), 10, scoring=scoring)
+            
+            expected = {result['id'] for result in everything} - {result['id'] for result in excluded}
+            assert total == len(expected) > 0
+            assert {result['id'] for result in results} == expected
+
+
+class TestPositionalMatching:
+    
+    def test_phrase_requires_adjacent_terms_in_order(self, index):
+        assert clause_spans(index, Phrase(("statute", "of", "frauds"))) == {0: [(3, 5)]}
+    
+    def test_near_within_distance(self, index):
+        assert set(clause_spans(index, Near(Term("breach"), Term("damages"), 3))) == {2}
+    
+    def test_near_is_order_independent(self, index):
+        assert clause_spans(index, Near(Term("damages"), Term("breach"), 1)) == {2: [(5, 7)]}
+    
+    def test_near_outside_distance(self, index):
+        assert clause_spans(index, Near(Term("statute"), Term("void"), 2)) == {}
+    
+    def test_phrase_search_on_corpus(self):
+        corpus_index = InvertedIndex.from_documents(get_store().iter_normalized())
+        
+        for scoring in ['bm25', 'legacy']:
+            results, total = search_documents(corpus_index, parse_query('"statute of frauds"'), 10, scoring=scoring)
+            
+            assert total == 1
+            assert results[0]['id'] == 'doc1'
+            assert 'statute of frauds' in results[0]['snippet'].lower()
@@ -0,0 +1,60 @@
+import pytest
+from src.index import InvertedIndex
+from src.scoring import bm25_idf, bm25_scores, query_tokens
+from tests.conftest import make_document
+
+
+@pytest.fixture
+def index():
+    return InvertedIndex.from_documents([
+        make_document("a", "The contract was signed. The contract is binding."),
+        make_document("b", "An act of parliament regulates employment."),
+        make_document("c", "Employment contracts, employment law and employment rights in one long overview of many topics."),
+        make_document("d", "Tax law and compliance."),
+    ])
+
+
+class TestQueryTokens:
+    
+    def test_query_tokens_split_punctuation(self):
+        assert query_tokens(["non-payment", "law"]) == ["non", "payment", "law"]
+
+
+class TestBm25:
+    
+    def test_exact_terms_only(self, index):
+        scores = bm25_scores(index, ["act"])
+        
+        assert list(scores) == [1]
+    
+    def test_no_matching_terms(self, index):
+        assert bm25_scores(index, ["xyzabc123"]) == {}
+    
+    def test_rarer_terms_weigh_more(self, index):
+        assert bm25_idf(index, "tax") > bm25_idf(index, "law")
+    
+    def test_term_frequency_saturates(self, index):
+        scores = bm25_scores(index, ["employment"])
+        
+        assert scores[2] > scores[1]
+        assert scores[2] < 3 * scores[1]
+    
+    def test_scores_use_precomputed_lengths(self, index):
+        assert index.doc_lengths[0] == 8
+        assert index.average_length == index.total_length / 4
+    
+    def test_multi_term_scores_add_up(self, index):
+        combined = bm25_scores(index, ["tax", "law"])
+        tax = bm25_scores(index, ["tax"])
+        law = bm25_scores(index, ["law"])
+        
+        assert combined[3] == pytest.approx(tax[3] + law[3])
+    
+    def test_shared_term_scores_are_reused(self, index):
+        shared = {}
+        
+        assert bm25_scores(index, ["employment", "law"], shared=shared) == bm25_scores(index, ["employment", "law"])
+        assert set(shared) == {"employment", "law"}
+        
+        shared["law"] = {3: 100.0}
+        assert bm25_scores(index, ["law"], shared=shared) == {3: 100.0}
@@ -0,0 +1,56 @@
+import pytest
+from src.documents import get_normalized_documents
+from src.index import InvertedIndex
+from src.scoring import bm25_scores
+from src.query import parse_query
+from src.search import search_documents
+from src.utils import compute_mock_relevance, matches_query, normalize_query
+
+
+@pytest.fixture(scope='module')
+def index():
+    return InvertedIndex.from_documents(get_normalized_documents())
+
+
+class TestSearchDocuments:
+    
+    def test_legacy_top_k_matches_full_sort(self, index):
+        query_terms = normalize_query("law contract")
+        expected = sorted(
+            (doc for doc in get_normalized_documents() if matches_query(query_terms, doc)),
+            key=lambda doc: compute_mock_relevance(query_terms, doc),
+            reverse=True
+        )
+        
+        results, total = search_documents(index, parse_query("law contract"), limit=4, scoring='legacy')
+        
+        assert total == len(expected)
+        assert [r['id'] for r in results] == [doc.id for doc in expected[:4]]
+    
+    def test_pages_are_contiguous(self, index):
+        query = parse_query("law")
+        
+        first, total = search_documents(index, query, limit=3)
+        second, _ = search_documents(index, query, limit=3, offset=3)
+        everything, _ = search_documents(index, query, limit=total)
+        
+        assert [r['id'] for r in first + second] == [r['id'] for r in everything[:6]]
+    
+    def test_bm25_ranks_by_raw_score(self, index):
+        query_terms = normalize_query("arbitration")
+        scores = bm25_scores(index, query_terms)
+        expected = sorted(scores, key=scores.get, reverse=True)
+        
+        results, total = search_documents(index, parse_query("arbitration"), limit=10, scoring='bm25')
+        
+        assert total == len(scores)
+        assert [r['id'] for r in results] == [index.doc_ids[ordinal] for ordinal in expected]
+        assert results[0]['relevance_score'] == 1.0
+        assert all(0.0 < r['relevance_score'] <= 1.0 for r in results)
+    
+    def test_no_matches(self, index):
+        for scoring in ['bm25', 'legacy']:
+            results, total = search_documents(index, parse_query("xyzabc123"), limit=10, scoring=scoring)
+            
+            assert results == []
+            assert total == 0
@@ -0,0 +1,75 @@
+import json
+import pytest
+from src import serialization
+from src.serialization import FragmentEncoder, dumps
+
+
+RESULT = {
+    "id": "doc1",
+    "title": "Contract Law Fundamentals",
+    "summary": "Offer, acceptance — and consideration.",
+    "relevance_score": 0.5,
+    "snippet": "...a \"quoted\" snippet...",
+    "highlights": [[4, 12]]
+}
+
+
+@pytest.fixture(params=['orjson', 'json'])
+def backend(request, monkeypatch):
+    if request.param == 'json':
+        monkeypatch.setattr(serialization, 'orjson', None)
+    elif serialization.orjson is None:
+        pytest.skip("orjson is not installed")
+    return request.param
+
+
+class TestDumps:
+    
+    def test_round_trip(self, backend):
+        assert json.loads(dumps(RESULT)) == RESULT
+    
+    def test_returns_utf8_bytes(self, backend):
+        assert dumps({"dash": "—"}).decode('utf-8') == '{"dash":"—"}'
+
+
+class TestFragmentEncoder:
+    
+    def test_encoded_result_matches_json(self, backend):
+        assert json.loads(FragmentEncoder().encode_result(RESULT)) == RESULT
+    
+    def test_fragments_are_reused(self, backend):
+        encoder = FragmentEncoder()
+        encoder.encode_result(RESULT)
+        encoder.encode_result({**RESULT, "relevance_score": 0.1, "snippet": "other"})
+        
+        assert len(encoder) == 1
+    
+    def test_changed_document_gets_new_fragment(self, backend):
+        encoder = FragmentEncoder()
+        encoder.encode_result(RESULT)
+        
+        assert json.loads(encoder.encode_result({**RESULT, "title": "Revised"}))["title"] == "Revised"
+        assert len(encoder) == 2
+    
+    def test_capacity_bounds_cache(self, backend):
+        encoder = FragmentEncoder(capacity=2)
+        for number in range(5):
+            encoder.encode_result({**RESULT, "id": f"doc{number}"})
+        
+        assert len(encoder) <= 2
+    
+    def test_encode_response_splices_results(self, backend):
+        response = {"query": "law", "results": [RESULT, {**RESULT, "id": "doc2"}], "count": 2}
+        
+        assert json.loads(FragmentEncoder().encode_response(response)) == response
+    
+    def test_other_lists_are_encoded_normally(self, backend):
+        response = {"results": [{"query": "law", "results": []}], "count": 1}
+        
+        assert json.loads(FragmentEncoder().encode_response(response)) == response
+    
+    def test_preload(self, backend):
+        encoder = FragmentEncoder()
+        encoder.preload([RESULT, None])
+        
+        assert len(encoder) == 1
@@ -0,0 +1,162 @@
+import pytest
+from src import shards
+from src.documents import LEGAL_DOCUMENTS, get_normalized_document, get_normalized_documents
+from src.index import InvertedIndex
+from src.live import LiveIndex, rank_segments
+from src.query import parse_query
+from src.scoring import CorpusStatistics
+from src.search import rank_documents
+from src.shards import ShardedSearcher, partition_index
+from src.store import MemoryStore
+
+
+QUERIES = [
+    "contract law",
+    "rights",
+    "law AND rights",
+    "rights NOT property",
+    '"statute of frauds"',
+    "breach NEAR/3 damages",
+    "employment discrimination",
+    "xyznonexistent",
+]
+
+
+@pytest.fixture(scope='module')
+def index():
+    return InvertedIndex.from_documents(get_normalized_documents())
+
+
+@pytest.fixture(scope='module')
+def searcher(index):
+    searcher = ShardedSearcher(index, 3)
+    searcher.start()
+    yield searcher
+    searcher.close()
+
+
+class TestPartitionIndex:
+    
+    def test_shards_cover_corpus_in_order(self, index):
+        shards = partition_index(index, 3)
+        
+        assert [doc_id for shard in shards for doc_id in shard.doc_ids] == index.doc_ids
+        assert sum(shard.total_length for shard in shards) == index.total_length
+    
+    def test_postings_are_split(self, index):
+        shards = partition_index(index, 4)
+        
+        for term in ["law", "contract", "rights"]:
+            assert sum(shard.doc_freq(term) for shard in shards) == index.doc_freq(term)
+    
+    def test_more_shards_than_documents(self, index):
+        shards = partition_index(index, 50)
+        
+        assert len(shards) == len(index)
+
+
+class TestShardedSearcher:
+    
+    @pytest.mark.parametrize('scoring', ['bm25', 'legacy'])
+    def test_matches_unsharded_ranking(self, index, searcher, scoring):
+        for query in QUERIES:
+            parsed = parse_query(query)
+            
+            assert searcher.rank_documents(parsed, 5, 0, scoring) == rank_documents(index, parsed, 5, 0, scoring)
+    
+    def test_pages_merge_across_shards(self, index, searcher):
+        parsed = parse_query("law")
+        
+        for offset in range(0, 8, 3):
+            assert searcher.rank_documents(parsed, 3, offset) == rank_documents(index, parsed, 3, offset)
+    
+    def test_falls_back_when_index_changes(self, index):
+        local_index = InvertedIndex.from_documents(get_normalized_documents())
+        searcher = ShardedSearcher(local_index, 2)
+        searcher.start()
+        local_index.add_document("extra", ["contract"])
+        
+        try:
+            page, total = searcher.rank_documents(parse_query("contract"), 10)
+            assert total == local_index.doc_freq("contract")
+        finally:
+            searcher.close()
+    
+    def test_unstarted_searcher_scores_unsharded(self, index):
+        searcher = ShardedSearcher(index, 2)
+        parsed = parse_query("contract law")
+        
+        try:
+            assert searcher.rank_documents(parsed, 5) == rank_documents(index, parsed, 5)
+            assert searcher._pools == []
+        finally:
+            searcher.close()
+    
+    @pytest.mark.parametrize('scoring', ['bm25', 'legacy'])
+    def test_serves_the_base_of_a_live_index(self, index, searcher, scoring):
+        live_index = LiveIndex(index)
+        live_index.delete("doc2")
+        live_index.put("doc3", get_normalized_document("doc3").tokens)
+        segments = live_index.segments()
+        
+        for query in QUERIES:
+            parsed = parse_query(query)
+            base_results = searcher.segment_results(parsed, 5, scoring, segments.statistics, segments.deleted_ids)
+            
+            assert rank_segments(segments, parsed, 5, 0, scoring, base_results) == rank_segments(segments, parsed, 5, 0, scoring)
+    
+    def test_unstarted_searcher_serves_no_segment(self, index):
+        searcher = ShardedSearcher(index, 2)
+        segments = LiveIndex(index).segments()
+        
+        try:
+            assert searcher.segment_results(parse_query("law"), 5, 'bm25', segments.statistics, segments.deleted_ids) is None
+        finally:
+            searcher.close()
+
+
+class TestShardedSearcherRebuild:
+    
+    @pytest.fixture
+    def store(self, monkeypatch):
+        store = MemoryStore(dict(LEGAL_DOCUMENTS))
+        monkeypatch.setattr('src.documents._store', store)
+        return store
+    
+    @pytest.mark.parametrize('scoring', ['bm25', 'legacy'])
+    def test_new_shards_reach_the_running_pool(self, store, scoring):
+        searcher = ShardedSearcher(InvertedIndex.from_documents(get_normalized_documents()), 2)
+        searcher.start()
+        pools = searcher._pools
+        
+        # Only this process sees the new document; the pool forked earlier.
+        store.put({"id": "extra", "title": "Extra", "summary": "", "content": "A contract about contract rights."})
+        live_index = LiveIndex(searcher.index)
+        live_index.put("extra", get_normalized_document("extra").tokens)
+        live_index.merge()
+        rebuilt = searcher.rebuild(live_index.base, {"extra": store.get("extra")})
+        
+        try:
+            assert rebuilt._pools is pools and searcher._pools == []
+            assert id(searcher) not in shards._registry
+            for query in QUERIES + ["contract rights"]:
+                parsed = parse_query(query)
+                expected = rank_documents(live_index.base, parsed, 5, 0, scoring)
+                statistics = CorpusStatistics.for_query(live_index.base, parsed.terms)
+                
+                assert rebuilt._score_shards(parsed, 5, scoring, statistics) is not None
+                assert rebuilt.rank_documents(parsed, 5, 0, scoring) == expected
+        finally:
+            rebuilt.close()
+    
+    def test_replaced_searcher_scores_unsharded(self, index):
+        searcher = ShardedSearcher(index, 2)
+        searcher.start()
+        rebuilt = searcher.rebuild(index, {})
+        parsed = parse_query("contract law")
+        
+        try:
+            assert searcher.rank_documents(parsed, 5) == rank_documents(index, parsed, 5)
+            assert searcher._score_shards(parsed, 5, 'bm25', CorpusStatistics.for_query(index, parsed.terms)) is None
+        finally:
+            rebuilt.close()
@@ -0,0 +1,97 @@
+import struct
+import pytest
+from src.documents import get_store
+from src.index import InvertedIndex
+from src.search import search_documents
+from src.snapshot import (
+    SNAPSHOT_MAGIC,
+    SnapshotError,
+    load_or_build_index,
+    load_snapshot,
+    main,
+    save_snapshot,
+)
+from src.query import parse_query
+
+
+@pytest.fixture
+def index():
+    return InvertedIndex.from_documents(get_store().iter_normalized())
+
+
+@pytest.fixture
+def snapshot_path(index, tmp_path):
+    path = str(tmp_path / 'index.snap')
+    save_snapshot(index, path, get_store().fingerprint())
+    return path
+
+
+class TestSnapshotRoundTrip:
+    
+    def test_loaded_index_has_same_statistics(self, index, snapshot_path):
+        loaded = load_snapshot(snapshot_path, get_store().fingerprint())
+        
+        assert loaded.doc_ids == index.doc_ids
+        assert list(loaded.doc_lengths) == list(index.doc_lengths)
+        assert loaded.total_length == index.total_length
+        assert set(loaded.postings) == set(index.postings)
+        assert dict(loaded.postings['contract'].items()) == index.postings['contract']
+    
+    def test_loaded_index_returns_same_results(self, index, snapshot_path):
+        loaded = load_snapshot(snapshot_path)
+        
+        for scoring in ['bm25', 'legacy']:
+            for query in ['contract law', 'employment rights', 'arbitration', '"statute of frauds"', 'breach NEAR/3 damages']:
+                expected = search_documents(index, parse_query(query), 10, scoring=scoring)
+                assert search_documents(loaded, parse_query(query), 10, scoring=scoring) == expected
+    
+    def test_posting_view_lookup(self, snapshot_path):
+        view = load_snapshot(snapshot_path).postings['employment']
+        ordinal = next(iter(view))
+        
+        assert view[ordinal] > 0
+        with pytest.raises(KeyError):
+            view[10_000]
+
+
+class TestSnapshotValidation:
+    
+    def test_fingerprint_mismatch(self, snapshot_path):
+        with pytest.raises(SnapshotError, match='different corpus'):
+            load_snapshot(snapshot_path, 'stale')
+    
+    def test_not_a_snapshot(self, tmp_path):
+        path = tmp_path / 'garbage.snap'
+        path.write_bytes(b'not a snapshot at all')
+        
+        with pytest.raises(SnapshotError):
+            load_snapshot(str(path))
+    
+    def test_format_version_mismatch(self, tmp_path):
+        path = tmp_path / 'future.snap'
+        path.write_bytes(struct.pack("<4sII", SNAPSHOT_MAGIC, 999, 2) + b'{}')
+        
+        with pytest.raises(SnapshotError, match='format 999'):
+            load_snapshot(str(path))
+    
+    def test_stale_snapshot_falls_back_to_building(self, index, tmp_path):
+        path = str(tmp_path / 'stale.snap')
+        save_snapshot(index, path, 'stale')
+        
+        rebuilt = load_or_build_index(get_store(), path)
+        
+        assert isinstance(rebuilt.postings, dict)
+        assert rebuilt.doc_ids == index.doc_ids
+
+
+class TestSnapshotCli:
+    
+    def test_build_and_info(self, tmp_path, capsys):
+        path = str(tmp_path / 'cli.snap')
+        
+        assert main(['build', path]) == 0
+        assert main(['info', path]) == 0
+        
+        output = capsys.readouterr().out
+        assert '"documents": 10' in output
+        assert load_or_build_index(get_store(), path).postings.__class__.__name__ == 'MappedPostings'
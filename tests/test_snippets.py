@@ -0,0 +1,70 @@
+from src.snippets import ELLIPSIS, build_snippet, densest_window, find_hits
+from tests.conftest import make_document
+
+
+def highlighted(snippet, highlights):
+    return [snippet[start:end] for start, end in highlights]
+
+
+class TestFindHits:
+    
+    def test_exact_terms_match_whole_tokens(self):
+        document = make_document("doc", "A contract is not an act.")
+        
+        assert find_hits(document, ["act"]) == [(21, 24, 0)]
+    
+    def test_substring_terms_match_inside_tokens(self):
+        document = make_document("doc", "A contract is not an act.")
+        
+        assert [(start, end) for start, end, _ in find_hits(document, ["act"], exact=False)] == [(7, 10), (21, 24)]
+    
+    def test_phrase_terms_match_consecutive_tokens(self):
+        document = make_document("doc", "The Statute of Frauds, and a statute on frauds.")
+        
+        assert find_hits(document, ["statute of frauds"]) == [(4, 21, 0)]
+
+
+class TestDensestWindow:
+    
+    def test_prefers_window_covering_most_terms(self):
+        hits = [(0, 5, 0), (100, 105, 0), (110, 115, 1), (300, 305, 1)]
+        
+        assert densest_window(hits, 50) == (1, 3)
+    
+    def test_single_hit(self):
+        assert densest_window([(10, 15, 0)], 50) == (0, 1)
+
+
+class TestBuildSnippet:
+    
+    def test_window_covers_all_terms(self):
+        content = "Breach is mentioned early. " + "Filler text here. " * 20 + "Damages follow a breach of contract."
+        snippet, highlights = build_snippet(make_document("doc", content), ["breach", "damages"])
+        
+        assert sorted(word.lower() for word in highlighted(snippet, highlights)) == ["breach", "damages"]
+        assert snippet.startswith(ELLIPSIS)
+    
+    def test_highlights_are_relative_to_snippet(self):
+        content = "x " * 100 + "The contract was signed." + " y" * 100
+        snippet, highlights = build_snippet(make_document("doc", content), ["contract", "signed"])
+        
+        assert highlighted(snippet, highlights) == ["contract", "signed"]
+        assert len(snippet) <= 200 + 2 * len(ELLIPSIS)
+    
+    def test_overlapping_hits_are_merged(self):
+        snippet, highlights = build_snippet(make_document("doc", "Under the statute of frauds."), ["statute of frauds", "frauds"])
+        
+        assert highlighted(snippet, highlights) == ["statute of frauds"]
+    
+    def test_no_match_returns_document_start(self):
+        content = "word " * 100
+        snippet, highlights = build_snippet(make_document("doc", content), ["missing"])
+        
+        assert snippet == content[:200] + ELLIPSIS
+        assert highlights == []
+    
+    def test_short_document_has_no_ellipsis(self):
+        snippet, highlights = build_snippet(make_document("doc", "Contract law."), ["law"])
+        
+        assert snippet == "Contract law."
+        assert highlighted(snippet, highlights) == ["law"]
@@ -0,0 +1,129 @@
+import pytest
+from src.index import InvertedIndex
+from src.query import parse_query
+from src.spelling import TrigramIndex, correct_query, corrected_text, edit_distance, max_edits
+from tests.conftest import make_document
+
+
+@pytest.fixture
+def index():
+    return InvertedIndex.from_documents([
+        make_document("a", "Negligence claims need a duty of care and damages."),
+        make_document("b", "Arbitration clauses bind both parties. Negligence aside."),
+        make_document("c", "The statute of frauds covers contracts for land."),
+    ])
+
+
+@pytest.fixture
+def trigram_index(index):
+    return TrigramIndex(index)
+
+
+class TestEditDistance:
+    
+    @pytest.mark.parametrize('left, right, distance', [
+        ("negligence", "negligence", 0),
+        ("neglegence", "negligence", 1),
+        ("arbitation", "arbitration", 1),
+        ("fruads", "frauds", 1),
+        ("kitten", "sitting", 3),
+    ])
+    def test_distance(self, left, right, distance):
+        assert edit_distance(left, right, 5) == distance
+    
+    def test_stops_at_bound(self):
+        assert edit_distance("negligence", "arbitration", 2) == 3
+        assert edit_distance("law", "negligence", 2) == 3
+    
+    def test_short_terms_are_not_corrected(self):
+        assert max_edits("lwa") == 0
+        assert max_edits("fruads") == 1
+        assert max_edits("neglegence") == 2
+        assert max_edits("a1b2c3") == 0
+
+
+class TestTrigramIndex:
+    
+    @pytest.mark.parametrize('typo, correction', [
+        ("neglegence", "negligence"),
+        ("arbitation", "arbitration"),
+        ("fruads", "frauds"),
+        ("statue", "statute"),
+    ])
+    def test_suggest(self, index, trigram_index, typo, correction):
+        assert trigram_index.suggest(typo, index.doc_freq) == correction
+    
+    def test_no_close_term(self, index, trigram_index):
+        assert trigram_index.suggest("xyznonexistent", index.doc_freq) is None
+    
+    def test_candidates_come_from_nearby_lengths(self, trigram_index):
+        assert set(trigram_index.candidates("neglegence", 2)) <= {
+            term for term in trigram_index.terms if 8 <= len(term) <= 12
+        }
+    
+    def test_prefers_frequent_terms(self, index):
+        index.add_document("d", ["claima"])
+        index.add_document("e", ["claims"])
+        trigram_index = TrigramIndex(index)
+        
+        assert trigram_index.suggest("claimz", index.doc_freq) == "claims"
+    
+    @pytest.mark.parametrize('term, contained', [
+        ("negligence", True),
+        ("ligen", True),
+        ("tration", True),
+        ("claim", True),
+        ("ligens", False),
+        ("xyznonexistent", False),
+    ])
+    def test_contains(self, trigram_index, term, contained):
+        assert trigram_index.contains(term) is contained
+    
+    def test_prefers_word_forms(self, index):
+        # "parent" is one edit away too, and more common.
+        for doc_id in "def":
+            index.add_document(doc_id, ["parent"])
+        index.add_document("g", ["patents"])
+        
+        assert TrigramIndex(index).suggest("patent", index.doc_freq) == "patents"
+    
+    def test_extra_terms_and_deleted_terms(self, trigram_index):
+        # Every indexed term is gone from the corpus; "negligent" was added
+        # after the trigram index was built.
+        doc_freq = {"negligent": 1}.get
+        
+        assert trigram_index.suggest("negligenc", lambda term: doc_freq(term, 0), ["negligent"]) == "negligent"
+
+
+class TestCorrectQuery:
+    
+    def correct(self, index, trigram_index, query):
+        return correct_query(
+            parse_query(query),
+            lambda token: index.doc_freq(token) > 0,
+            lambda token: trigram_index.suggest(token, index.doc_freq)
+        )
+    
+    def test_corrects_unknown_tokens_only(self, index, trigram_index):
+        corrected, corrections = self.correct(index, trigram_index, "neglegence damages")
+        
+        assert corrections == {"neglegence": "negligence"}
+        assert str(corrected) == "negligence damages"
+    
+    def test_keeps_query_structure(self, index, trigram_index):
+        corrected, corrections = self.correct(index, trigram_index, '"statute of fruads" AND NOT arbitation')
+        
+        assert corrections == {"fruads": "frauds", "arbitation": "arbitration"}
+        assert corrected == parse_query('"statute of frauds" AND NOT arbitration')
+    
+    def test_nothing_to_correct(self, index, trigram_index):
+        parsed = parse_query("negligence xyznonexistent")
+        corrected, corrections = self.correct(index, trigram_index, "negligence xyznonexistent")
+        
+        assert corrections == {}
+        assert corrected == parsed
+    
+    def test_corrected_text_keeps_operators(self):
+        corrections = {"neglegence": "negligence", "near": "bear"}
+        
+        assert corrected_text('Neglegence NEAR/3 "duty" OR near', corrections) == 'negligence NEAR/3 "duty" OR bear'
@@ -0,0 +1,187 @@
+import pytest
+from src import documents
+from src.documents import LEGAL_DOCUMENTS, get_document_by_id, get_store, set_store
+from src.store import (
+    DocumentStore,
+    MemoryStore,
+    JsonlStore,
+    DirectoryStore,
+    SqliteStore,
+    open_store,
+    write_directory,
+    write_jsonl,
+    write_sqlite,
+)
+
+
+@pytest.fixture(params=['jsonl', 'dir', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'jsonl':
+        path = tmp_path / 'docs.jsonl'
+        write_jsonl(LEGAL_DOCUMENTS.values(), str(path))
+    elif request.param == 'dir':
+        path = tmp_path / 'docs'
+        write_directory(LEGAL_DOCUMENTS.values(), str(path))
+    else:
+        path = tmp_path / 'docs.db'
+        write_sqlite(LEGAL_DOCUMENTS.values(), str(path))
+    return open_store(f"{request.param}:{path}", cache_size=2)
+
+
+class TestFileStores:
+    
+    def test_ids_cover_corpus(self, store):
+        assert sorted(store.ids()) == sorted(LEGAL_DOCUMENTS)
+        assert len(store) == len(LEGAL_DOCUMENTS)
+    
+    def test_metadata_excludes_content(self, store):
+        metadata = store.metadata('doc1')
+        
+        assert metadata['title'] == 'Contract Law Fundamentals'
+        assert 'content' not in metadata
+    
+    def test_get_loads_full_document(self, store):
+        for doc_id, document in LEGAL_DOCUMENTS.items():
+            assert store.get(doc_id) == document
+    
+    def test_missing_document(self, store):
+        assert store.get('doc999') is None
+        assert store.normalized('doc999') is None
+        assert 'doc999' not in store
+    
+    def test_normalized_documents_are_cached_with_bounded_size(self, store):
+        first = store.normalized('doc1')
+        
+        assert store.normalized('doc1') is first
+        store.normalized('doc2')
+        store.normalized('doc3')
+        
+        assert len(store._normalized) == 2
+        assert store.normalized('doc1') is not first
+        assert store.normalized('doc1') == first
+
+
+class TestOpenStore:
+    
+    def test_kind_is_inferred_from_path(self, tmp_path):
+        jsonl_path = tmp_path / 'docs.jsonl'
+        sqlite_path = tmp_path / 'docs.db'
+        directory = tmp_path / 'docs'
+        write_jsonl(LEGAL_DOCUMENTS.values(), str(jsonl_path))
+        write_sqlite(LEGAL_DOCUMENTS.values(), str(sqlite_path))
+        write_directory(LEGAL_DOCUMENTS.values(), str(directory))
+        
+        assert isinstance(open_store(str(jsonl_path)), JsonlStore)
+        assert isinstance(open_store(str(sqlite_path)), SqliteStore)
+        assert isinstance(open_store(str(directory)), DirectoryStore)
+    
+    def test_unknown_kind(self):
+        with pytest.raises(ValueError):
+            open_store('redis:localhost')
+    
+    def test_base_store_is_abstract(self):
+        with pytest.raises(TypeError):
+            DocumentStore()
+
+
+class TestActiveStore:
+    
+    def test_default_store_is_builtin_corpus(self):
+        assert isinstance(get_store(), MemoryStore)
+        assert get_document_by_id('doc1') is LEGAL_DOCUMENTS['doc1']
+    
+    def test_accessors_follow_configured_store(self, store, monkeypatch):
+        monkeypatch.setattr(documents, '_store', documents._store)
+        set_store(store)
+        
+        assert get_document_by_id('doc2') == LEGAL_DOCUMENTS['doc2']
+        assert get_store() is store
+    
+    def test_projection_skips_content(self, store, monkeypatch):
+        monkeypatch.setattr(documents, '_store', documents._store)
+        set_store(store)
+        
+        def fail(document_id):
+            raise AssertionError("content should not be loaded")
+        
+        monkeypatch.setattr(store, 'get', fail)
+        
+        assert get_document_by_id('doc3', ['title', 'summary']) == {
+            "id": "doc3",
+            "title": LEGAL_DOCUMENTS['doc3']['title'],
+            "summary": LEGAL_DOCUMENTS['doc3']['summary']
+        }
+        assert get_document_by_id('missing', ['title']) is None
+
+
+class TestDocumentEtags:
+    
+    def test_etags_match_across_stores(self, store):
+        memory = MemoryStore(LEGAL_DOCUMENTS)
+        
+        for document_id in LEGAL_DOCUMENTS:
+            assert store.etag(document_id) == memory.etag(document_id)
+    
+    def test_etag_changes_with_content(self):
+        changed = {**LEGAL_DOCUMENTS, "doc1": {**LEGAL_DOCUMENTS["doc1"], "content": "Revised."}}
+        
+        assert MemoryStore(changed).etag("doc1") != MemoryStore(LEGAL_DOCUMENTS).etag("doc1")
+        assert MemoryStore(changed).etag("doc2") == MemoryStore(LEGAL_DOCUMENTS).etag("doc2")
+    
+    def test_unknown_document(self, store):
+        assert store.etag("missing") is None
+
+
+class TestStoreMutations:
+    
+    def test_put_adds_and_replaces(self, store):
+        added = {"id": "doc-new", "title": "New", "summary": "Added.", "content": "Fresh content."}
+        
+        assert store.put(added) is True
+        assert store.get("doc-new") == added
+        assert store.ids()[-1] == "doc-new"
+        
+        revised = {**LEGAL_DOCUMENTS["doc1"], "content": "Revised content."}
+        previous_etag = store.etag("doc1")
+        
+        assert store.put(revised) is False
+        assert store.get("doc1")["content"] == "Revised content."
+        assert store.normalized("doc1").tokens == ["revised", "content"]
+        assert store.etag("doc1") != previous_etag
+        assert len(store) == len(LEGAL_DOCUMENTS) + 1
+    
+    def test_delete(self, store):
+        remaining = [document_id for document_id in store.ids() if document_id != "doc2"]
+        
+        assert store.delete("doc2") is True
+        assert store.delete("doc2") is False
+        assert store.get("doc2") is None
+        assert store.etag("doc2") is None
+        assert "doc2" not in store
+        assert [document["id"] for document in store] == remaining
+    
+    def test_memory_store_normalizes_and_hashes_on_demand(self):
+        memory = MemoryStore(LEGAL_DOCUMENTS)
+        
+        assert len(memory._normalized) == 0 and len(memory._etags) == 0
+        assert memory.normalized("doc1").id == "doc1"
+        assert memory.etag("doc1") is not None
+        assert list(memory._normalized) == list(memory._etags) == ["doc1"]
+    
+    def test_preload_normalizes_the_whole_memory_store(self):
+        memory = MemoryStore(LEGAL_DOCUMENTS)
+        
+        assert memory.preload_normalized() == len(LEGAL_DOCUMENTS)
+        assert list(memory._normalized) == list(LEGAL_DOCUMENTS)
+    
+    def test_preload_stops_at_the_cache_size(self, store):
+        assert store.preload_normalized() == 2
+        assert list(store._normalized) == store.ids()[:2]
+    
+    def test_memory_store_leaves_source_untouched(self):
+        memory = MemoryStore(LEGAL_DOCUMENTS)
+        memory.put({**LEGAL_DOCUMENTS["doc1"], "content": "Revised."})
+        memory.delete("doc2")
+        
+        assert LEGAL_DOCUMENTS["doc1"]["content"] != "Revised."
+        assert "doc2" in LEGAL_DOCUMENTS
@@ -0,0 +1,102 @@
+import pytest
+from src.documents import LEGAL_DOCUMENTS, normalize_document
+from src.index import InvertedIndex
+from src.store import MemoryStore
+from src.suggest import WIDE_PREFIX, PrefixTable, SuggestIndex, suggest_segments
+
+
+@pytest.fixture
+def suggest_index():
+    store = MemoryStore(LEGAL_DOCUMENTS)
+    index = InvertedIndex.from_documents(normalize_document(document) for document in LEGAL_DOCUMENTS.values())
+    return SuggestIndex(index, store, 10)
+
+
+def brute_force(entries, prefix, limit):
+    ranked = sorted((rank, key, value) for key, rank, value in entries if key.startswith(prefix))
+    return list(dict.fromkeys(value for _, _, value in ranked))[:limit]
+
+
+class TestPrefixTable:
+    
+    def test_matches_brute_force(self):
+        # Enough keys under "a" for it to be precomputed; "ab" is ranked on
+        # the fly.
+        words = [f"{first}{second}{third}" for first in "ab" for second in "abc" for third in "abcdefghijklmnopqrstuvwxyz"]
+        entries = [(word, -(sum(map(ord, word)) % 17), word) for word in words]
+        table = PrefixTable(entries, 5)
+        
+        assert 'a' in table._top and len([word for word in words if word.startswith('ab')]) <= WIDE_PREFIX
+        for prefix in ['', 'a', 'ab', 'abc', 'bz', 'c']:
+            assert table.lookup(prefix, 5) == brute_force(entries, prefix, 5)
+            assert table.lookup(prefix, 2) == brute_force(entries, prefix, 2)
+    
+    def test_distinct_values(self):
+        entries = [("law and lawyers", (0,), "doc1"), ("lawyers", (2,), "doc1"), ("law school", (0,), "doc2")]
+        
+        assert PrefixTable(entries, 5).lookup('law', 5) == ["doc1", "doc2"]
+    
+    def test_kept_values_fill_the_limit(self):
+        words = [f"a{second}{third}" for second in "abc" for third in "abcdefghijklmnopqrstuvwxyz"]
+        entries = [(word, index, word) for index, word in enumerate(words)]
+        table = PrefixTable(entries, 5)
+        
+        assert table.lookup('a', 3, lambda word: word[1] != 'a') == ['aba', 'abb', 'abc']
+        assert table.ranked_lookup('ac', 1) == [(52, 'aca')]
+
+
+class TestSuggestIndex:
+    
+    def test_terms_ranked_by_document_frequency(self, suggest_index):
+        terms = suggest_index.suggest('con', 5)['terms']
+        frequencies = [term['doc_freq'] for term in terms]
+        
+        assert len(terms) == 5
+        assert all(term['term'].startswith('con') for term in terms)
+        assert frequencies == sorted(frequencies, reverse=True)
+    
+    def test_completes_the_last_word(self, suggest_index):
+        terms = suggest_index.suggest('Contract la', 3)['terms']
+        
+        assert terms[0] == {'term': 'law', 'text': 'Contract law', 'doc_freq': 6}
+    
+    def test_finished_word_gets_no_term_completions(self, suggest_index):
+        assert suggest_index.suggest('contract ', 3)['terms'] == []
+    
+    def test_titles_match_any_word(self, suggest_index):
+        titles = suggest_index.suggest('law fund', 5)['titles']
+        starts = suggest_index.suggest('family', 5)['titles']
+        
+        assert titles == [{'id': 'doc1', 'title': 'Contract Law Fundamentals'}]
+        assert starts == [{'id': 'doc6', 'title': 'Family Law Essentials'}]
+    
+    def test_titles_starting_with_the_text_come_first(self, suggest_index):
+        titles = suggest_index.suggest('c', 10)['titles']
+        
+        assert titles[0]['title'].lower().startswith('c')
+        assert {'id': 'doc7', 'title': 'Tax Law Compliance'} in titles
+    
+    def test_no_matches(self, suggest_index):
+        assert suggest_index.suggest('xyz', 5) == {'terms': [], 'titles': []}
+        assert suggest_index.suggest('!!', 5) == {'terms': [], 'titles': []}
+
+
+class TestSuggestSegments:
+    
+    def test_deleted_and_added_documents(self, suggest_index):
+        store = MemoryStore({"doc9": {"id": "doc9", "title": "Contract Drafting", "summary": "", "content": "Contract drafting."}})
+        delta = InvertedIndex.from_documents([store.normalized("doc9")])
+        doc_freq = {"contract": 3, "contracts": 1, "contractual": 0}.get
+        
+        suggestions = suggest_segments(
+            [(suggest_index, {"doc1"}), (SuggestIndex(delta, store, 10), set())],
+            'contract',
+            10,
+            lambda term: doc_freq(term, 0)
+        )
+        
+        assert suggestions['terms'] == [
+            {'term': 'contract', 'text': 'contract', 'doc_freq': 3},
+            {'term': 'contracts', 'text': 'contracts', 'doc_freq': 1}
+        ]
+        assert suggestions['titles'] == [{'id': 'doc9', 'title': 'Contract Drafting'}]
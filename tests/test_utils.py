@@ -1,5 +1,6 @@
 import pytest
-from src.utils import compute_mock_relevance, matches_query, extract_snippet
+from src.documents import normalize_document
+from src.utils import compute_mock_relevance, matches_query, extract_snippet, normalize_query
 
 
 class TestComputeMockRelevance:
@@ -205,3 +206,24 @@ class TestExtractSnippet:
         
         assert "contract" in snippet.lower()
         assert len(snippet) > 30
+
+
+class TestNormalizedDocumentInput:
+    
+    def test_helpers_accept_normalized_document(self):
+        content = "This document discusses CONTRACT law, contracting and legal agreements between parties."
+        document = normalize_document({"id": "d", "title": "T", "summary": "S", "content": content})
+        query = "contract agreement"
+        
+        assert compute_mock_relevance(query, document) == compute_mock_relevance(query, content)
+        assert matches_query(query, document) == matches_query(query, content)
+        assert extract_snippet(document, query) == extract_snippet(content, query)
+    
+    def test_helpers_accept_pre_split_query_terms(self):
+        content = "Employment rights protect workers."
+        query_terms = normalize_query("Employment RIGHTS")
+        
+        assert query_terms == ["employment", "rights"]
+        assert compute_mock_relevance(query_terms, content) == compute_mock_relevance("employment rights", content)
+        assert matches_query(query_terms, content) is True
+        assert extract_snippet(content, query_terms) == extract_snippet(content, "employment rights")